@@ -5,14 +5,31 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 
 from src.auto_tune import tune_similarity_threshold
-from src.ingest import ingest
-from src.normalize import normalize
+from src.checkpoint import STAGES, CheckpointStore, StageRunner, file_digest
+from src.embedding import DEFAULT_EMBEDDING_MODEL
+from src.ingest import RecordBatch, collapse_catalog, ingest
+from src.normalize import _SYNONYM_PATH, _load_synonym_map, normalize
 from src.extract import extract
 from src.cluster import cluster
-from src.canonicalize import canonicalize
+from src.canonicalize import canonicalize, canonicalize_with_confidence
 from src.evaluate import evaluate
+from src.cluster_index import ClusterIndex
+from src.merge_tree import MergeTree, build_merge_tree
+from src.incremental import (
+    advance_watermark,
+    load_state,
+    refresh_labels,
+    rows_after_watermark,
+    save_state,
+)
+from src.store import AssignmentStore, match_index_path
+from src.stable_ids import load_assignments, match_cluster_ids, save_assignments
+from src.synonym_impact import diff_synonym_maps, find_affected_records
+
+DEFAULT_CHECKPOINT_DIR = ".checkpoints"
 
 
 def _parse_thresholds(raw: str) -> list[float]:
@@ -60,11 +77,59 @@ def _load_labeled_assignments(path: str) -> dict[str, object]:
     )
 
 
+def _ingest_stage(
+    input_path: str,
+    *,
+    keep_all_rows: bool,
+    collapse: bool,
+) -> tuple[object, dict[str, int] | None]:
+    """Ingest (and optionally collapse) input rows for the downstream stages."""
+    raw = ingest(input_path, filters={}) if keep_all_rows else ingest(input_path)
+    if not collapse:
+        return raw, None
+    num_rows = len(raw)
+    entities, _row_entity = collapse_catalog(raw)
+    return entities, {"num_rows": num_rows, "num_entities": len(entities)}
+
+
+def _resync_synonyms(index: ClusterIndex, stored_map: dict[str, str] | None) -> tuple[set[int], int]:
+    """Re-embed stored records whose text is touched by a synonyms.yml change.
+
+    Returns the cluster IDs that changed and the number of re-embedded records.
+    """
+    current_map = dict(_load_synonym_map())
+    if stored_map is None or stored_map == current_map:
+        return set(), 0
+    affected = find_affected_records(
+        index.stored_records(), diff_synonym_maps(stored_map, current_map)
+    )
+    if not affected:
+        return set(), 0
+    renormalized = normalize(
+        [
+            {"Description": record.get("description_raw", ""), "record_id": record["record_id"]}
+            for record in affected
+        ]
+    )
+    return set(index.replace(extract(renormalized))), len(affected)
+
+
+def _load_merge_tree(path: str, source_key: str) -> MergeTree | None:
+    """Return the stored merge tree when it was built from the same inputs."""
+    if not os.path.exists(path):
+        return None
+    tree = MergeTree.load(path)
+    return tree if tree.source_key == source_key else None
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="Run clustering pipeline with optional threshold auto-tuning."
     )
-    parser.add_argument("input_path", help="Path to .xlsx input data.")
+    parser.add_argument(
+        "input_path",
+        help="Path to input data (.xlsx, .csv, .tsv, .parquet, .ndjson, .jsonl).",
+    )
     parser.add_argument(
         "--similarity-threshold",
         type=float,
@@ -86,12 +151,172 @@ def main(argv: list[str] | None = None) -> None:
         default=None,
         help="Path to JSON labeled assignments used for threshold auto-tuning.",
     )
+    parser.add_argument(
+        "--no-row-filters",
+        action="store_true",
+        help="Keep cancellations, returns and non-product stock codes.",
+    )
+    parser.add_argument(
+        "--collapse-catalog",
+        action="store_true",
+        help="Cluster unique (StockCode, Description) entities instead of invoice lines.",
+    )
+    parser.add_argument(
+        "--incremental-state",
+        default=None,
+        help=(
+            "Directory holding the InvoiceDate/Invoice watermark and stored results. "
+            "Only rows past the watermark are normalized and embedded (implies "
+            "--collapse-catalog)."
+        ),
+    )
+    parser.add_argument(
+        "--threshold-from-tree",
+        default=None,
+        metavar="TREE_PATH",
+        help=(
+            "Cut a stored single-linkage merge tree at --similarity-threshold instead "
+            "of re-clustering. The tree is built and saved to TREE_PATH when missing "
+            "or when the input, filters or synonyms changed."
+        ),
+    )
+    parser.add_argument(
+        "--assignments-path",
+        default=None,
+        help=(
+            "JSON file with the previous run's record -> cluster ID assignments. "
+            "New clusters take over previous IDs by member overlap, and the file "
+            "is rewritten for the next run. Requires --collapse-catalog, whose "
+            "record IDs come from StockCode and Description."
+        ),
+    )
+    parser.add_argument(
+        "--store-path",
+        default=None,
+        help=(
+            "Write records, cluster assignments, labels, confidences and suspect "
+            "flags to this SQLite database (read by the API's GET endpoints)."
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help=(
+            "Store each stage's output here, keyed by its inputs and config, and "
+            "skip stages whose inputs are unchanged."
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Resume from checkpoints in --checkpoint-dir (default: {DEFAULT_CHECKPOINT_DIR}).",
+    )
+    parser.add_argument(
+        "--force-stage",
+        choices=STAGES,
+        default=None,
+        help=(
+            "Recompute this stage and every stage after it, ignoring checkpoints "
+            f"(uses --checkpoint-dir, default: {DEFAULT_CHECKPOINT_DIR})."
+        ),
+    )
     args = parser.parse_args(argv)
 
+    checkpoint_dir = args.checkpoint_dir or (
+        DEFAULT_CHECKPOINT_DIR if args.resume or args.force_stage else None
+    )
+    if checkpoint_dir and args.incremental_state:
+        raise ValueError("Checkpoints cannot be combined with --incremental-state.")
+    if args.assignments_path and args.incremental_state:
+        raise ValueError(
+            "--assignments-path is not needed with --incremental-state; "
+            "the stored cluster index already keeps IDs stable."
+        )
+    if args.assignments_path and not args.collapse_catalog:
+        raise ValueError(
+            "--assignments-path requires --collapse-catalog; without it record IDs "
+            "are row positions, so shifted input rows would remap cluster IDs."
+        )
+    if args.threshold_from_tree and (
+        checkpoint_dir or args.incremental_state or args.auto_tune_thresholds
+    ):
+        raise ValueError(
+            "--threshold-from-tree cannot be combined with checkpoints, "
+            "--incremental-state or --auto-tune-thresholds."
+        )
+    runner = StageRunner(
+        CheckpointStore(checkpoint_dir) if checkpoint_dir else None,
+        force_stage=args.force_stage,
+    )
+
     input_path = args.input_path
-    raw = ingest(input_path)
-    normalized = normalize(raw)
-    features = extract(normalized)
+    collapse = args.collapse_catalog and not args.incremental_state
+    raw, catalog_summary = runner.run(
+        "ingest",
+        (file_digest(input_path) if runner.store else "", args.no_row_filters, collapse),
+        lambda: _ingest_stage(input_path, keep_all_rows=args.no_row_filters, collapse=collapse),
+    )
+    incremental_summary: dict[str, int] | None = None
+    tree: MergeTree | None = None
+    tree_summary: dict[str, object] | None = None
+    if args.threshold_from_tree:
+        tree_key = CheckpointStore.key(
+            "merge_tree",
+            file_digest(input_path),
+            args.no_row_filters,
+            collapse,
+            file_digest(_SYNONYM_PATH),
+            DEFAULT_EMBEDDING_MODEL,
+        )
+        tree = _load_merge_tree(args.threshold_from_tree, tree_key)
+        tree_summary = {"path": args.threshold_from_tree, "reused": tree is not None}
+    if args.incremental_state:
+        if args.auto_tune_thresholds:
+            raise ValueError("--auto-tune-thresholds cannot be combined with --incremental-state.")
+        state = load_state(args.incremental_state)
+        index = state["index"] or ClusterIndex(similarity_threshold=args.similarity_threshold)
+        if index.similarity_threshold != float(args.similarity_threshold):
+            raise ValueError(
+                "Incremental state was built with similarity threshold "
+                f"{index.similarity_threshold}; use a new --incremental-state directory."
+            )
+        dirty_cluster_ids, resynced = _resync_synonyms(index, state["synonym_map"])
+        delta = rows_after_watermark(raw, state["watermark"])
+        entities, _row_entity = collapse_catalog(delta)
+        new_entities = [entity for entity in entities if entity["record_id"] not in index]
+        new_features = extract(normalize(new_entities)) if new_entities else []
+        for feature, entity in zip(new_features, new_entities):
+            description = entity["Description"]
+            feature["description_raw"] = description if isinstance(description, str) else ""
+        dirty_cluster_ids.update(index.add(new_features))
+        clusters = index.clustered_records()
+        labels, confidences, relabelled = refresh_labels(
+            state["labels"], state["confidences"], index, dirty_cluster_ids
+        )
+        save_state(
+            args.incremental_state,
+            advance_watermark(delta, state["watermark"]),
+            index,
+            synonym_map=dict(_load_synonym_map()),
+            labels=labels,
+            confidences=confidences,
+        )
+        incremental_summary = {
+            "delta_rows": len(delta),
+            "new_entities": len(new_entities),
+            "total_entities": len(index),
+            "resynced_records": resynced,
+            "relabelled_clusters": len(relabelled),
+        }
+        features: list[dict] = []
+    elif tree is not None:
+        features = []
+    else:
+        normalized = runner.run("normalize", (file_digest(_SYNONYM_PATH),), lambda: normalize(raw))
+        features = runner.run("extract", (DEFAULT_EMBEDDING_MODEL,), lambda: extract(normalized))
+        if args.threshold_from_tree:
+            tree = build_merge_tree(features, source_key=tree_key)
+            tree.save(args.threshold_from_tree)
 
     selected_threshold = float(args.similarity_threshold)
     tuning_summary: dict[str, object] | None = None
@@ -108,12 +333,54 @@ def main(argv: list[str] | None = None) -> None:
         )
         selected_threshold = float(tuning_summary["best_threshold"])
 
-    clusters = cluster(features, similarity_threshold=selected_threshold)
-    labels = canonicalize(clusters)
-    report = evaluate(clusters, labels)
+    id_summary: dict[str, int] | None = None
+    if tree is not None:
+        clusters = tree.cut(selected_threshold)
+        tree_summary["merges"] = len(tree.similarity)
+    elif not args.incremental_state:
+        clusters = runner.run(
+            "cluster",
+            (selected_threshold,),
+            lambda: cluster(features, similarity_threshold=selected_threshold),
+        )
+    canonicalize_config: tuple = ()
+    if args.assignments_path:
+        canonicalize_config = (file_digest(args.assignments_path),)
+        clusters, stored_assignments, id_summary = match_cluster_ids(
+            clusters, load_assignments(args.assignments_path)
+        )
+        save_assignments(args.assignments_path, stored_assignments)
+    if tree is not None:
+        labels = canonicalize(clusters)
+    elif not args.incremental_state:
+        labels = runner.run("canonicalize", canonicalize_config, lambda: canonicalize(clusters))
+    report = runner.run("evaluate", (), lambda: evaluate(clusters, labels))
     if tuning_summary is not None:
         report["tuning"] = tuning_summary
     report["similarity_threshold"] = selected_threshold
+    if isinstance(raw, RecordBatch):
+        report["ingest_filters"] = raw.filter_counts
+    if catalog_summary is not None:
+        report["catalog"] = catalog_summary
+    if incremental_summary is not None:
+        report["incremental"] = incremental_summary
+    if tree_summary is not None:
+        report["merge_tree"] = tree_summary
+    if id_summary is not None:
+        report["cluster_ids"] = id_summary
+    if runner.reused:
+        report["checkpoints"] = {"reused": runner.reused}
+    if args.store_path:
+        if not args.incremental_state:
+            _labels, confidences = canonicalize_with_confidence(clusters)
+        store = AssignmentStore(args.store_path)
+        store.write_run(clusters, labels, confidences, report.get("suspect_clusters", []))
+        store.close()
+        if not args.incremental_state:
+            index = ClusterIndex.from_clustered_records(
+                clusters, similarity_threshold=selected_threshold
+            )
+        index.save(match_index_path(args.store_path))
     print("Report:", report)
 
 
@@ -2,45 +2,192 @@
 
 from __future__ import annotations
 
+from collections import Counter
+import asyncio
+import base64
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import hashlib
 from html import escape
+from itertools import islice
+import json
+import math
+import multiprocessing
+from multiprocessing.managers import SyncManager
 import os
+import queue
+import threading
 from tempfile import NamedTemporaryFile
+from typing import IO, Any
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import BaseModel, Field
 try:
     from openai import RateLimitError
 except ImportError:  # pragma: no cover - defensive when optional dependency missing
     RateLimitError = None  # type: ignore[assignment]
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pragma: no cover - python-multipart < 0.0.13 names the module multipart
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
 
+from src.arrow_result import ARROW_STREAM_MEDIA_TYPE, cluster_members, encode_evaluation
 from src.canonicalize import canonicalize
+from src.checkpoint import STAGES, CheckpointStore
 from src.cluster import cluster
+from src.cluster_index import ClusterIndex
+from src.embedding import (
+    DEFAULT_EMBEDDING_MODEL,
+    CachedEmbeddingProvider,
+    EmbeddingProvider,
+    OpenAIEmbeddingProvider,
+)
 from src.evaluate import evaluate
 from src.extract import extract
-from src.ingest import ingest
-from src.normalize import normalize
+from src.ingest import (
+    SUPPORTED_EXTENSIONS,
+    RecordBatch,
+    ingest,
+    ingest_records,
+    iter_json_array,
+    iter_ndjson,
+)
+from src.jobs import JobManager, JobQueueFull
+from src.merge_tree import MergeTree, build_merge_tree
+from src.normalize import Synonyms, current_synonyms, normalize, synonyms_digest
+from src.progress import CancelToken, PipelineCancelled, report, reporting_to
+from src.result_cache import ResultCache, payload_size
+from src.store import DEFAULT_STORE_PATH, AssignmentStore, match_index_path
 from src.synonym_suggestions import analyze_unmatched_tokens
 
-app = FastAPI(title="Smart Product Grouper API", version="0.1.0")
 INVALID_XLSX_DETAIL = (
     "Invalid xlsx file upload. Please provide a valid .xlsx workbook "
     "with required sheets/columns."
 )
+UNSUPPORTED_UPLOAD_DETAIL = (
+    f"Expected one of {', '.join(SUPPORTED_EXTENSIONS)} file upload."
+)
+STORE_PATH_ENV = "SPG_STORE_PATH"
+JOB_WORKERS = int(os.environ.get("SPG_JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.environ.get("SPG_JOB_QUEUE_LIMIT", "8"))
+JOB_RETENTION_SECONDS = float(os.environ.get("SPG_JOB_RETENTION_SECONDS", "3600"))
+RETRY_AFTER_SECONDS = 30
+SSE_POLL_SECONDS = 0.25
+JOB_EVENT_POLL_SECONDS = 0.1
+SSE_KEEPALIVE_SECONDS = 15.0
+DISCONNECT_POLL_SECONDS = 0.5
+# Non-standard status (as used by nginx) for a request the client abandoned.
+CLIENT_CLOSED_REQUEST = 499
+PIPELINE_WORKERS = int(os.environ.get("SPG_PIPELINE_WORKERS", "2"))
+MAX_UPLOAD_BYTES = int(os.environ.get("SPG_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+RESULT_CACHE_ENTRIES = int(os.environ.get("SPG_RESULT_CACHE_ENTRIES", "32"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("SPG_RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("SPG_RESULT_CACHE_TTL_SECONDS", "3600"))
+# Optional request header with the upload's SHA-256, so a saturated server
+# can tell a cached upload apart before reading its body.
+CONTENT_HASH_HEADER = "X-Content-SHA256"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Request Content-Type -> records body format for POST /cluster/records.
+RECORD_BODY_FORMATS = {
+    "application/json": "json",
+    NDJSON_MEDIA_TYPE: "ndjson",
+    "application/jsonl": "ndjson",
+}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+VIEW_PAGE_SIZE = 500
+MERGE_TREE_CACHE_SIZE = 8
+MERGE_TREE_CACHE_MAX_BYTES = int(
+    os.environ.get("SPG_MERGE_TREE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+# Pairs below this similarity are not stored in API merge trees, which keeps
+# them far from the O(n^2) all-pairs size; ?threshold= cannot go lower.
+MERGE_TREE_MIN_SIMILARITY = float(os.environ.get("SPG_MERGE_TREE_MIN_SIMILARITY", "0.5"))
+# `_merge_tree_key` -> (merge tree, unmatched token report), bounded by
+# count and by the trees' in-memory size; trees do not expire. Kept in the
+# server process: workers return the trees they build, and cuts of a cached
+# tree run here without a pipeline worker.
+_merge_trees = ResultCache(
+    max_entries=MERGE_TREE_CACHE_SIZE,
+    max_bytes=MERGE_TREE_CACHE_MAX_BYTES,
+    ttl_seconds=math.inf,
+)
+_stores: dict[str, AssignmentStore] = {}
+# Index path -> (file mtime, loaded index, labels by cluster ID).
+_match_indexes: dict[str, tuple[float, ClusterIndex, dict[int, str]]] = {}
+# Synchronous pipeline runs go to the process pool once the app has started;
+# the thread pool only serves when lifespan did not run (e.g. a bare TestClient).
+_process_pool: ProcessPoolExecutor | None = None
+# Hands out queues that pool workers can put job progress events on.
+_event_manager: SyncManager | None = None
+_thread_pool = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="spg-pipeline")
+_active_pipelines = 0
+_metrics: Counter[str] = Counter()
+_metrics_lock = threading.Lock()
+_results = ResultCache(
+    max_entries=RESULT_CACHE_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+)
+
+
+def _warm_worker() -> None:
+    """Import the heavy modules and compile synonym patterns in a pool worker."""
+    import openpyxl  # noqa: F401
+
+    current_synonyms()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Start and pre-warm the pipeline process pool; shut it down on exit."""
+    global _process_pool, _event_manager
+    pool = ProcessPoolExecutor(max_workers=PIPELINE_WORKERS)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(loop.run_in_executor(pool, _warm_worker) for _ in range(PIPELINE_WORKERS))
+    )
+    manager = multiprocessing.Manager()
+    _process_pool, _event_manager = pool, manager
+    try:
+        yield
+    finally:
+        _process_pool = _event_manager = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        manager.shutdown()
+
+
+app = FastAPI(title="Smart Product Grouper API", version="0.1.0", lifespan=lifespan)
+
+
+def _invalid_upload_detail(suffix: str) -> str:
+    """Return the 400 detail for an upload that failed ingest."""
+    if suffix == ".xlsx":
+        return INVALID_XLSX_DETAIL
+    return (
+        f"Invalid {suffix.lstrip('.')} file upload. Please provide a valid {suffix} "
+        "file with required columns."
+    )
 
 
 @app.get("/", response_class=HTMLResponse)
 async def upload_form() -> str:
-    """Render a minimal browser upload form for .xlsx files."""
-    return """<!doctype html>
+    """Render a minimal browser upload form for supported input files."""
+    return f"""<!doctype html>
 <html lang="en">
   <head>
     <meta charset="utf-8" />
     <title>Smart Product Grouper</title>
   </head>
   <body>
-    <h1>Upload .xlsx file</h1>
+    <h1>Upload product file</h1>
     <form method="post" action="/cluster/view" enctype="multipart/form-data">
-      <input type="file" name="file" accept=".xlsx" required />
+      <input type="file" name="file" accept="{','.join(SUPPORTED_EXTENSIONS)}" required />
       <button type="submit">Cluster</button>
     </form>
   </body>
@@ -48,109 +195,996 @@ async def upload_form() -> str:
 """
 
 
-async def _run_pipeline_from_upload(file: UploadFile) -> dict:
-    """Run pipeline for an uploaded workbook and return evaluation payload."""
-    filename = (file.filename or "").strip()
-    if not filename.lower().endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="Expected a .xlsx file upload.")
+def _merge_tree_key(content_key: str, synonyms: str) -> str:
+    """Cache key for an upload's merge tree under a synonyms.yml digest."""
+    return f"{content_key}:{synonyms}"
 
-    temp_path: str | None = None
-    stage = "upload_read"
+
+def _cached_merge_tree(tree_key: str) -> tuple[MergeTree, list] | None:
+    cached = _merge_trees.get(tree_key)
+    return cached[0] if cached is not None else None
+
+
+def _store_merge_tree(
+    tree_key: str, tree: MergeTree, unmatched_tokens: list, size: int | None = None
+) -> None:
+    if size is None:
+        size = tree.nbytes + payload_size(unmatched_tokens)
+    _merge_trees.put(tree_key, (tree, unmatched_tokens), size)
+
+
+def _upload_suffix(filename: str) -> str:
+    """Return the upload's lower-cased extension, rejecting unsupported ones."""
+    suffix = os.path.splitext(filename.strip())[1].lower()
+    if suffix not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_UPLOAD_DETAIL)
+    return suffix
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit.",
+    )
+
+
+async def _spool_chunks(chunks: AsyncIterator[bytes], suffix: str) -> tuple[str, str]:
+    """Stream ``chunks`` to a temp file; return its path and content SHA-256.
+
+    Hashing happens as the chunks are written, and the body is rejected with
+    413 as soon as it passes ``MAX_UPLOAD_BYTES``. Ingest then reads the
+    spooled file directly.
+    """
+    temp_path = None
     try:
-        content = await file.read()
-        with NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            tmp.write(content)
+        digest = hashlib.sha256()
+        written = 0
+        with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
             temp_path = tmp.name
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise _upload_too_large()
+                digest.update(chunk)
+                tmp.write(chunk)
+        return temp_path, digest.hexdigest()
+    except BaseException:
+        if temp_path is not None:
+            _remove_file(temp_path)
+        raise
 
-        try:
-            stage = "ingest"
-            raw = ingest(temp_path)
-        except Exception as exc:
-            raise HTTPException(
-                status_code=400,
-                detail=INVALID_XLSX_DETAIL,
-            ) from exc
 
-        try:
-            stage = "normalize"
-            normalized = normalize(raw)
-            stage = "extract"
-            features = extract(normalized)
-            stage = "cluster"
+def _check_content_length(request: Request) -> None:
+    """Refuse a declared body over ``MAX_UPLOAD_BYTES`` before reading any of it."""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise _upload_too_large()
+
+
+def _missing_upload() -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail="Expected a multipart/form-data body with a 'file' field.",
+    )
+
+
+class _FormFileSpooler:
+    """Multipart parser callbacks that write the ``file`` field to a temp file.
+
+    Other fields are skipped. The part's filename is checked against
+    `SUPPORTED_EXTENSIONS` before any of its bytes are written.
+    """
+
+    def __init__(self) -> None:
+        self.temp_path: str | None = None
+        self.suffix = ""
+        self.digest = hashlib.sha256()
+        self._handle: IO[bytes] | None = None
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict[str, Callable]:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self.close,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") != b"file" or self.temp_path is not None:
+            return
+        self.suffix = _upload_suffix(options.get(b"filename", b"").decode("utf-8", "replace"))
+        # Stays open across part-data callbacks; `close` runs on part end or failure.
+        self._handle = NamedTemporaryFile(delete=False, suffix=self.suffix)  # noqa: SIM115
+        self.temp_path = self._handle.name
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._handle is not None:
+            chunk = data[start:end]
+            self.digest.update(chunk)
+            self._handle.write(chunk)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+async def _spool_form_upload(request: Request) -> tuple[str, str, str]:
+    """Stream a multipart upload's ``file`` field to a temp file.
+
+    Returns the temp path, the file's extension and its content SHA-256.
+    The body is parsed from ``request.stream()`` in the handler; a
+    ``File(...)`` parameter would have Starlette read and spool the whole
+    form before any limit could apply. A Content-Length over
+    ``MAX_UPLOAD_BYTES`` is refused with 413 before anything is read, and
+    the running body size is checked on every chunk. The file part is
+    written once, to the temp file that ingest reads.
+    """
+    _check_content_length(request)
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise _missing_upload()
+    spooler = _FormFileSpooler()
+    try:
+        parser = MultipartParser(boundary, spooler.callbacks())
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_UPLOAD_BYTES:
+                raise _upload_too_large()
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException as exc:
+        spooler.close()
+        if spooler.temp_path is not None:
+            _remove_file(spooler.temp_path)
+        if isinstance(exc, FormParserError):
+            raise HTTPException(status_code=400, detail="Invalid multipart body.") from exc
+        raise
+    spooler.close()
+    if spooler.temp_path is None:
+        raise _missing_upload()
+    return spooler.temp_path, spooler.suffix, spooler.digest.hexdigest()
+
+
+# Documents the form that `_spool_form_upload` parses, since the handlers
+# read it from the raw body instead of declaring a File(...) parameter.
+_UPLOAD_FORM_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+def _ingest_body(temp_path: str, body_format: str) -> RecordBatch:
+    """Parse a spooled JSON array or NDJSON records body into a record batch."""
+    with open(temp_path, encoding="utf-8") as handle:
+        records = iter_ndjson(handle) if body_format == "ndjson" else iter_json_array(handle)
+        return ingest_records(records)
+
+
+def _evaluate_clusters(
+    clusters: list[dict], unmatched_tokens: list, enter: Callable[[str], None]
+) -> dict:
+    """Label and evaluate clustered records (the canonicalize and evaluate stages)."""
+    report("records", count=len(clusters))
+    enter("canonicalize")
+    labels = canonicalize(clusters)
+    enter("evaluate")
+    evaluation = evaluate(clusters, labels)
+    evaluation["unmatched_tokens"] = unmatched_tokens
+    return evaluation
+
+
+def _cut_merge_tree(
+    entry: tuple[MergeTree, list],
+    threshold: float,
+    on_stage: Callable[[str], None] | None = None,
+) -> tuple[dict, list[dict]]:
+    """Cut a merge tree at ``threshold``; return the evaluation and clustered records."""
+    tree, unmatched_tokens = entry
+    enter = on_stage or (lambda _name: None)
+    enter("cluster")
+    clusters = tree.cut(threshold)
+    return _evaluate_clusters(clusters, unmatched_tokens, enter), clusters
+
+
+def _run_pipeline_stages(
+    temp_path: str,
+    suffix: str,
+    content_key: str,
+    threshold: float | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    *,
+    body_format: str | None = None,
+    synonyms: Synonyms | None = None,
+) -> tuple[dict, list[dict], tuple[MergeTree, list] | None]:
+    """Run the pipeline on a spooled upload.
+
+    Returns the evaluation, the clustered records and, with ``threshold``,
+    the merge tree built for the upload with its unmatched token report.
+
+    ``body_format`` ("json" or "ndjson") marks a spooled records body, which
+    is parsed incrementally by `ingest_records` instead of `ingest`.
+    ``synonyms`` (default: `current_synonyms`) is the synonyms.yml version
+    used for the whole run.
+
+    With ``threshold``, clusters come from a single-linkage merge tree; the
+    caller caches it per upload content and synonyms version so re-posting
+    the same file at another threshold only needs `_cut_merge_tree`.
+    ``on_stage`` is called as each stage starts. Failures are raised as
+    `HTTPException`.
+    """
+    synonyms = synonyms or current_synonyms()
+    stage = "upload_read"
+
+    def enter(name: str) -> None:
+        nonlocal stage
+        stage = name
+        if on_stage is not None:
+            on_stage(name)
+
+    enter("ingest")
+    try:
+        if body_format is None:
+            raw = ingest(temp_path, use_cache=False)
+        else:
+            raw = _ingest_body(temp_path, body_format)
+    except Exception as exc:
+        if body_format is not None:
+            detail = f"Invalid {body_format} records body: {exc}"
+        else:
+            detail = _invalid_upload_detail(suffix)
+        raise HTTPException(status_code=400, detail=detail) from exc
+
+    try:
+        report("records", count=len(raw))
+        enter("normalize")
+        normalized = normalize(raw, synonyms)
+        enter("extract")
+        features = extract(normalized)
+        report("records", count=len(features))
+        enter("cluster")
+        unmatched_tokens = analyze_unmatched_tokens(raw)
+        if threshold is None:
             clusters = cluster(features)
-            stage = "canonicalize"
-            labels = canonicalize(clusters)
-            stage = "evaluate"
-            evaluation = evaluate(clusters, labels)
-            evaluation["unmatched_tokens"] = analyze_unmatched_tokens(raw)
-            return evaluation
-        except ValueError as exc:
-            if "OPENAI_API_KEY" in str(exc):
-                raise HTTPException(
-                    status_code=500,
-                    detail="Server is missing OPENAI_API_KEY for embeddings.",
-                ) from exc
-            raise HTTPException(status_code=400, detail=f"Invalid input data: {exc}") from exc
-        except HTTPException:
-            raise
-        except Exception as exc:
-            if stage == "extract" and (
-                (RateLimitError is not None and isinstance(exc, RateLimitError))
-                or "insufficient_quota" in str(exc).lower()
-                or type(exc).__name__ == "RateLimitError"
-            ):
-                raise HTTPException(
-                    status_code=503,
-                    detail=(
-                        "Embedding provider quota/rate limit reached. "
-                        "Check OPENAI_API_KEY billing/quota and retry."
-                    ),
-                ) from exc
+            return _evaluate_clusters(clusters, unmatched_tokens, enter), clusters, None
+        tree = build_merge_tree(features, min_similarity=MERGE_TREE_MIN_SIMILARITY)
+        evaluation, clusters = _cut_merge_tree((tree, unmatched_tokens), threshold, enter)
+        return evaluation, clusters, (tree, unmatched_tokens)
+    except ValueError as exc:
+        if "OPENAI_API_KEY" in str(exc):
             raise HTTPException(
                 status_code=500,
-                detail="Unexpected server error while processing upload.",
+                detail="Server is missing OPENAI_API_KEY for embeddings.",
             ) from exc
+        raise HTTPException(status_code=400, detail=f"Invalid input data: {exc}") from exc
+    except (HTTPException, PipelineCancelled):
+        raise
+    except Exception as exc:
+        if stage == "extract" and (
+            (RateLimitError is not None and isinstance(exc, RateLimitError))
+            or "insufficient_quota" in str(exc).lower()
+            or type(exc).__name__ == "RateLimitError"
+        ):
+            raise HTTPException(
+                status_code=503,
+                detail=(
+                    "Embedding provider quota/rate limit reached. "
+                    "Check OPENAI_API_KEY billing/quota and retry."
+                ),
+            ) from exc
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected server error while processing upload.",
+        ) from exc
+
+
+def _count(name: str) -> None:
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def _pipeline_worker(
+    temp_path: str,
+    suffix: str,
+    content_key: str,
+    threshold: float | None,
+    body_format: str | None = None,
+    token: CancelToken | None = None,
+    events: Any = None,
+) -> tuple:
+    """Pool entry point: `HTTPException` does not pickle, so return it as data.
+
+    ``token`` is checked at every stage boundary and progress checkpoint
+    (embedding batch, similarity tile); a cancelled run returns
+    ``("cancelled",)``. Stage changes and progress reports are put on
+    ``events`` (a queue, possibly a manager proxy) as ``(kind, data)``.
+    A successful run returns ``("ok", evaluation, members, size, digest,
+    tree)``: ``digest`` is the synonyms.yml version the run used, so the
+    caller caches the result under that version, and ``tree`` is the
+    ``(merge tree, unmatched tokens, size)`` built for a ``threshold`` run
+    (else None), for the caller's merge-tree cache.
+    """
+    synonyms = current_synonyms()
+
+    def checkpoint(kind: str, data: dict[str, Any]) -> None:
+        if token is not None:
+            token.raise_if_cancelled()
+        if events is not None:
+            events.put((kind, data))
+
+    try:
+        with reporting_to(checkpoint):
+            evaluation, clusters, tree_entry = _run_pipeline_stages(
+                temp_path,
+                suffix,
+                content_key,
+                threshold,
+                lambda name: checkpoint("stage", {"stage": name}),
+                body_format=body_format,
+                synonyms=synonyms,
+            )
+        members = cluster_members(clusters)
+        # Sizes are measured here so the JSON encoding stays off the event loop.
+        tree = None
+        if tree_entry is not None:
+            tree = (*tree_entry, tree_entry[0].nbytes + payload_size(tree_entry[1]))
+        return (
+            "ok",
+            evaluation,
+            members,
+            payload_size((evaluation, members)),
+            synonyms.digest,
+            tree,
+        )
+    except PipelineCancelled:
+        return ("cancelled",)
+    except HTTPException as exc:
+        return ("error", exc.status_code, exc.detail, exc.headers)
+
+
+def _tree_cut_outcome(entry: tuple[MergeTree, list], threshold: float, synonyms: str) -> tuple:
+    """`_pipeline_worker`-shaped outcome for a cut of a cached merge tree."""
+    evaluation, clusters = _cut_merge_tree(entry, threshold)
+    members = cluster_members(clusters)
+    return ("ok", evaluation, members, payload_size((evaluation, members)), synonyms, None)
+
+
+def _keep_merge_tree(content_key: str, outcome: tuple) -> None:
+    """Cache the merge tree a successful worker outcome carries, if any."""
+    if outcome[0] == "ok" and outcome[5] is not None:
+        _store_merge_tree(_merge_tree_key(content_key, outcome[4]), *outcome[5])
+
+
+def _pipeline_executor() -> Executor:
+    return _process_pool if _process_pool is not None else _thread_pool
+
+
+def _run_job(
+    temp_path: str,
+    suffix: str,
+    content_key: str,
+    threshold: float | None,
+    token: CancelToken,
+    on_stage: Callable[[str], None],
+) -> dict:
+    """Job body: run the pipeline on the pipeline pool, relaying its progress.
+
+    The job thread only waits on the worker's event queue and replays each
+    event through ``on_stage`` / `report`, so the job's progress and cancel
+    checks stay on the job thread while the work itself runs in another
+    process. A ``threshold`` run whose merge tree is already cached is cut
+    on the job thread without a worker.
+    """
+    if threshold is not None:
+        cached_tree = _cached_merge_tree(_merge_tree_key(content_key, synonyms_digest()))
+        if cached_tree is not None:
+            return _cut_merge_tree(cached_tree, threshold, on_stage)[0]
+    events: Any = _event_manager.Queue() if _event_manager is not None else queue.Queue()
+    future = _pipeline_executor().submit(
+        _pipeline_worker, temp_path, suffix, content_key, threshold, None, token, events
+    )
+    try:
+        # Workers put events synchronously, so once the future is done and
+        # the queue is drained every event has been replayed.
+        while True:
+            try:
+                kind, data = events.get(timeout=JOB_EVENT_POLL_SECONDS)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            if kind == "stage":
+                on_stage(data["stage"])
+            else:
+                report(kind, **data)
+    except PipelineCancelled:
+        token.cancel()
+        # Wait for the worker to stop before the job's cleanup removes its input.
+        wait((future,))
+        raise
+    outcome = future.result()
+    _keep_merge_tree(content_key, outcome)
+    if outcome[0] == "cancelled":
+        raise PipelineCancelled(token.marker_path)
+    if outcome[0] == "error":
+        _, status_code, detail, headers = outcome
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+    return outcome[1]
+
+
+def _server_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy processing other uploads. Retry later.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def _result_key(content_key: str, threshold: float | None, synonyms: str) -> str:
+    """Cache key for an upload's result under a synonyms.yml digest and the current model."""
+    return CheckpointStore.key(
+        "api_result",
+        content_key,
+        threshold,
+        synonyms,
+        DEFAULT_EMBEDDING_MODEL,
+    )
+
+
+def _cache_can_serve(content_key: str, threshold: float | None) -> bool:
+    """Whether a cached result or merge tree answers ``content_key`` without a worker."""
+    synonyms = synonyms_digest()
+    if _results.get(_result_key(content_key, threshold, synonyms)) is not None:
+        return True
+    return (
+        threshold is not None
+        and _cached_merge_tree(_merge_tree_key(content_key, synonyms)) is not None
+    )
+
+
+def _reject_if_saturated(
+    request: Request, threshold: float | None, key_prefix: str = ""
+) -> None:
+    """Refuse an upload with 503 before its body is read when no worker is free.
+
+    The one exception is a request whose ``X-Content-SHA256`` header names
+    content the caches can serve; its body is still read and hashed, and the
+    lookup uses that hash, not the header.
+    """
+    if _active_pipelines < PIPELINE_WORKERS:
+        return
+    claimed = request.headers.get(CONTENT_HASH_HEADER, "").strip().lower()
+    if claimed and _cache_can_serve(f"{key_prefix}{claimed}", threshold):
+        return
+    _count("pipelines_rejected")
+    raise _server_busy()
+
+
+async def _run_pipeline_from_upload(
+    request: Request,
+    threshold: float | None = None,
+    response: Response | None = None,
+) -> tuple[dict, dict[int, list[str]], str | None]:
+    """Spool a request's uploaded file and run the pipeline on it (see `_run_spooled`)."""
+    _reject_if_saturated(request, threshold)
+    temp_path, suffix, content_key = await _spool_form_upload(request)
+    return await _run_spooled(
+        temp_path, suffix, content_key, threshold, response, request=request
+    )
+
+
+async def _cancel_on_disconnect(request: Request, token: CancelToken) -> None:
+    """Cancel ``token`` once the client goes away."""
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def _run_spooled(
+    temp_path: str,
+    suffix: str,
+    content_key: str,
+    threshold: float | None,
+    response: Response | None,
+    body_format: str | None = None,
+    *,
+    request: Request | None = None,
+) -> tuple[dict, dict[int, list[str]], str | None]:
+    """Run the pipeline on a spooled file off the event loop, then remove it.
+
+    Returns the evaluation payload, record IDs per cluster and the
+    result-cache key, which is None when the result was too large to cache
+    (so no cursor can point at it).
+
+    Results are cached by content, threshold, synonym file and embedding
+    model, so a repeated upload skips the pipeline; ``X-Cache``,
+    ``X-Cache-Key`` and ``X-Cache-Age`` on ``response`` describe the lookup.
+    A ``threshold`` run whose merge tree is cached is cut in this process
+    without a worker. At most ``PIPELINE_WORKERS`` uploads run at once;
+    callers refuse uploads with `_reject_if_saturated` before spooling, and
+    a miss that finds every worker taken by now is refused here with 503 and
+    ``Retry-After``. When ``request``'s client disconnects, the worker stops
+    at its next checkpoint and the request ends with 499.
+
+    A fresh result is stored under the synonyms version the worker actually
+    used, which differs from the looked-up key if synonyms.yml changed
+    during the run.
+    """
+    global _active_pipelines
+    token = CancelToken(f"{temp_path}.cancel")
+    try:
+        synonyms = synonyms_digest()
+        result_key = _result_key(content_key, threshold, synonyms)
+        cached = _results.get(result_key)
+        if cached is not None:
+            _count("result_cache_hits")
+            (evaluation, members), age = cached
+            _set_cache_headers(response, "hit", result_key, age)
+            return evaluation, members, result_key
+        _count("result_cache_misses")
+        cached_tree = (
+            _cached_merge_tree(_merge_tree_key(content_key, synonyms))
+            if threshold is not None
+            else None
+        )
+        if cached_tree is not None:
+            _count("merge_tree_cuts")
+            outcome = await asyncio.get_running_loop().run_in_executor(
+                _thread_pool, _tree_cut_outcome, cached_tree, threshold, synonyms
+            )
+            return _finish_outcome(outcome, content_key, threshold, response)
+        if _active_pipelines >= PIPELINE_WORKERS:
+            _count("pipelines_rejected")
+            raise _server_busy()
+        _active_pipelines += 1
+        _count("pipelines_started")
+        watcher = (
+            asyncio.create_task(_cancel_on_disconnect(request, token))
+            if request is not None
+            else None
+        )
+        try:
+            outcome = await asyncio.get_running_loop().run_in_executor(
+                _pipeline_executor(),
+                _pipeline_worker,
+                temp_path,
+                suffix,
+                content_key,
+                threshold,
+                body_format,
+                token,
+            )
+        finally:
+            _active_pipelines -= 1
+            if watcher is not None:
+                watcher.cancel()
     finally:
-        await file.close()
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        _remove_file(temp_path)
+        token.discard()
+    _keep_merge_tree(content_key, outcome)
+    if outcome[0] == "ok":
+        _count("pipelines_succeeded")
+    return _finish_outcome(outcome, content_key, threshold, response)
 
 
-@app.post("/cluster")
-async def cluster_from_xlsx(file: UploadFile = File(...)) -> dict:
-    """Accept an xlsx upload and return pipeline evaluation JSON."""
-    return await _run_pipeline_from_upload(file)
+def _finish_outcome(
+    outcome: tuple, content_key: str, threshold: float | None, response: Response | None
+) -> tuple[dict, dict[int, list[str]], str | None]:
+    """Raise a failed outcome as `HTTPException`; cache and return a successful one."""
+    if outcome[0] == "cancelled":
+        _count("pipelines_cancelled")
+        raise HTTPException(
+            status_code=CLIENT_CLOSED_REQUEST,
+            detail="Client disconnected; pipeline run cancelled.",
+        )
+    if outcome[0] == "error":
+        _count("pipelines_failed")
+        _, status_code, detail, headers = outcome
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+    _, evaluation, members, size, used_synonyms, _tree = outcome
+    result_key = _result_key(content_key, threshold, used_synonyms)
+    stored = _results.put(result_key, (evaluation, members), size)
+    _set_cache_headers(response, "miss", result_key, 0.0)
+    return evaluation, members, result_key if stored else None
+
+
+def _set_cache_headers(
+    response: Response | None, status: str, result_key: str, age: float
+) -> None:
+    if response is None:
+        return
+    response.headers["X-Cache"] = status
+    response.headers["X-Cache-Key"] = result_key
+    response.headers["X-Cache-Age"] = f"{age:.3f}"
+
 
+def _cache_headers(response: Response) -> dict[str, str]:
+    return {key: value for key, value in response.headers.items() if key.startswith("x-cache")}
 
-@app.post("/cluster/view", response_class=HTMLResponse)
-async def cluster_table_view(file: UploadFile = File(...)) -> str:
-    """Accept an xlsx upload and render clustered groups as an HTML table."""
-    evaluation = await _run_pipeline_from_upload(file)
+
+def _cluster_rows(evaluation: dict, start: int = 0, stop: int | None = None) -> Iterator[dict]:
+    """Yield one summary dict per cluster, in cluster ID order, for ``[start:stop]``."""
     cluster_sizes = evaluation.get("cluster_sizes", {})
     labels = evaluation.get("labels", {})
-    suspect_clusters = evaluation.get("suspect_clusters", [])
-    suspect_by_id = {
-        str(entry.get("cluster_id")) for entry in suspect_clusters if entry.get("cluster_id") is not None
+    suspects = {
+        str(entry["cluster_id"]): entry
+        for entry in evaluation.get("suspect_clusters", [])
+        if entry.get("cluster_id") is not None
     }
+    for cluster_id in islice(sorted(cluster_sizes, key=int), start, stop):
+        suspect = suspects.get(str(cluster_id))
+        yield {
+            "cluster_id": int(cluster_id),
+            "label": str(labels.get(str(cluster_id), "")),
+            "size": cluster_sizes[cluster_id],
+            "suspect": suspect is not None,
+            "reasons": suspect["reasons"] if suspect else [],
+            "risk_score": suspect.get("risk_score") if suspect else None,
+        }
+
+
+def _encode_cursor(result_key: str, offset: int) -> str:
+    payload = json.dumps({"key": result_key, "offset": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
 
-    sorted_cluster_ids = sorted(cluster_sizes.keys(), key=int)
-    rows = []
-    for cluster_id in sorted_cluster_ids:
-        label = str(labels.get(cluster_id, ""))
-        size = cluster_sizes.get(cluster_id, 0)
-        suspect = "Yes" if cluster_id in suspect_by_id else "No"
-        rows.append(
-            "<tr>"
-            f"<td>{escape(str(cluster_id))}</td>"
-            f"<td>{escape(label)}</td>"
-            f"<td>{escape(str(size))}</td>"
-            f"<td>{suspect}</td>"
-            "</tr>"
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        result_key, offset = str(payload["key"]), int(payload["offset"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from exc
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return result_key, offset
+
+
+def _cached_result(result_key: str) -> dict:
+    cached = _results.get(result_key)
+    if cached is None:
+        raise HTTPException(
+            status_code=410,
+            detail="Result is no longer cached. Upload the file again.",
         )
+    return cached[0][0]
+
+
+def _cluster_page(evaluation: dict, result_key: str | None, offset: int, limit: int) -> dict:
+    """One page of cluster summaries with a cursor to the next page.
+
+    Without a ``result_key`` (the result is not cached) there is nothing a
+    cursor could resume from, so every remaining cluster is returned.
+    """
+    if result_key is None:
+        limit = len(evaluation.get("cluster_sizes", {}))
+    clusters = list(_cluster_rows(evaluation, offset, offset + limit))
+    total = len(evaluation.get("cluster_sizes", {}))
+    next_offset = offset + len(clusters)
+    return {
+        "num_records": evaluation.get("num_records", 0),
+        "num_clusters": total,
+        "clusters": clusters,
+        "next_cursor": _encode_cursor(result_key, next_offset) if next_offset < total else None,
+    }
+
+
+def _ndjson_response(evaluation: dict, headers: dict[str, str]) -> StreamingResponse:
+    """Stream one JSON cluster summary per line, encoded as the client reads."""
+    lines = (json.dumps(row) + "\n" for row in _cluster_rows(evaluation))
+    return StreamingResponse(
+        lines,
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={
+            **headers,
+            "X-Num-Records": str(evaluation.get("num_records", 0)),
+            "X-Num-Clusters": str(evaluation.get("num_clusters", 0)),
+        },
+    )
+
+
+_THRESHOLD_QUERY = Query(
+    default=None,
+    ge=MERGE_TREE_MIN_SIMILARITY,
+    le=1.0,
+    description="Cut a cached single-linkage merge tree at this similarity threshold.",
+)
+
+
+def _describe_job_error(exc: Exception) -> dict:
+    if isinstance(exc, HTTPException):
+        return {"status_code": exc.status_code, "detail": exc.detail}
+    return {"status_code": 500, "detail": "Unexpected server error while processing upload."}
+
+
+jobs = JobManager(
+    max_workers=JOB_WORKERS,
+    max_pending=JOB_QUEUE_LIMIT,
+    retention_seconds=JOB_RETENTION_SECONDS,
+    describe_error=_describe_job_error,
+)
+
+
+def _queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Job queue is full. Retry later.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.post("/jobs", status_code=202, openapi_extra=_UPLOAD_FORM_OPENAPI)
+async def submit_job(
+    request: Request,
+    threshold: float | None = _THRESHOLD_QUERY,
+) -> dict:
+    """Queue a pipeline run for an upload and return its job ID immediately."""
+    if not jobs.has_capacity():
+        raise _queue_full()
+    temp_path, suffix, content_key = await _spool_form_upload(request)
+    token = CancelToken(f"{temp_path}.cancel")
+
+    def cleanup() -> None:
+        _remove_file(temp_path)
+        token.discard()
+
+    try:
+        job_id = jobs.submit(
+            lambda on_stage: _run_job(temp_path, suffix, content_key, threshold, token, on_stage),
+            stages=STAGES,
+            cleanup=cleanup,
+            on_cancel=token.cancel,
+        )
+    except JobQueueFull as exc:
+        _remove_file(temp_path)
+        raise _queue_full() from exc
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str) -> dict:
+    """Return job status, per-stage progress and, once finished, its result or error."""
+    snapshot = jobs.get(job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id!r}.")
+    return snapshot
+
+
+def _sse_message(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> StreamingResponse:
+    """Stream a job's progress as Server-Sent Events until it finishes.
+
+    Events are ``status``, ``stage``, ``records``, ``embedding_batch`` and
+    ``similarity_tile``; progress events carry ``done``/``total``, the
+    seconds spent in the stage and ``per_second``. Reconnecting with
+    ``Last-Event-ID`` resumes after that event. A job keeps its newest 2000
+    events; a client that falls further behind first gets a ``gap`` event
+    with the number it missed.
+    """
+    bus = jobs.events(job_id)
+    if bus is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id!r}.")
+    last_seen = request.headers.get("last-event-id", "")
+    seq = int(last_seen) if last_seen.lstrip("-").isdigit() else -1
+
+    async def stream() -> AsyncIterator[str]:
+        nonlocal seq
+        idle = 0.0
+        while True:
+            events, closed = bus.since(seq)
+            for event in events:
+                seq = event["seq"]
+                yield _sse_message(event)
+            if closed:
+                return
+            if events:
+                idle = 0.0
+            elif idle >= SSE_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(SSE_POLL_SECONDS)
+            idle += SSE_POLL_SECONDS
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str) -> dict:
+    """Cancel a queued or running job (running jobs stop at the next stage)."""
+    snapshot = jobs.cancel(job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id!r}.")
+    return snapshot
+
+
+_LIMIT_QUERY = Query(
+    default=None,
+    ge=1,
+    le=MAX_PAGE_SIZE,
+    description="Return the first page of this many clusters with a next_cursor.",
+)
+
 
+@app.post("/cluster", response_model=None, openapi_extra=_UPLOAD_FORM_OPENAPI)
+async def cluster_from_xlsx(
+    request: Request,
+    response: Response,
+    threshold: float | None = _THRESHOLD_QUERY,
+    limit: int | None = _LIMIT_QUERY,
+) -> dict | StreamingResponse:
+    """Accept a product file upload and return pipeline evaluation JSON.
+
+    ``Accept: application/x-ndjson`` streams one cluster per line instead,
+    ``Accept: application/vnd.apache.arrow.stream`` returns a columnar Arrow
+    IPC stream, and ``limit`` returns a cursor-paginated page of clusters.
+    """
+    evaluation, members, result_key = await _run_pipeline_from_upload(
+        request, threshold, response
+    )
+    return _cluster_response(request, response, evaluation, members, result_key, limit)
+
+
+def _cluster_response(
+    request: Request,
+    response: Response,
+    evaluation: dict,
+    members: dict[int, list[str]],
+    result_key: str | None,
+    limit: int | None,
+) -> dict | Response:
+    """Encode a result as NDJSON, Arrow, a JSON page or full JSON, per the request."""
+    accept = request.headers.get("accept", "")
+    if NDJSON_MEDIA_TYPE in accept:
+        return _ndjson_response(evaluation, _cache_headers(response))
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        try:
+            content = encode_evaluation(evaluation, members)
+        except ImportError as exc:
+            raise HTTPException(status_code=406, detail=str(exc)) from exc
+        return Response(
+            content, media_type=ARROW_STREAM_MEDIA_TYPE, headers=_cache_headers(response)
+        )
+    if limit is not None:
+        return _cluster_page(evaluation, result_key, 0, limit)
+    return evaluation
+
+
+async def _body_chunks(request: Request) -> AsyncIterator[bytes]:
+    async for chunk in request.stream():
+        if chunk:
+            yield chunk
+
+
+@app.post("/cluster/records", response_model=None)
+async def cluster_from_records(
+    request: Request,
+    response: Response,
+    threshold: float | None = _THRESHOLD_QUERY,
+    limit: int | None = _LIMIT_QUERY,
+) -> dict | Response:
+    """Cluster records sent as a JSON array or NDJSON body, without a file upload.
+
+    Each record needs ``StockCode`` and ``Description`` and may carry a
+    ``record_id``. The body is streamed to disk and parsed incrementally in
+    the pipeline worker; the response is negotiated as for ``/cluster``.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body_format = RECORD_BODY_FORMATS.get(media_type)
+    if body_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Expected one of {', '.join(RECORD_BODY_FORMATS)} request body.",
+        )
+    _check_content_length(request)
+    key_prefix = f"{body_format}-records:"
+    _reject_if_saturated(request, threshold, key_prefix)
+    suffix = f".{body_format}"
+    temp_path, digest = await _spool_chunks(_body_chunks(request), suffix)
+    evaluation, members, result_key = await _run_spooled(
+        temp_path,
+        suffix,
+        f"{key_prefix}{digest}",
+        threshold,
+        response,
+        body_format,
+        request=request,
+    )
+    return _cluster_response(request, response, evaluation, members, result_key, limit)
+
+
+@app.get("/cluster/pages")
+def cluster_page(
+    cursor: str,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> dict:
+    """Return the page of clusters at ``cursor`` from a cached upload result."""
+    result_key, offset = _decode_cursor(cursor)
+    return _cluster_page(_cached_result(result_key), result_key, offset, limit)
+
+
+_PAGE_SIZE_QUERY = Query(default=VIEW_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+def _render_cluster_table(
+    evaluation: dict, result_key: str | None, offset: int, page_size: int
+) -> str:
+    """Render one page of the cluster table with previous/next links.
+
+    An uncached result (no ``result_key``) has no pages to link to, so the
+    whole table is rendered.
+    """
+    total = len(evaluation.get("cluster_sizes", {}))
+    if result_key is None:
+        page_size = total
+    rows = [
+        "<tr>"
+        f"<td>{escape(str(row['cluster_id']))}</td>"
+        f"<td>{escape(row['label'])}</td>"
+        f"<td>{escape(str(row['size']))}</td>"
+        f"<td>{'Yes' if row['suspect'] else 'No'}</td>"
+        "</tr>"
+        for row in _cluster_rows(evaluation, offset, offset + page_size)
+    ]
     table_rows = "".join(rows) or (
         '<tr><td colspan="4">No clusters found.</td></tr>'
     )
+    links = []
+    page_url = "/cluster/view/pages?cursor={cursor}&amp;page_size=" + str(page_size)
+    if result_key is not None and offset > 0:
+        previous = _encode_cursor(result_key, max(offset - page_size, 0))
+        links.append(f'<a href="{page_url.format(cursor=previous)}">Previous</a>')
+    if result_key is not None and offset + len(rows) < total:
+        following = _encode_cursor(result_key, offset + len(rows))
+        links.append(f'<a href="{page_url.format(cursor=following)}">Next</a>')
+    shown = f"{offset + 1}-{offset + len(rows)}" if rows else "0"
     return f"""<!doctype html>
 <html lang="en">
   <head>
@@ -159,6 +1193,7 @@ async def cluster_table_view(file: UploadFile = File(...)) -> str:
   </head>
   <body>
     <h1>Cluster Groups</h1>
+    <p>Clusters {shown} of {total}</p>
     <table border="1" cellspacing="0" cellpadding="6">
       <thead>
         <tr>
@@ -172,7 +1207,175 @@ async def cluster_table_view(file: UploadFile = File(...)) -> str:
         {table_rows}
       </tbody>
     </table>
+    <p>{" | ".join(links)}</p>
     <p><a href="/">Upload another file</a></p>
   </body>
 </html>
 """
+
+
+@app.post("/cluster/view", response_class=HTMLResponse, openapi_extra=_UPLOAD_FORM_OPENAPI)
+async def cluster_table_view(
+    request: Request,
+    response: Response,
+    threshold: float | None = _THRESHOLD_QUERY,
+    page_size: int = _PAGE_SIZE_QUERY,
+) -> str:
+    """Accept a product file upload and render the first page of its cluster table."""
+    evaluation, _, result_key = await _run_pipeline_from_upload(
+        request, threshold, response
+    )
+    return _render_cluster_table(evaluation, result_key, 0, page_size)
+
+
+@app.get("/cluster/view/pages", response_class=HTMLResponse)
+def cluster_table_page(cursor: str, page_size: int = _PAGE_SIZE_QUERY) -> str:
+    """Render the cluster table page at ``cursor`` from a cached upload result."""
+    result_key, offset = _decode_cursor(cursor)
+    return _render_cluster_table(_cached_result(result_key), result_key, offset, page_size)
+
+
+@app.get("/metrics")
+def metrics() -> dict:
+    """Counters for synchronous pipeline runs, the result cache and background jobs."""
+    with _metrics_lock:
+        counters = dict(_metrics)
+    return {
+        "pipelines": {
+            "active": _active_pipelines,
+            **{
+                name: counters.get(f"pipelines_{name}", 0)
+                for name in ("started", "succeeded", "failed", "cancelled", "rejected")
+            },
+        },
+        "result_cache": {
+            "hits": counters.get("result_cache_hits", 0),
+            "misses": counters.get("result_cache_misses", 0),
+            "entries": len(_results),
+            "bytes": _results.total_bytes,
+        },
+        "jobs": jobs.stats(),
+    }
+
+
+def _missing_store(path: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=f"No stored results. Run `python run.py <input> --store-path {path}` first.",
+    )
+
+
+def _assignment_store() -> AssignmentStore:
+    """Store written by `run.py --store-path` (path from SPG_STORE_PATH)."""
+    path = os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH)
+    if not os.path.exists(path):
+        raise _missing_store(path)
+    if path not in _stores:
+        _stores[path] = AssignmentStore(path)
+    return _stores[path]
+
+
+@app.get("/records/{record_id}")
+def stored_record(record_id: str) -> dict:
+    """Return one stored record with its cluster label, confidence and suspect flag."""
+    record = _assignment_store().record(record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown record_id {record_id!r}.")
+    return record
+
+
+@app.get("/records")
+def stored_records_by_stock_code(
+    stock_code: str = Query(..., min_length=1),
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> dict:
+    """Return stored records with the given stock code."""
+    return {"records": _assignment_store().records_by_stock_code(stock_code, limit=limit)}
+
+
+@app.get("/clusters/{cluster_id}")
+def stored_cluster(cluster_id: int) -> dict:
+    """Return one stored cluster with its members."""
+    cluster_entry = _assignment_store().cluster(cluster_id)
+    if cluster_entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cluster_id {cluster_id}.")
+    return cluster_entry
+
+
+@app.get("/clusters")
+def stored_clusters_by_label(
+    label_prefix: str = Query(default=""),
+    limit: int = Query(default=50, ge=1, le=1000),
+) -> dict:
+    """Return stored clusters whose label starts with ``label_prefix``."""
+    return {
+        "clusters": _assignment_store().clusters_by_label_prefix(label_prefix, limit=limit)
+    }
+
+
+class MatchRequest(BaseModel):
+    description: str = Field(..., min_length=1)
+    stock_code: str | None = None
+
+
+@lru_cache(maxsize=1)
+def _embedding_provider() -> EmbeddingProvider:
+    """Shared embedding client with an LRU of recent descriptions."""
+    return CachedEmbeddingProvider(OpenAIEmbeddingProvider())
+
+
+def _match_index() -> tuple[ClusterIndex, dict[int, str]]:
+    """Vector index saved with the store; reloaded only when the file changes."""
+    store_path = os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH)
+    path = str(match_index_path(store_path))
+    if not os.path.exists(path):
+        raise _missing_store(store_path)
+    mtime = os.path.getmtime(path)
+    cached = _match_indexes.get(path)
+    if cached is None or cached[0] != mtime:
+        index = ClusterIndex.load(path)
+        labels, _confidences = index.canonical_labels(index.cluster_ids())
+        cached = (mtime, index, labels)
+        _match_indexes[path] = cached
+    return cached[1], cached[2]
+
+
+@app.post("/match")
+def match_description(request: MatchRequest) -> dict:
+    """Assign one new description to the closest stored cluster.
+
+    Uses the compiled synonym matcher, a cached (or single) embedding call
+    and the in-memory index of stored members, gated by `_attributes_match`.
+    """
+    index, labels = _match_index()
+    normalized = normalize([{"Description": request.description}])[0]
+    if request.stock_code:
+        normalized["stock_code"] = request.stock_code
+    try:
+        feature = extract([normalized], provider=_embedding_provider())[0]
+        match = index.best_match(feature)
+    except ValueError as exc:
+        if "OPENAI_API_KEY" in str(exc):
+            raise HTTPException(
+                status_code=500,
+                detail="Server is missing OPENAI_API_KEY for embeddings.",
+            ) from exc
+        raise HTTPException(status_code=400, detail=f"Invalid input data: {exc}") from exc
+
+    response: dict[str, object] = {
+        "description_norm": feature["description_norm"],
+        "cluster_id": None,
+        "label": None,
+        "similarity": None,
+        "matched_record_id": None,
+        "accepted": False,
+    }
+    if match is not None:
+        response.update(
+            cluster_id=match["cluster_id"],
+            label=labels.get(match["cluster_id"]),
+            similarity=round(match["similarity"], 6),
+            matched_record_id=match["record_id"],
+            accepted=match["similarity"] >= index.similarity_threshold,
+        )
+    return response
@@ -0,0 +1,93 @@
+"""Columnar Arrow IPC encoding of an evaluation payload for machine clients."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - exercised when dependency is missing
+    pa = None  # type: ignore[assignment]
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def cluster_members(clusters: Sequence[Mapping]) -> dict[int, list[str]]:
+    """Group clustered records' IDs by cluster, in record order.
+
+    Records without a cluster ID are left out.
+    """
+    members: dict[int, list[str]] = {}
+    for index, record in enumerate(clusters):
+        cluster_id = record.get("cluster_id")
+        if cluster_id is None:
+            continue
+        record_id = record.get("record_id", f"record-{index}")
+        members.setdefault(int(cluster_id), []).append(str(record_id))
+    return members
+
+
+def _record_id_lists(
+    cluster_ids: Sequence[int], members: Mapping[int, Sequence[str]]
+) -> pa.ListArray:
+    """Build the list column from one flat string array plus offsets."""
+    offsets = [0]
+    flat: list[str] = []
+    for cluster_id in cluster_ids:
+        flat.extend(members.get(cluster_id, ()))
+        offsets.append(len(flat))
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()), pa.array(flat, type=pa.string())
+    )
+
+
+def encode_evaluation(evaluation: Mapping, members: Mapping[int, Sequence[str]]) -> bytes:
+    """Encode clusters as one Arrow IPC stream of parallel columns.
+
+    Each row is a cluster: ``cluster_id`` (int64), ``size`` (int64),
+    ``label`` (string), ``suspect`` (bool), ``risk_score`` (float64, null
+    when not suspect) and ``record_ids`` (list of strings, the per-record
+    assignments). Buffers are zstd-compressed. Record and cluster counts are
+    stored as schema metadata.
+    """
+    if pa is None:
+        raise ImportError(
+            "pyarrow package is required for Arrow output. "
+            "Install dependencies from requirements.txt."
+        )
+    cluster_sizes = evaluation.get("cluster_sizes", {})
+    labels = evaluation.get("labels", {})
+    risk_scores = {
+        int(entry["cluster_id"]): entry.get("risk_score")
+        for entry in evaluation.get("suspect_clusters", [])
+        if entry.get("cluster_id") is not None
+    }
+    keys = sorted(cluster_sizes, key=int)
+    cluster_ids = [int(key) for key in keys]
+    table = pa.table(
+        {
+            "cluster_id": pa.array(cluster_ids, type=pa.int64()),
+            "size": pa.array([cluster_sizes[key] for key in keys], type=pa.int64()),
+            "label": pa.array(
+                [str(labels.get(str(cluster_id), "")) for cluster_id in cluster_ids],
+                type=pa.string(),
+            ),
+            "suspect": pa.array(
+                [cluster_id in risk_scores for cluster_id in cluster_ids], type=pa.bool_()
+            ),
+            "risk_score": pa.array(
+                [risk_scores.get(cluster_id) for cluster_id in cluster_ids], type=pa.float64()
+            ),
+            "record_ids": _record_id_lists(cluster_ids, members),
+        }
+    ).replace_schema_metadata(
+        {
+            "num_records": str(evaluation.get("num_records", 0)),
+            "num_clusters": str(evaluation.get("num_clusters", len(cluster_ids))),
+        }
+    )
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
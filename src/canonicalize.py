@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 from collections import Counter, defaultdict
-import math
 import re
 
+import numpy as np
+
 _WHITESPACE_RUNS = re.compile(r"\s+")
 
 
@@ -15,46 +16,14 @@ def _clean_description_norm(value: object) -> str:
     return normalized.strip()
 
 
-def _pick_base_description(records: list[dict]) -> str:
-    """Pick the most frequent normalized description (stable ties)."""
-    descriptions = [
-        _clean_description_norm(record.get("description_norm", ""))
-        for record in records
-    ]
-    counts = Counter(descriptions)
-    if not counts:
-        return ""
-    max_frequency = max(counts.values())
-    candidates = [text for text, count in counts.items() if count == max_frequency]
-    return min(candidates)
-
-
-def _try_consistent_unit(records: list[dict]) -> tuple[str, str] | None:
-    """Return a consistent (unit_value, unit_name) pair when fully available."""
-    unit_names: set[str] = set()
-    unit_values: set[float] = set()
-    for record in records:
-        raw_name = record.get("unit_name")
-        raw_value = record.get("unit_value")
-        if raw_name is None or raw_value is None:
-            return None
+_ATTRIBUTE_FIELDS = ("unit_value", "unit_name", "unit_system", "stock_code")
 
-        unit_name = str(raw_name).strip().lower()
-        if not unit_name:
-            return None
-        try:
-            unit_value = float(raw_value)
-        except (TypeError, ValueError):
-            return None
 
-        unit_names.add(unit_name)
-        unit_values.add(unit_value)
-        if len(unit_names) > 1 or len(unit_values) > 1:
-            return None
-
-    if not unit_names or not unit_values:
-        return None
-    return (f"{next(iter(unit_values)):g}", next(iter(unit_names)))
+def _bump(counter: Counter, key: object, delta: int) -> None:
+    """Add ``delta`` to a counter entry, dropping it when it reaches zero."""
+    counter[key] += delta
+    if counter[key] <= 0:
+        del counter[key]
 
 
 def _group_by_cluster_id(clusters: list[dict]) -> dict[int, list[dict]]:
@@ -70,73 +39,168 @@ def _normalized_optional(value: object) -> str:
     return _clean_description_norm(value)
 
 
-def _attribute_field_score(records: list[dict], field: str) -> float:
-    """Score completeness and agreement for a single attribute field."""
-    total = len(records)
-    if total == 0:
-        return 0.0
-
-    normalized_values: list[str] = []
-    for record in records:
-        raw_value = record.get(field)
-        if raw_value is None:
-            continue
-        if field == "unit_value":
-            try:
-                normalized_values.append(f"{float(raw_value):g}")
-            except (TypeError, ValueError):
-                continue
-            continue
-        cleaned = _normalized_optional(raw_value)
-        if cleaned:
-            normalized_values.append(cleaned)
-
-    if not normalized_values:
-        return 0.0
-    completeness = len(normalized_values) / total
-    is_consistent = len(set(normalized_values)) == 1
-    return completeness if is_consistent else 0.0
-
-
-def _attribute_consistency_score(records: list[dict]) -> float:
-    """Compute attribute consistency score in [0, 1]."""
-    scores = [
-        _attribute_field_score(records, "unit_value"),
-        _attribute_field_score(records, "unit_name"),
-        _attribute_field_score(records, "unit_system"),
-    ]
-    if any(_normalized_optional(record.get("stock_code")) for record in records):
-        scores.append(_attribute_field_score(records, "stock_code"))
-    return sum(scores) / len(scores)
-
-
-def _cosine_similarity(vector_a: list[float], vector_b: list[float]) -> float:
-    """Compute cosine similarity between two vectors."""
-    if len(vector_a) != len(vector_b):
-        raise ValueError("All feature vectors must have the same dimension.")
-    norm_a = math.sqrt(sum(value * value for value in vector_a))
-    norm_b = math.sqrt(sum(value * value for value in vector_b))
-    if norm_a == 0.0 or norm_b == 0.0:
-        return 0.0
-    dot = sum(left * right for left, right in zip(vector_a, vector_b))
-    return dot / (norm_a * norm_b)
+def _unit_pair(record: dict) -> tuple[float, str] | None:
+    """Return (unit_value, unit_name) when both are present and valid."""
+    raw_name = record.get("unit_name")
+    raw_value = record.get("unit_value")
+    if raw_name is None or raw_value is None:
+        return None
+    unit_name = str(raw_name).strip().lower()
+    if not unit_name:
+        return None
+    try:
+        return (float(raw_value), unit_name)
+    except (TypeError, ValueError):
+        return None
+
+
+def _attribute_value(record: dict, field: str) -> str:
+    """Normalized attribute value used for agreement scoring ('' when absent)."""
+    raw_value = record.get(field)
+    if raw_value is None:
+        return ""
+    if field == "unit_value":
+        try:
+            return f"{float(raw_value):g}"
+        except (TypeError, ValueError):
+            return ""
+    return _normalized_optional(raw_value)
+
+
+def _unit_vector(record: dict) -> np.ndarray:
+    """Feature vector scaled to unit length (zero vectors stay zero)."""
+    vector = np.asarray(record.get("feature_vector", []), dtype=np.float64)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0.0 else vector
+
+
+class ClusterStats:
+    """Sufficient statistics for one cluster's canonical label and confidence.
+
+    Keeps description counts, unit name/value counts, per-field attribute
+    value counts and the sum of unit feature vectors, so members (or whole
+    clusters) can be added or removed in O(changed members). The mean
+    pairwise cosine is ``(|S|^2 - m) / (n (n - 1))`` where ``S`` is the
+    vector sum and ``m`` the number of non-zero vectors.
+    """
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.descriptions: Counter[str] = Counter()
+        self.unit_names: Counter[str] = Counter()
+        self.unit_values: Counter[float] = Counter()
+        self.incomplete_units = 0
+        self.attribute_values: dict[str, Counter[str]] = {
+            field: Counter() for field in _ATTRIBUTE_FIELDS
+        }
+        self.vector_sum: np.ndarray | None = None
+        self.nonzero_vectors = 0
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> ClusterStats:
+        stats = cls()
+        for record in records:
+            stats.add(record)
+        return stats
+
+    def _add_vector(self, vector: np.ndarray) -> None:
+        if self.vector_sum is None:
+            self.vector_sum = np.zeros_like(vector)
+        elif len(self.vector_sum) != len(vector):
+            raise ValueError("All feature vectors must have the same dimension.")
+        self.vector_sum += vector
+
+    def _apply(self, record: dict, delta: int) -> None:
+        self.size += delta
+        _bump(self.descriptions, _clean_description_norm(record.get("description_norm", "")), delta)
+        unit_pair = _unit_pair(record)
+        if unit_pair is None:
+            self.incomplete_units += delta
+        else:
+            _bump(self.unit_values, unit_pair[0], delta)
+            _bump(self.unit_names, unit_pair[1], delta)
+        for field, counter in self.attribute_values.items():
+            value = _attribute_value(record, field)
+            if value:
+                _bump(counter, value, delta)
+        vector = _unit_vector(record)
+        self._add_vector(vector * delta)
+        if np.any(vector):
+            self.nonzero_vectors += delta
+
+    def add(self, record: dict) -> None:
+        """Account for a new member."""
+        self._apply(record, 1)
+
+    def remove(self, record: dict) -> None:
+        """Forget a member that was previously added."""
+        self._apply(record, -1)
+
+    def merge(self, other: ClusterStats) -> None:
+        """Absorb another cluster's statistics."""
+        self.size += other.size
+        self.descriptions.update(other.descriptions)
+        self.unit_names.update(other.unit_names)
+        self.unit_values.update(other.unit_values)
+        self.incomplete_units += other.incomplete_units
+        for field, counter in other.attribute_values.items():
+            self.attribute_values[field].update(counter)
+        if other.vector_sum is not None:
+            self._add_vector(other.vector_sum)
+        self.nonzero_vectors += other.nonzero_vectors
+
+    def base_description(self) -> str:
+        """Most frequent normalized description (stable ties)."""
+        if not self.descriptions:
+            return ""
+        max_frequency = max(self.descriptions.values())
+        return min(text for text, count in self.descriptions.items() if count == max_frequency)
+
+    def consistent_unit(self) -> tuple[str, str] | None:
+        """(unit_value, unit_name) when every member has the same complete unit."""
+        if self.incomplete_units or len(self.unit_values) != 1 or len(self.unit_names) != 1:
+            return None
+        return (f"{next(iter(self.unit_values)):g}", next(iter(self.unit_names)))
+
+    def label(self, cluster_id: int) -> str:
+        """Template label: base description, plus the unit when consistent."""
+        base_description = self.base_description() or f"cluster {cluster_id}"
+        unit_parts = self.consistent_unit()
+        if unit_parts is None:
+            return base_description
+        return f"{base_description} {unit_parts[0]} {unit_parts[1]}"
+
+    def _attribute_field_score(self, field: str) -> float:
+        """Completeness of a field when all present values agree, else 0."""
+        counter = self.attribute_values[field]
+        if self.size <= 0 or len(counter) != 1:
+            return 0.0
+        return next(iter(counter.values())) / self.size
+
+    def attribute_consistency(self) -> float:
+        """Attribute consistency score in [0, 1]."""
+        scores = [self._attribute_field_score(field) for field in _ATTRIBUTE_FIELDS[:3]]
+        if self.attribute_values["stock_code"]:
+            scores.append(self._attribute_field_score("stock_code"))
+        return sum(scores) / len(scores)
+
+    def similarity_mean(self) -> float:
+        """Normalized mean pairwise cosine similarity in [0, 1]."""
+        if self.size <= 1 or self.vector_sum is None:
+            return 1.0
+        sum_squared = float(self.vector_sum @ self.vector_sum)
+        mean_cosine = (sum_squared - self.nonzero_vectors) / (self.size * (self.size - 1))
+        return max(0.0, min(1.0, (mean_cosine + 1.0) / 2.0))
+
+    def confidence(self) -> float:
+        """Blend of attribute consistency (0.6) and similarity mean (0.4)."""
+        confidence = (0.6 * self.attribute_consistency()) + (0.4 * self.similarity_mean())
+        return round(max(0.0, min(1.0, confidence)), 4)
 
 
 def _similarity_mean_score(records: list[dict]) -> float:
     """Compute normalized mean pairwise cosine similarity in [0, 1]."""
-    if len(records) <= 1:
-        return 1.0
-    vectors = [[float(value) for value in record.get("feature_vector", [])] for record in records]
-
-    pair_scores: list[float] = []
-    for index, vector_a in enumerate(vectors):
-        for vector_b in vectors[index + 1 :]:
-            cosine = _cosine_similarity(vector_a, vector_b)
-            pair_scores.append((cosine + 1.0) / 2.0)
-    if not pair_scores:
-        return 1.0
-    mean_score = sum(pair_scores) / len(pair_scores)
-    return max(0.0, min(1.0, mean_score))
+    return ClusterStats.from_records(records).similarity_mean()
 
 
 def canonicalize_with_confidence(clusters: list[dict]) -> tuple[dict[int, str], dict[int, float]]:
@@ -145,23 +209,21 @@ def canonicalize_with_confidence(clusters: list[dict]) -> tuple[dict[int, str],
         return {}, {}
 
     grouped = _group_by_cluster_id(clusters)
+    return labels_from_stats(
+        {cluster_id: ClusterStats.from_records(records) for cluster_id, records in grouped.items()}
+    )
 
+
+def labels_from_stats(
+    stats_by_cluster: dict[int, ClusterStats],
+) -> tuple[dict[int, str], dict[int, float]]:
+    """Labels and confidence scores from per-cluster statistics."""
     labels: dict[int, str] = {}
     confidences: dict[int, float] = {}
-    for cluster_id in sorted(grouped):
-        records = grouped[cluster_id]
-        base_description = _pick_base_description(records) or f"cluster {cluster_id}"
-        unit_parts = _try_consistent_unit(records)
-        labels[cluster_id] = (
-            f"{base_description} {unit_parts[0]} {unit_parts[1]}"
-            if unit_parts
-            else base_description
-        )
-        attribute_consistency = _attribute_consistency_score(records)
-        similarity_mean = _similarity_mean_score(records)
-        confidence = (0.6 * attribute_consistency) + (0.4 * similarity_mean)
-        confidences[cluster_id] = round(max(0.0, min(1.0, confidence)), 4)
-
+    for cluster_id in sorted(stats_by_cluster):
+        stats = stats_by_cluster[cluster_id]
+        labels[cluster_id] = stats.label(cluster_id)
+        confidences[cluster_id] = stats.confidence()
     return labels, confidences
 
 
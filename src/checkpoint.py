@@ -0,0 +1,97 @@
+"""Content-addressed checkpoints for pipeline stage outputs."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import hashlib
+import json
+import os
+from pathlib import Path
+import pickle
+import tempfile
+from typing import Any
+
+STAGES = ("ingest", "normalize", "extract", "cluster", "canonicalize", "evaluate")
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str | Path) -> str:
+    """SHA-256 of a file's bytes, or 'missing' when the file does not exist."""
+    file_path = Path(path)
+    if not file_path.exists():
+        return "missing"
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """Pickle stage outputs under ``<root>/<stage>/<key>.pkl``."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    @staticmethod
+    def key(stage: str, *parts: object) -> str:
+        """Hash a stage name with its upstream key and config values."""
+        payload = json.dumps([stage, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}.pkl"
+
+    def load(self, stage: str, key: str) -> tuple[bool, Any]:
+        """Return ``(True, value)`` on a hit and ``(False, None)`` otherwise."""
+        path = self._path(stage, key)
+        if not path.exists():
+            return False, None
+        with open(path, "rb") as handle:
+            return True, pickle.load(handle)
+
+    def save(self, stage: str, key: str, value: Any) -> None:
+        """Write atomically so an interrupted run never leaves a partial file."""
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+class StageRunner:
+    """Run pipeline stages in order, reusing checkpoints whose inputs are unchanged.
+
+    Each stage key chains the previous stage's key with the stage's own
+    config, so a change upstream invalidates everything after it. Stages at or
+    after ``force_stage`` are always recomputed (and re-checkpointed).
+    """
+
+    def __init__(self, store: CheckpointStore | None, *, force_stage: str | None = None) -> None:
+        if force_stage is not None and force_stage not in STAGES:
+            raise ValueError(f"Unknown stage {force_stage!r}. Choose from: {', '.join(STAGES)}.")
+        self.store = store
+        self.reused: list[str] = []
+        self._force_index = STAGES.index(force_stage) if force_stage else None
+        self._previous_key = ""
+
+    def run(self, stage: str, config: tuple, compute: Callable[[], Any]) -> Any:
+        """Return the stage output from a checkpoint or by calling ``compute``."""
+        if self.store is None:
+            return compute()
+        key = self.store.key(stage, self._previous_key, *config)
+        self._previous_key = key
+        forced = self._force_index is not None and STAGES.index(stage) >= self._force_index
+        if not forced:
+            hit, value = self.store.load(stage, key)
+            if hit:
+                self.reused.append(stage)
+                return value
+        value = compute()
+        self.store.save(stage, key, value)
+        return value
@@ -2,8 +2,14 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 import math
 
+from src.progress import report
+
+# Rows of the pairwise similarity scan between `similarity_tile` progress events.
+SIMILARITY_TILE_ROWS = 256
+
 
 def _vector_norm(vector: list[float]) -> float:
     """Compute Euclidean norm for a vector."""
@@ -22,15 +28,20 @@ def _cosine_similarity(vector_a: list[float], vector_b: list[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
-def _pairwise_cosine_similarity(vectors: list[list[float]]) -> list[list[float]]:
-    """Build dense pairwise cosine similarity matrix."""
-    similarities: list[list[float]] = []
-    for vector_a in vectors:
-        row: list[float] = []
-        for vector_b in vectors:
-            row.append(_cosine_similarity(vector_a, vector_b))
-        similarities.append(row)
-    return similarities
+def _similarity_rows(vectors: list[list[float]]) -> Iterator[tuple[int, list[float]]]:
+    """Yield ``(index, similarities to every later vector)`` one row at a time.
+
+    Rows are computed as they are consumed instead of as a dense matrix, and
+    a ``similarity_tile`` report goes out every `SIMILARITY_TILE_ROWS` rows,
+    so progress (and cancellation, which checks at each report) tracks the
+    similarity work itself.
+    """
+    count = len(vectors)
+    for index, vector in enumerate(vectors):
+        if index % SIMILARITY_TILE_ROWS == 0:
+            report("similarity_tile", done=index, total=count)
+        yield index, [_cosine_similarity(vector, other) for other in vectors[index + 1 :]]
+    report("similarity_tile", done=count, total=count)
 
 
 def _normalized_optional(value: object) -> str:
@@ -92,7 +103,11 @@ def cluster(
     *,
     similarity_threshold: float = 0.85,
 ) -> list[dict]:
-    """Assign cluster IDs from pairwise similarity and attribute gates."""
+    """Assign cluster IDs from pairwise similarity and attribute gates.
+
+    Emits ``similarity_tile`` progress during the pair scan; a run that is
+    cancelled stops at the next tile (see `_similarity_rows`).
+    """
     if not records_or_features:
         return []
 
@@ -100,14 +115,12 @@ def cluster(
         [float(value) for value in record.get("feature_vector", [])]
         for record in records_or_features
     ]
-    similarities = _pairwise_cosine_similarity(vectors)
-
     adjacency: list[set[int]] = [set() for _ in records_or_features]
-    for source_index in range(len(records_or_features)):
-        for target_index in range(source_index + 1, len(records_or_features)):
-            similarity = similarities[source_index][target_index]
+    for source_index, similarities in _similarity_rows(vectors):
+        for offset, similarity in enumerate(similarities):
             if similarity < similarity_threshold:
                 continue
+            target_index = source_index + 1 + offset
             source_record = records_or_features[source_index]
             target_record = records_or_features[target_index]
             if not _attributes_match(source_record, target_record):
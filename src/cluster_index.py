@@ -0,0 +1,430 @@
+"""Persistent add-only cluster index with stable cluster IDs."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.canonicalize import ClusterStats, labels_from_stats
+from src.cluster import _attributes_match, _normalized_optional
+
+_INDEX_VERSION = 1
+_ATTRIBUTE_FIELDS = ("stock_code", "unit_value", "unit_name", "unit_system")
+
+
+def _unit_key(record: dict) -> tuple[str, str] | None:
+    """Blocking key for the unit branch of `_attributes_match`."""
+    unit_name = _normalized_optional(record.get("unit_name"))
+    unit_system = _normalized_optional(record.get("unit_system"))
+    if not (unit_name and unit_system):
+        return None
+    return (unit_name, unit_system)
+
+
+class ClusterIndex:
+    """Incremental single-linkage clustering over feature records.
+
+    Stores raw vectors, attribute keys and union-find state so new records are
+    only compared against existing members that can pass `_attributes_match`
+    (same stock code, or same unit when a stock code is missing) and against
+    one another. Existing cluster IDs never change: when clusters merge, the
+    lowest ID survives, and new IDs are only allocated for new clusters.
+    Per-cluster `ClusterStats` are kept alongside, so labels and confidence
+    of changed clusters are refreshed in O(changed members).
+    """
+
+    def __init__(self, *, similarity_threshold: float = 0.85) -> None:
+        self.similarity_threshold = float(similarity_threshold)
+        self._records: list[dict] = []
+        self._vectors = np.empty((0, 0), dtype=np.float64)
+        self._norms = np.empty(0, dtype=np.float64)
+        self._parent: list[int] = []
+        self._root_cluster: dict[int, int] = {}
+        self._next_cluster_id = 0
+        self._positions: dict[str, int] = {}
+        self._by_stock: dict[str, list[int]] = defaultdict(list)
+        self._by_unit: dict[tuple[str, str], list[int]] = defaultdict(list)
+        self._by_unit_without_stock: dict[tuple[str, str], list[int]] = defaultdict(list)
+        self._stats: dict[int, ClusterStats] = {}
+        # (surviving ID, absorbed ID) for merges of two existing clusters.
+        self._absorbed: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, record_id: object) -> bool:
+        return str(record_id) in self._positions
+
+    def _find(self, node: int) -> int:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, node_a: int, node_b: int) -> None:
+        root_a, root_b = self._find(node_a), self._find(node_b)
+        if root_a == root_b:
+            return
+        if root_b < root_a:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        cluster_ids = [
+            self._root_cluster.pop(root)
+            for root in (root_a, root_b)
+            if root in self._root_cluster
+        ]
+        if cluster_ids:
+            self._root_cluster[root_a] = min(cluster_ids)
+            if len(cluster_ids) == 2:
+                self._absorbed.append((min(cluster_ids), max(cluster_ids)))
+
+    def _stats_record(self, position: int) -> dict:
+        return {**self._records[position], "feature_vector": self._vectors[position]}
+
+    def _update_stats(self, positions: list[int]) -> None:
+        """Fold recorded merges into the survivors, then add ``positions``."""
+        for survivor, absorbed in self._absorbed:
+            absorbed_stats = self._stats.pop(absorbed, None)
+            if absorbed_stats is not None:
+                self._stats.setdefault(survivor, ClusterStats()).merge(absorbed_stats)
+        self._absorbed.clear()
+        for position in positions:
+            cluster_id = self._root_cluster[self._find(position)]
+            self._stats.setdefault(cluster_id, ClusterStats()).add(self._stats_record(position))
+
+    def _reserve(self, extra: int, dimension: int) -> None:
+        """Grow vector storage geometrically so appends stay amortized O(1)."""
+        used = len(self._records)
+        if self._vectors.shape[1] not in (0, dimension) and used:
+            raise ValueError("All feature vectors must have the same dimension.")
+        if self._vectors.shape[0] >= used + extra and self._vectors.shape[1] == dimension:
+            return
+        capacity = max(used + extra, 2 * self._vectors.shape[0], 16)
+        vectors = np.empty((capacity, dimension), dtype=np.float64)
+        norms = np.empty(capacity, dtype=np.float64)
+        if used:
+            vectors[:used] = self._vectors[:used]
+            norms[:used] = self._norms[:used]
+        self._vectors, self._norms = vectors, norms
+
+    def _candidates(self, record: dict) -> list[int]:
+        """Indexed members that could pass `_attributes_match` with ``record``."""
+        stock_code = _normalized_optional(record.get("stock_code"))
+        unit_key = _unit_key(record)
+        if stock_code:
+            candidates = list(self._by_stock.get(stock_code, ()))
+            if unit_key is not None:
+                candidates.extend(self._by_unit_without_stock.get(unit_key, ()))
+            return candidates
+        if unit_key is None:
+            return []
+        return list(self._by_unit.get(unit_key, ()))
+
+    def _register(self, position: int, record: dict) -> None:
+        stock_code = _normalized_optional(record.get("stock_code"))
+        unit_key = _unit_key(record)
+        if stock_code:
+            self._by_stock[stock_code].append(position)
+        if unit_key is not None:
+            self._by_unit[unit_key].append(position)
+            if not stock_code:
+                self._by_unit_without_stock[unit_key].append(position)
+
+    def _similarities(self, position: int, candidates: list[int]) -> np.ndarray:
+        """Cosine similarity of one member against candidate members."""
+        indices = np.asarray(candidates, dtype=np.int64)
+        norm = self._norms[position]
+        denominators = self._norms[indices] * norm
+        dots = self._vectors[indices] @ self._vectors[position]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominators == 0.0, 0.0, dots / denominators)
+
+    @staticmethod
+    def _metadata(record: dict, record_id: str) -> dict[str, object]:
+        """Keep the non-vector fields the index needs for gating and output."""
+        metadata: dict[str, object] = {
+            "record_id": record_id,
+            "description_norm": str(record.get("description_norm", "")),
+        }
+        stock_code = str(record.get("stock_code", "")).strip()
+        if stock_code:
+            metadata["stock_code"] = stock_code
+        for field in ("unit_value", "unit_name", "unit_system", "description_raw"):
+            if record.get(field) is not None:
+                metadata[field] = record[field]
+        return metadata
+
+    @staticmethod
+    def _vectors_of(features: list[dict]) -> list[list[float]]:
+        vectors = [[float(value) for value in record.get("feature_vector", [])] for record in features]
+        if any(len(vector) != len(vectors[0]) for vector in vectors):
+            raise ValueError("All feature vectors must have the same dimension.")
+        return vectors
+
+    def _set_vector(self, position: int, vector: list[float]) -> None:
+        self._vectors[position] = vector
+        self._norms[position] = float(np.linalg.norm(self._vectors[position]))
+
+    def _link(self, position: int) -> None:
+        """Union ``position`` with every indexed candidate that passes both gates."""
+        metadata = self._records[position]
+        candidates = self._candidates(metadata)
+        if not candidates:
+            return
+        similarities = self._similarities(position, candidates)
+        for hit in np.flatnonzero(similarities >= self.similarity_threshold):
+            candidate = candidates[hit]
+            if candidate != position and _attributes_match(metadata, self._records[candidate]):
+                self._union(position, candidate)
+
+    def add(self, features: list[dict]) -> list[int]:
+        """Index new feature records and return their cluster IDs in input order."""
+        if not features:
+            return []
+        vectors = self._vectors_of(features)
+        self._reserve(len(features), len(vectors[0]))
+
+        start = len(self._records)
+        for offset, (record, vector) in enumerate(zip(features, vectors)):
+            position = start + offset
+            record_id = str(record.get("record_id", f"record-{position}"))
+            if record_id in self._positions:
+                raise ValueError(f"Record {record_id!r} is already indexed.")
+            metadata = self._metadata(record, record_id)
+            self._records.append(metadata)
+            self._positions[record_id] = position
+            self._parent.append(position)
+            self._set_vector(position, vector)
+            self._link(position)
+            self._register(position, metadata)
+
+        cluster_ids: list[int] = []
+        for position in range(start, len(self._records)):
+            root = self._find(position)
+            if root not in self._root_cluster:
+                self._root_cluster[root] = self._next_cluster_id
+                self._next_cluster_id += 1
+            cluster_ids.append(self._root_cluster[root])
+        self._update_stats(list(range(start, len(self._records))))
+        return cluster_ids
+
+    def _unregister(self, position: int, record: dict) -> None:
+        stock_code = _normalized_optional(record.get("stock_code"))
+        unit_key = _unit_key(record)
+        if stock_code:
+            self._by_stock[stock_code].remove(position)
+        if unit_key is not None:
+            self._by_unit[unit_key].remove(position)
+            if not stock_code:
+                self._by_unit_without_stock[unit_key].remove(position)
+
+    def replace(self, features: list[dict]) -> list[int]:
+        """Update already-indexed records and re-link only the clusters they touch.
+
+        Union-find cannot split, so every member of a touched cluster is reset
+        and linked again. Each resulting component keeps the touched cluster ID
+        most of its members had (largest components choose first); leftover
+        components get fresh IDs. Returns the sorted IDs whose membership may
+        have changed, including IDs that no longer exist.
+        """
+        if not features:
+            return []
+        vectors = self._vectors_of(features)
+        if self._vectors.shape[1] != len(vectors[0]):
+            raise ValueError("All feature vectors must have the same dimension.")
+        positions: list[int] = []
+        for record in features:
+            record_id = str(record.get("record_id", ""))
+            if record_id not in self._positions:
+                raise ValueError(f"Record {record_id!r} is not indexed.")
+            positions.append(self._positions[record_id])
+
+        previous_cluster = [self._root_cluster[self._find(p)] for p in range(len(self._records))]
+        touched = {previous_cluster[position] for position in positions}
+        members = [p for p, cluster_id in enumerate(previous_cluster) if cluster_id in touched]
+
+        for position, record, vector in zip(positions, features, vectors):
+            previous = self._records[position]
+            self._unregister(position, previous)
+            metadata = self._metadata(record, str(previous["record_id"]))
+            if "description_raw" not in metadata and "description_raw" in previous:
+                metadata["description_raw"] = previous["description_raw"]
+            self._records[position] = metadata
+            self._set_vector(position, vector)
+            self._register(position, metadata)
+
+        for position in members:
+            self._root_cluster.pop(self._find(position), None)
+        for cluster_id in touched:
+            self._stats.pop(cluster_id, None)
+        for position in members:
+            self._parent[position] = position
+        for position in members:
+            self._link(position)
+
+        components: dict[int, list[int]] = {}
+        for position in members:
+            root = self._find(position)
+            if root not in self._root_cluster:
+                components.setdefault(root, []).append(position)
+        available = set(touched)
+        for root, component in sorted(components.items(), key=lambda item: (-len(item[1]), item[0])):
+            votes: dict[int, int] = {}
+            for position in component:
+                cluster_id = previous_cluster[position]
+                if cluster_id in available:
+                    votes[cluster_id] = votes.get(cluster_id, 0) + 1
+            if votes:
+                chosen = min(votes, key=lambda cluster_id: (-votes[cluster_id], cluster_id))
+                available.discard(chosen)
+            else:
+                chosen = self._next_cluster_id
+                self._next_cluster_id += 1
+            self._root_cluster[root] = chosen
+
+        self._update_stats(members)
+        current = {self._root_cluster[self._find(position)] for position in members}
+        return sorted(current | touched)
+
+    def best_match(self, feature: dict) -> dict | None:
+        """Most similar indexed member that passes `_attributes_match` with ``feature``.
+
+        Similarities to the stock-code/unit block are computed in one matrix
+        product and the gate is checked in decreasing-similarity order.
+        Returns ``record_id``, ``cluster_id`` and ``similarity``, or None
+        when no member passes the gate.
+        """
+        candidates = self._candidates(feature)
+        if not candidates:
+            return None
+        vector = np.asarray(feature.get("feature_vector", []), dtype=np.float64)
+        if len(vector) != self._vectors.shape[1]:
+            raise ValueError("All feature vectors must have the same dimension.")
+        indices = np.asarray(candidates, dtype=np.int64)
+        used = len(self._records)
+        if 4 * len(candidates) >= used:
+            # A large block: one product over contiguous storage beats gathering rows.
+            dots = (self._vectors[:used] @ vector)[indices]
+        else:
+            dots = self._vectors[indices] @ vector
+        denominators = self._norms[indices] * float(np.linalg.norm(vector))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarities = np.where(denominators == 0.0, 0.0, dots / denominators)
+        for hit in np.argsort(-similarities, kind="stable").tolist():
+            position = candidates[hit]
+            if _attributes_match(feature, self._records[position]):
+                return {
+                    "record_id": self._records[position]["record_id"],
+                    "cluster_id": self._root_cluster[self._find(position)],
+                    "similarity": float(similarities[hit]),
+                }
+        return None
+
+    @classmethod
+    def from_clustered_records(
+        cls, clustered: list[dict], *, similarity_threshold: float = 0.85
+    ) -> ClusterIndex:
+        """Index records that already carry cluster IDs, keeping those IDs as-is."""
+        index = cls(similarity_threshold=similarity_threshold)
+        if not clustered:
+            return index
+        vectors = cls._vectors_of(clustered)
+        index._reserve(len(clustered), len(vectors[0]))
+        roots: dict[int, int] = {}
+        for position, (record, vector) in enumerate(zip(clustered, vectors)):
+            record_id = str(record.get("record_id", f"record-{position}"))
+            metadata = cls._metadata(record, record_id)
+            cluster_id = int(record["cluster_id"])
+            root = roots.setdefault(cluster_id, position)
+            index._records.append(metadata)
+            index._positions[record_id] = position
+            index._parent.append(root)
+            index._set_vector(position, vector)
+            index._register(position, metadata)
+        index._root_cluster = {root: cluster_id for cluster_id, root in roots.items()}
+        index._next_cluster_id = max(roots) + 1
+        index._update_stats(list(range(len(clustered))))
+        return index
+
+    def stored_records(self) -> list[dict]:
+        """Return copies of the stored per-record metadata (no vectors)."""
+        return [dict(record) for record in self._records]
+
+    def cluster_ids(self) -> set[int]:
+        """IDs of every current cluster."""
+        return set(self._stats)
+
+    def canonical_labels(
+        self, cluster_ids: set[int] | list[int]
+    ) -> tuple[dict[int, str], dict[int, float]]:
+        """Labels and confidence for the given clusters from their stored statistics."""
+        return labels_from_stats({cluster_id: self._stats[cluster_id] for cluster_id in cluster_ids})
+
+    def cluster_id(self, record_id: str) -> int:
+        """Return the current cluster ID of an indexed record."""
+        return self._root_cluster[self._find(self._positions[str(record_id)])]
+
+    def clustered_records(self) -> list[dict]:
+        """Return every indexed record in the same shape `cluster()` produces."""
+        clustered: list[dict] = []
+        for position, metadata in enumerate(self._records):
+            record = {
+                "record_id": metadata["record_id"],
+                "cluster_id": self._root_cluster[self._find(position)],
+                "description_norm": metadata["description_norm"],
+                "feature_vector": self._vectors[position].tolist(),
+            }
+            for field in _ATTRIBUTE_FIELDS:
+                if field in metadata:
+                    record[field] = metadata[field]
+            clustered.append(record)
+        return clustered
+
+    def save(self, path: str | Path) -> None:
+        """Write vectors, union-find state and record metadata to one .npz file."""
+        used = len(self._records)
+        roots = np.asarray(list(self._root_cluster), dtype=np.int64)
+        meta = {
+            "version": _INDEX_VERSION,
+            "similarity_threshold": self.similarity_threshold,
+            "next_cluster_id": self._next_cluster_id,
+            "records": self._records,
+        }
+        with open(path, "wb") as handle:
+            np.savez(
+                handle,
+                vectors=self._vectors[:used],
+                parent=np.asarray(self._parent, dtype=np.int64),
+                roots=roots,
+                root_clusters=np.asarray(
+                    [self._root_cluster[root] for root in roots.tolist()], dtype=np.int64
+                ),
+                meta=np.asarray(json.dumps(meta)),
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> ClusterIndex:
+        """Load an index written by `save`."""
+        with np.load(path) as payload:
+            meta = json.loads(str(payload["meta"]))
+            if meta.get("version") != _INDEX_VERSION:
+                raise ValueError(f"Unsupported cluster index version in {path}.")
+            index = cls(similarity_threshold=meta["similarity_threshold"])
+            vectors = payload["vectors"]
+            index._records = meta["records"]
+            index._vectors = np.array(vectors, dtype=np.float64)
+            index._norms = np.linalg.norm(index._vectors, axis=1) if len(vectors) else np.empty(0)
+            index._parent = payload["parent"].tolist()
+            index._root_cluster = dict(
+                zip(payload["roots"].tolist(), payload["root_clusters"].tolist())
+            )
+        index._next_cluster_id = int(meta["next_cluster_id"])
+        for position, record in enumerate(index._records):
+            index._positions[record["record_id"]] = position
+            index._register(position, record)
+        index._update_stats(list(range(len(index._records))))
+        return index
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
 import math
 import os
+import threading
 from typing import Any, Protocol
 
 try:
@@ -11,6 +13,10 @@ try:
 except ImportError:  # pragma: no cover - exercised when dependency is missing
     OpenAI = None  # type: ignore[assignment]
 
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_EMBEDDING_CACHE_SIZE = 10_000
+DEFAULT_EMBEDDING_TIMEOUT_SECONDS = float(os.environ.get("SPG_EMBEDDING_TIMEOUT_SECONDS", "60"))
+
 
 class EmbeddingProvider(Protocol):
     """Interface for text embedding backends."""
@@ -20,14 +26,21 @@ class EmbeddingProvider(Protocol):
 
 
 class OpenAIEmbeddingProvider:
-    """OpenAI-based embedding backend for normalized descriptions."""
+    """OpenAI-based embedding backend for normalized descriptions.
+
+    Each request is bounded by ``timeout`` seconds, so a cancelled run waits
+    at most that long for an in-flight batch (the client's retries apply on
+    top). An injected ``client`` gets the timeout through ``with_options``
+    when it supports it.
+    """
 
     def __init__(
         self,
         *,
         api_key: str | None = None,
-        model: str = "text-embedding-3-small",
+        model: str = DEFAULT_EMBEDDING_MODEL,
         client: Any | None = None,
+        timeout: float | None = DEFAULT_EMBEDDING_TIMEOUT_SECONDS,
     ) -> None:
         resolved_api_key = api_key or os.environ.get("OPENAI_API_KEY")
         if not resolved_api_key and client is None:
@@ -37,7 +50,9 @@ class OpenAIEmbeddingProvider:
                 raise ImportError(
                     "openai package is required. Install dependencies from requirements.txt."
                 )
-            self._client = OpenAI(api_key=resolved_api_key)
+            self._client = OpenAI(api_key=resolved_api_key, timeout=timeout)
+        elif timeout is not None and hasattr(client, "with_options"):
+            self._client = client.with_options(timeout=timeout)
         else:
             self._client = client
         self._model = model
@@ -60,3 +75,46 @@ class OpenAIEmbeddingProvider:
             if not all(math.isfinite(value) for value in vector):
                 raise ValueError("Embedding provider returned non-finite values.")
         return vectors
+
+
+class CachedEmbeddingProvider:
+    """LRU cache in front of another provider, keyed by input text.
+
+    Cache misses of one ``embed`` call are sent to the wrapped provider in a
+    single request. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        *,
+        max_entries: int = DEFAULT_EMBEDDING_CACHE_SIZE,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self._provider = provider
+        self._max_entries = max_entries
+        self._vectors: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Return cached vectors and embed only the texts not seen recently."""
+        with self._lock:
+            cached = {text: self._vectors[text] for text in texts if text in self._vectors}
+            for text in cached:
+                self._vectors.move_to_end(text)
+        missing = list(dict.fromkeys(text for text in texts if text not in cached))
+        if missing:
+            fresh = self._provider.embed(missing)
+            if len(fresh) != len(missing):
+                raise ValueError(
+                    "Embedding provider returned a vector count that does not match inputs."
+                )
+            cached.update(zip(missing, fresh))
+            with self._lock:
+                for text, vector in zip(missing, fresh):
+                    self._vectors[text] = vector
+                    self._vectors.move_to_end(text)
+                while len(self._vectors) > self._max_entries:
+                    self._vectors.popitem(last=False)
+        return [cached[text] for text in texts]
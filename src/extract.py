@@ -3,19 +3,38 @@
 from __future__ import annotations
 
 from src.embedding import EmbeddingProvider, OpenAIEmbeddingProvider
+from src.progress import report
+
+# The OpenAI embeddings endpoint accepts at most 2048 inputs per request.
+EMBEDDING_BATCH_SIZE = 2048
 
 
 def extract(
     records: list[dict],
     provider: EmbeddingProvider | None = None,
+    *,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
 ) -> list[dict]:
-    """Build feature records with one embedding vector per description."""
+    """Build feature records with one embedding vector per description.
+
+    Descriptions are embedded ``batch_size`` at a time, reporting an
+    ``embedding_batch`` progress event after each request.
+    """
     if not records:
         return []
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
 
     descriptions = [str(record.get("description", "")) for record in records]
     embedding_provider = provider or OpenAIEmbeddingProvider()
-    vectors = embedding_provider.embed(descriptions)
+    vectors: list[list[float]] = []
+    for start in range(0, len(descriptions), batch_size):
+        vectors.extend(embedding_provider.embed(descriptions[start : start + batch_size]))
+        report(
+            "embedding_batch",
+            done=min(start + batch_size, len(descriptions)),
+            total=len(descriptions),
+        )
 
     if len(vectors) != len(records):
         raise ValueError("Number of embeddings must match number of input records.")
@@ -0,0 +1,142 @@
+"""Persist an ingest watermark and the cluster index for incremental runs."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TypedDict
+
+import pandas as pd
+
+from src.cluster_index import ClusterIndex
+from src.ingest import RecordBatch, _category_mask
+
+_STATE_VERSION = 4
+_STATE_FILE = "state.json"
+_INDEX_FILE = "index.npz"
+
+
+class Watermark(TypedDict):
+    max_invoice_date: str
+    invoices_at_max: list[str]
+
+
+class IncrementalState(TypedDict):
+    watermark: Watermark | None
+    index: ClusterIndex | None
+    synonym_map: dict[str, str] | None
+    labels: dict[int, str]
+    confidences: dict[int, float]
+
+
+def rows_after_watermark(batch: RecordBatch, watermark: Watermark | None) -> RecordBatch:
+    """Keep rows newer than the watermark.
+
+    A row is new when its ``InvoiceDate`` is after the stored maximum, or
+    equal to it with an invoice not already seen at that timestamp. Invoice
+    numbers are not ordered (cancellations carry a ``C`` prefix), so the
+    watermark keeps the full set seen at the maximum. Rows with no parseable
+    date cannot be placed and are skipped once a watermark exists.
+    """
+    if watermark is None:
+        return batch
+    frame = batch.frame
+    watermark_date = pd.Timestamp(watermark["max_invoice_date"])
+    seen = set(watermark["invoices_at_max"])
+    dates = frame["InvoiceDate"]
+    unseen_invoice = _category_mask(frame["Invoice"], lambda invoice: invoice not in seen)
+    keep = (dates > watermark_date).to_numpy() | (
+        (dates == watermark_date).to_numpy() & unseen_invoice
+    )
+    return RecordBatch(frame[keep].reset_index(drop=True), filter_counts=batch.filter_counts)
+
+
+def advance_watermark(batch: RecordBatch, watermark: Watermark | None) -> Watermark | None:
+    """Return the watermark after ingesting ``batch`` (unchanged when it is empty)."""
+    dates = batch.frame["InvoiceDate"]
+    if dates.isna().all():
+        return watermark
+    max_date = dates.max()
+    invoices = set(batch.frame.loc[dates == max_date, "Invoice"].dropna().astype(str))
+    if watermark is not None and pd.Timestamp(watermark["max_invoice_date"]) == max_date:
+        invoices.update(watermark["invoices_at_max"])
+    return {"max_invoice_date": max_date.isoformat(), "invoices_at_max": sorted(invoices)}
+
+
+def refresh_labels(
+    previous_labels: dict[int, str],
+    previous_confidences: dict[int, float],
+    index: ClusterIndex,
+    dirty_cluster_ids: set[int],
+) -> tuple[dict[int, str], dict[int, float], set[int]]:
+    """Re-emit labels and confidence only for dirty or unlabelled clusters.
+
+    Labels of clusters that no longer exist are dropped. Returns the label
+    and confidence maps and the set of cluster IDs that were re-emitted.
+    """
+    current_ids = index.cluster_ids()
+    stale = {
+        cluster_id
+        for cluster_id in current_ids
+        if cluster_id in dirty_cluster_ids or cluster_id not in previous_labels
+    }
+    kept = current_ids - stale
+    labels = {cluster_id: previous_labels[cluster_id] for cluster_id in kept}
+    confidences = {
+        cluster_id: previous_confidences[cluster_id]
+        for cluster_id in kept
+        if cluster_id in previous_confidences
+    }
+    fresh_labels, fresh_confidences = index.canonical_labels(stale)
+    labels.update(fresh_labels)
+    confidences.update(fresh_confidences)
+    return labels, confidences, stale
+
+
+def load_state(state_dir: str | Path) -> IncrementalState:
+    """Load watermark, cluster index, synonym snapshot and labels; empty when absent."""
+    root = Path(state_dir)
+    state_path = root / _STATE_FILE
+    if not state_path.exists():
+        return {
+            "watermark": None,
+            "index": None,
+            "synonym_map": None,
+            "labels": {},
+            "confidences": {},
+        }
+    payload = json.loads(state_path.read_text(encoding="utf-8"))
+    if payload.get("version") != _STATE_VERSION:
+        raise ValueError(f"Unsupported incremental state version in {state_path}.")
+    return {
+        "watermark": payload.get("watermark"),
+        "index": ClusterIndex.load(root / _INDEX_FILE),
+        "synonym_map": payload.get("synonym_map"),
+        "labels": {int(key): value for key, value in payload.get("labels", {}).items()},
+        "confidences": {
+            int(key): value for key, value in payload.get("confidences", {}).items()
+        },
+    }
+
+
+def save_state(
+    state_dir: str | Path,
+    watermark: Watermark | None,
+    index: ClusterIndex,
+    *,
+    synonym_map: dict[str, str] | None = None,
+    labels: dict[int, str] | None = None,
+    confidences: dict[int, float] | None = None,
+) -> None:
+    """Write the cluster index, then the state file that points at it."""
+    root = Path(state_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    index.save(root / _INDEX_FILE)
+    payload = {
+        "version": _STATE_VERSION,
+        "watermark": watermark,
+        "synonym_map": synonym_map,
+        "labels": {str(key): value for key, value in (labels or {}).items()},
+        "confidences": {str(key): value for key, value in (confidences or {}).items()},
+    }
+    (root / _STATE_FILE).write_text(json.dumps(payload), encoding="utf-8")
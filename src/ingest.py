@@ -1,6 +1,28 @@
-"""Load product data from Excel into pipeline-ready records."""
+"""Load product data from Excel, delimited, Parquet or NDJSON files into records."""
 
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from itertools import zip_longest
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import tempfile
+from typing import TextIO
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised when dependency is missing
+    pq = None  # type: ignore[assignment]
+from openpyxl import load_workbook
 
 RETAIL_SHEETS = ("Year 2009-2010", "Year 2010-2011")
 RETAIL_COLUMNS = (
@@ -13,26 +35,675 @@ RETAIL_COLUMNS = (
     "Customer ID",
     "Country",
 )
+RETAIL_DTYPES = {
+    "Invoice": "category",
+    "StockCode": "category",
+    "Description": "category",
+    "Quantity": "Int32",
+    "InvoiceDate": "datetime64[ns]",
+    "Price": "float32",
+    "Customer ID": "category",
+    "Country": "category",
+}
+SUPPORTED_EXTENSIONS = (".xlsx", ".csv", ".tsv", ".parquet", ".ndjson", ".jsonl")
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_CHUNK_SIZE = 100_000
+CACHE_DIR_NAME = ".ingest_cache"
+DEFAULT_CACHE_ENTRIES = 4
+_CACHE_SCHEMA_VERSION = 2
+_HASH_CHUNK_SIZE = 1 << 20
+_TEXT_CHUNK_SIZE = 1 << 20
+_WHITESPACE = re.compile(r"\s*")
+RECORD_REQUIRED_COLUMNS = ("StockCode", "Description")
+NON_PRODUCT_STOCK_CODES = frozenset(
+    {
+        "ADJUST",
+        "ADJUST2",
+        "AMAZONFEE",
+        "B",
+        "BANK CHARGES",
+        "C2",
+        "CRUK",
+        "D",
+        "DOT",
+        "M",
+        "PADS",
+        "POST",
+        "S",
+    }
+)
+_NON_PRODUCT_STOCK_CODE_PATTERN = re.compile(r"^(gift_\d+_\d+|test\d+)$", flags=re.IGNORECASE)
 
+RowFilter = Callable[[pd.DataFrame], np.ndarray]
 
-def ingest(path: str) -> list[dict]:
-    """Read .xlsx, normalize column names, return list of dicts per row."""
-    if path.lower().endswith(".xlsx"):
-        dfs = pd.read_excel(
-            path,
-            sheet_name=list(RETAIL_SHEETS),
-            engine="openpyxl",
-        )
-        combined = pd.concat(dfs.values(), ignore_index=True)
-    else:
-        raise ValueError(
-            f"Unsupported input format: {path!r}. Supported extension is .xlsx."
+
+class RecordBatch(Sequence):
+    """Columnar batch of ingested rows backed by a compact DataFrame.
+
+    Rows are only materialized as dicts when indexed or iterated, so stages
+    that work on whole columns can use `frame` / `column()` directly.
+    """
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        *,
+        filter_counts: dict[str, int] | None = None,
+    ) -> None:
+        self.frame = frame
+        self.filter_counts = dict(filter_counts or {})
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordBatch(self.frame.iloc[index].reset_index(drop=True))
+        return self.frame.iloc[index].to_dict()
+
+    def __iter__(self) -> Iterator[dict]:
+        columns = list(self.frame.columns)
+        for values in self.frame.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+
+    def column(self, name: str) -> pd.Series:
+        """Return one column without materializing rows."""
+        return self.frame[name]
+
+    def to_records(self) -> list[dict]:
+        """Materialize every row as a dict (the pre-columnar ingest output)."""
+        return self.frame.to_dict(orient="records")
+
+
+def _category_mask(series: pd.Series, predicate: Callable[[str], bool]) -> np.ndarray:
+    """Evaluate ``predicate`` once per category and broadcast it to rows."""
+    matches = np.array([bool(predicate(str(value))) for value in series.cat.categories] + [False])
+    return matches[series.cat.codes.to_numpy()]
+
+
+def _is_cancelled_invoice(frame: pd.DataFrame) -> np.ndarray:
+    """Cancellation invoices carry a leading 'C'."""
+    return _category_mask(frame["Invoice"], lambda value: value.upper().startswith("C"))
+
+
+def _is_non_positive_quantity(frame: pd.DataFrame) -> np.ndarray:
+    """Returns and stock adjustments have zero or negative quantity."""
+    return (frame["Quantity"] <= 0).fillna(False).to_numpy(dtype=bool)
+
+
+def _is_non_product_stock_code(frame: pd.DataFrame) -> np.ndarray:
+    """Postage, fees, discounts, samples and test codes are not products."""
+
+    def _non_product(value: str) -> bool:
+        code = value.strip()
+        return (
+            code.upper() in NON_PRODUCT_STOCK_CODES
+            or _NON_PRODUCT_STOCK_CODE_PATTERN.match(code) is not None
         )
 
-    combined.columns = [str(c).strip() for c in combined.columns]
-    missing_columns = [col for col in RETAIL_COLUMNS if col not in combined.columns]
+    return _category_mask(frame["StockCode"], _non_product)
+
+
+DEFAULT_ROW_FILTERS: dict[str, RowFilter] = {
+    "cancelled_invoice": _is_cancelled_invoice,
+    "non_positive_quantity": _is_non_positive_quantity,
+    "non_product_stock_code": _is_non_product_stock_code,
+}
+
+
+def apply_row_filters(
+    frame: pd.DataFrame,
+    filters: Mapping[str, RowFilter] = DEFAULT_ROW_FILTERS,
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    """Drop rows matched by any filter; count each row under its first matching rule."""
+    keep = np.ones(len(frame), dtype=bool)
+    counts: dict[str, int] = {}
+    for name, rule in filters.items():
+        dropped = np.asarray(rule(frame), dtype=bool) & keep
+        counts[name] = int(dropped.sum())
+        keep &= ~dropped
+    if keep.all():
+        return frame, counts
+    return frame[keep].reset_index(drop=True), counts
+
+
+def _is_retail_column(name: object) -> bool:
+    """Column filter used to project spreadsheets at read time."""
+    return str(name).strip() in RETAIL_COLUMNS
+
+
+def _validate_columns(columns: list[str]) -> None:
+    """Raise when any required retail column is missing."""
+    missing_columns = [col for col in RETAIL_COLUMNS if col not in columns]
     if missing_columns:
         raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
 
-    combined = combined.dropna(how="all")
-    return combined.to_dict(orient="records")
+
+def _header_names(header_row: tuple[object, ...]) -> list[str]:
+    """Trim header cells the same way `ingest` trims DataFrame columns."""
+    return ["" if cell is None else str(cell).strip() for cell in header_row]
+
+
+def _input_format(path: str) -> str:
+    """Return the lowercase extension of a supported input path."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in SUPPORTED_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported input format: {path!r}. "
+            f"Supported extensions are {', '.join(SUPPORTED_EXTENSIONS)}."
+        )
+    return suffix
+
+
+def _project_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Trim column names, keep `RETAIL_COLUMNS` and drop fully empty rows."""
+    chunk.columns = [str(c).strip() for c in chunk.columns]
+    return chunk.reindex(columns=list(RETAIL_COLUMNS)).dropna(how="all")
+
+
+def _iter_delimited_chunks(path: str, sep: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read only the retail columns of a CSV/TSV file in chunks."""
+    header = pd.read_csv(path, sep=sep, nrows=0).columns
+    names = [str(c).strip() for c in header]
+    _validate_columns(names)
+    usecols = [header[names.index(column)] for column in RETAIL_COLUMNS]
+    reader = pd.read_csv(path, sep=sep, usecols=usecols, dtype=str, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield _project_chunk(chunk)
+
+
+def _iter_ndjson_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read newline-delimited JSON records in chunks after checking the first line."""
+    first_record: dict = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                first_record = json.loads(line)
+                break
+    _validate_columns([str(key).strip() for key in first_record])
+    reader = pd.read_json(
+        path,
+        lines=True,
+        chunksize=chunksize,
+        dtype=False,
+        convert_dates=False,
+    )
+    with reader:
+        for chunk in reader:
+            yield _project_chunk(chunk)
+
+
+def _iter_parquet_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read only the retail columns of a Parquet file, one record batch at a time."""
+    if pq is None:
+        raise ImportError(
+            "pyarrow package is required for .parquet input. "
+            "Install dependencies from requirements.txt."
+        )
+    parquet_file = pq.ParquetFile(path)
+    names = {str(name).strip(): name for name in parquet_file.schema_arrow.names}
+    _validate_columns(list(names))
+    columns = [names[column] for column in RETAIL_COLUMNS]
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        yield _project_chunk(batch.to_pandas())
+
+
+def _iter_tabular_chunks(path: str, input_format: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Dispatch to the chunked reader for a non-Excel input format."""
+    if chunksize <= 0:
+        raise ValueError("chunksize must be a positive integer.")
+    if input_format in (".csv", ".tsv"):
+        sep = "\t" if input_format == ".tsv" else ","
+        return _iter_delimited_chunks(path, sep, chunksize)
+    if input_format == ".parquet":
+        return _iter_parquet_chunks(path, chunksize)
+    return _iter_ndjson_chunks(path, chunksize)
+
+
+def _as_text(value: object) -> str:
+    """Render a raw cell as text, dropping the '.0' Excel adds to integer IDs."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Project to `RETAIL_COLUMNS` and cast each column to `RETAIL_DTYPES`."""
+    compact: dict[str, object] = {}
+    for column, dtype in RETAIL_DTYPES.items():
+        series = frame[column]
+        if dtype == "category":
+            text = series.map(_as_text, na_action="ignore")
+            categories = pd.Index(sorted(text.dropna().unique()), dtype=object)
+            compact[column] = pd.Categorical(text, categories=categories)
+        elif dtype.startswith("datetime64"):
+            compact[column] = pd.to_datetime(series, errors="coerce")
+        else:
+            compact[column] = pd.to_numeric(series, errors="coerce").astype(dtype)
+    return pd.DataFrame(compact).reset_index(drop=True)
+
+
+def _workbook_cache_key(path: str, sheets: tuple[str, ...]) -> str:
+    """Hash workbook bytes together with the sheet list and cache schema."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    digest.update(
+        json.dumps({"sheets": list(sheets), "version": _CACHE_SCHEMA_VERSION}).encode()
+    )
+    return digest.hexdigest()
+
+
+def _write_sidecar(frame: pd.DataFrame, cache_path: Path) -> None:
+    """Persist a compact frame as one .npy file per column plus metadata."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=cache_path.parent, prefix=f"{cache_path.name}.tmp-"))
+    try:
+        for position, column in enumerate(RETAIL_COLUMNS):
+            series = frame[column]
+            stem = staging / f"{position:02d}"
+            if RETAIL_DTYPES[column] == "category":
+                np.save(f"{stem}.codes.npy", series.cat.codes.to_numpy())
+                np.save(f"{stem}.categories.npy", series.cat.categories.to_numpy(dtype=str))
+            elif RETAIL_DTYPES[column] == "Int32":
+                np.save(f"{stem}.values.npy", series.to_numpy(dtype="int32", na_value=0))
+                np.save(f"{stem}.mask.npy", series.isna().to_numpy())
+            else:
+                np.save(f"{stem}.values.npy", series.to_numpy())
+        meta = {
+            "version": _CACHE_SCHEMA_VERSION,
+            "num_rows": len(frame),
+            "columns": list(RETAIL_COLUMNS),
+        }
+        (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(staging, cache_path)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _prune_sidecars(cache_root: Path, keep: int) -> None:
+    """Delete all but the ``keep`` most recently used sidecars under ``cache_root``.
+
+    A sidecar's directory mtime is its last use (`ingest` touches it on every
+    hit), so a folder of daily workbooks keeps only the recent ones.
+    """
+    sidecars = [
+        entry
+        for entry in cache_root.iterdir()
+        if entry.is_dir() and ".tmp-" not in entry.name
+    ]
+    sidecars.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for stale in sidecars[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def _load_sidecar(cache_path: Path) -> pd.DataFrame | None:
+    """Memory-map a sidecar written by `_write_sidecar`; None when unusable."""
+    meta_path = cache_path / "meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("version") != _CACHE_SCHEMA_VERSION or meta.get("columns") != list(
+        RETAIL_COLUMNS
+    ):
+        return None
+
+    columns: dict[str, object] = {}
+    for position, column in enumerate(RETAIL_COLUMNS):
+        stem = cache_path / f"{position:02d}"
+        if RETAIL_DTYPES[column] == "category":
+            codes = np.load(f"{stem}.codes.npy", mmap_mode="r")
+            categories = np.load(f"{stem}.categories.npy")
+            columns[column] = pd.Categorical.from_codes(
+                codes, categories=pd.Index(categories.tolist(), dtype=object)
+            )
+        elif RETAIL_DTYPES[column] == "Int32":
+            values = np.load(f"{stem}.values.npy", mmap_mode="r")
+            mask = np.load(f"{stem}.mask.npy", mmap_mode="r")
+            columns[column] = pd.arrays.IntegerArray(np.asarray(values), np.asarray(mask))
+        else:
+            columns[column] = np.load(f"{stem}.values.npy", mmap_mode="r")
+    return pd.DataFrame(columns)
+
+
+def _read_sheet(path: str, sheet_name: str) -> pd.DataFrame:
+    """Parse one retail sheet into a compact, validated DataFrame."""
+    sheet = pd.read_excel(
+        path,
+        sheet_name=sheet_name,
+        engine="openpyxl",
+        usecols=_is_retail_column,
+    )
+    sheet.columns = [str(c).strip() for c in sheet.columns]
+    _validate_columns(list(sheet.columns))
+    return _to_compact_frame(sheet.dropna(how="all"))
+
+
+def _concat_compact(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compact frames in order, unioning categorical columns."""
+    if not frames:
+        return _to_compact_frame(pd.DataFrame(columns=list(RETAIL_COLUMNS)))
+    if len(frames) == 1:
+        return frames[0]
+    columns: dict[str, object] = {}
+    for column in RETAIL_COLUMNS:
+        parts = [frame[column] for frame in frames]
+        if RETAIL_DTYPES[column] == "category":
+            columns[column] = union_categoricals(parts)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _read_xlsx(
+    path: str,
+    sheets: tuple[str, ...],
+    max_workers: int | None,
+) -> pd.DataFrame:
+    """Parse each sheet in its own worker process and concatenate in sheet order."""
+    if not sheets:
+        raise ValueError("At least one sheet name is required.")
+    workers = min(len(sheets), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        frames = [_read_sheet(path, sheet_name) for sheet_name in sheets]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(_read_sheet, [path] * len(sheets), sheets))
+    return _concat_compact(frames)
+
+
+def collapse_catalog(batch: RecordBatch) -> tuple[RecordBatch, np.ndarray]:
+    """Reduce invoice lines to unique (StockCode, Description) product entities.
+
+    Returns the entity batch (in order of first appearance) and an index that
+    maps every input row to its entity, so per-row results can be rebuilt
+    with `expand_to_rows`. Each entity carries a stable ``record_id`` plus
+    ``row_count``, ``total_quantity``, ``first_seen`` and ``last_seen``.
+    """
+    frame = batch.frame
+    stock_codes = frame["StockCode"].cat.codes.to_numpy().astype(np.int64)
+    descriptions = frame["Description"].cat.codes.to_numpy().astype(np.int64)
+    description_slots = len(frame["Description"].cat.categories) + 1
+    pair_keys = (stock_codes + 1) * description_slots + (descriptions + 1)
+    row_entity, unique_keys = pd.factorize(pair_keys, sort=False)
+    row_entity = row_entity.astype(np.int32)
+    num_entities = len(unique_keys)
+
+    entity_stock = pd.Categorical.from_codes(
+        unique_keys // description_slots - 1,
+        dtype=frame["StockCode"].dtype,
+    )
+    entity_description = pd.Categorical.from_codes(
+        unique_keys % description_slots - 1,
+        dtype=frame["Description"].dtype,
+    )
+    quantities = frame["Quantity"].fillna(0).to_numpy(dtype=np.int64)
+    seen = frame["InvoiceDate"].groupby(row_entity)
+    record_ids = [
+        f"{'' if pd.isna(stock) else stock}|{'' if pd.isna(text) else text}"
+        for stock, text in zip(entity_stock, entity_description)
+    ]
+
+    entities = pd.DataFrame(
+        {
+            "record_id": record_ids,
+            "StockCode": entity_stock,
+            "Description": entity_description,
+            "row_count": np.bincount(row_entity, minlength=num_entities),
+            "total_quantity": np.bincount(
+                row_entity, weights=quantities, minlength=num_entities
+            ).astype(np.int64),
+            "first_seen": seen.min().reindex(range(num_entities)).to_numpy(),
+            "last_seen": seen.max().reindex(range(num_entities)).to_numpy(),
+        }
+    )
+    return RecordBatch(entities, filter_counts=batch.filter_counts), row_entity
+
+
+def expand_to_rows(entity_values: Sequence, row_entity: np.ndarray) -> np.ndarray:
+    """Broadcast one value per entity (e.g. cluster IDs) back to every source row."""
+    return np.asarray(entity_values)[row_entity]
+
+
+def _filtered_batch(frame: pd.DataFrame, filters: Mapping[str, RowFilter]) -> RecordBatch:
+    """Apply row filters and wrap the survivors with their drop counts."""
+    kept, counts = apply_row_filters(frame, filters)
+    return RecordBatch(kept, filter_counts=counts)
+
+
+def ingest(
+    path: str,
+    *,
+    sheets: tuple[str, ...] = RETAIL_SHEETS,
+    max_workers: int | None = None,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    filters: Mapping[str, RowFilter] = DEFAULT_ROW_FILTERS,
+    cache_dir: str | Path | None = None,
+    use_cache: bool = True,
+    cache_entries: int = DEFAULT_CACHE_ENTRIES,
+) -> RecordBatch:
+    """Read an input file, normalize column names, return a columnar record batch.
+
+    The format is picked from the extension (see `SUPPORTED_EXTENSIONS`).
+    CSV/TSV, Parquet and NDJSON are read in ``chunksize`` pieces projected to
+    `RETAIL_COLUMNS`; every column is cast to the compact `RETAIL_DTYPES`.
+    Row ``filters`` (default: `DEFAULT_ROW_FILTERS`, pass ``{}`` to keep every
+    row) run vectorized on the frame; per-rule drop counts are reported on
+    `RecordBatch.filter_counts`.
+    For .xlsx, each sheet is parsed in its own worker process (``max_workers=1`` keeps
+    parsing in-process). The first read of a workbook writes a columnar
+    sidecar (default: ``.ingest_cache/`` next to the file) keyed by content
+    hash and sheet list; later reads of the same bytes memory-map it instead
+    of re-parsing Excel. Only the ``cache_entries`` most recently used
+    sidecars are kept; older ones are deleted when a new one is written.
+    """
+    input_format = _input_format(path)
+    if input_format != ".xlsx":
+        frames = [
+            _to_compact_frame(chunk)
+            for chunk in _iter_tabular_chunks(path, input_format, chunksize)
+        ]
+        return _filtered_batch(_concat_compact(frames), filters)
+
+    if not use_cache:
+        return _filtered_batch(_read_xlsx(path, tuple(sheets), max_workers), filters)
+
+    cache_root = Path(cache_dir) if cache_dir is not None else Path(path).parent / CACHE_DIR_NAME
+    cache_path = cache_root / _workbook_cache_key(path, tuple(sheets))
+    combined = _load_sidecar(cache_path)
+    if combined is None:
+        combined = _read_xlsx(path, tuple(sheets), max_workers)
+        try:
+            _write_sidecar(combined, cache_path)
+            _prune_sidecars(cache_root, cache_entries)
+        except OSError:
+            pass
+    else:
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+    return _filtered_batch(combined, filters)
+
+
+def iter_json_array(handle: TextIO) -> Iterator[object]:
+    """Yield the items of a top-level JSON array, reading ``handle`` incrementally."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill() -> None:
+        nonlocal buffer, position, eof
+        chunk = handle.read(_TEXT_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def next_token() -> str:
+        nonlocal position
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position < len(buffer) or eof:
+                return buffer[position : position + 1]
+            fill()
+
+    if next_token() != "[":
+        raise ValueError("Expected a JSON array of records.")
+    position += 1
+    if next_token() == "]":
+        return
+    while True:
+        next_token()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ValueError(f"Malformed JSON array: {exc.msg}.") from exc
+                fill()
+        yield value
+        position = end
+        token = next_token()
+        position += 1
+        if token == "]":
+            return
+        if token != ",":
+            raise ValueError("Malformed JSON array: expected ',' or ']'.")
+
+
+def iter_ndjson(handle: TextIO) -> Iterator[object]:
+    """Yield one parsed value per non-blank line of newline-delimited JSON."""
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Malformed JSON on line {line_number}: {exc.msg}.") from exc
+
+
+def ingest_records(
+    records: Iterable[object],
+    *,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    filters: Mapping[str, RowFilter] = DEFAULT_ROW_FILTERS,
+) -> RecordBatch:
+    """Build a record batch from already-parsed records, e.g. a JSON request body.
+
+    Records are consumed lazily and compacted ``chunksize`` at a time. Only
+    `RECORD_REQUIRED_COLUMNS` are required (present and non-null); other
+    `RETAIL_COLUMNS` are null when absent. A ``record_id`` field is kept so
+    results can be joined back to the caller's records; if any record has
+    one, every record must carry a distinct one. Without IDs, extract
+    numbers the records that survive the row filters.
+    """
+    if chunksize <= 0:
+        raise ValueError("chunksize must be a positive integer.")
+    frames: list[pd.DataFrame] = []
+    id_parts: list[pd.Series] = []
+    chunk: list[dict] = []
+    offset = 0
+
+    def flush() -> None:
+        nonlocal offset
+        frame = pd.DataFrame.from_records(chunk)
+        frame.columns = [str(c).strip() for c in frame.columns]
+        for column in RECORD_REQUIRED_COLUMNS:
+            if column in frame.columns:
+                missing = frame[column].isna().to_numpy()
+            else:
+                missing = np.ones(len(frame), dtype=bool)
+            if missing.any():
+                index = offset + int(np.argmax(missing))
+                raise ValueError(f"Record {index} is missing required field {column}.")
+        if "record_id" in frame.columns:
+            id_parts.append(frame["record_id"].astype("string"))
+        else:
+            id_parts.append(pd.Series(pd.NA, index=range(len(frame)), dtype="string"))
+        frames.append(_to_compact_frame(frame.reindex(columns=list(RETAIL_COLUMNS))))
+        offset += len(chunk)
+        chunk.clear()
+
+    for record in records:
+        if not isinstance(record, dict):
+            raise TypeError(f"Record {offset + len(chunk)} is not a JSON object.")
+        chunk.append(record)
+        if len(chunk) >= chunksize:
+            flush()
+    if chunk:
+        flush()
+
+    combined = _concat_compact(frames)
+    if id_parts:
+        record_ids = pd.concat(id_parts, ignore_index=True)
+        if record_ids.notna().any():
+            missing = np.flatnonzero(record_ids.isna().to_numpy())
+            if len(missing):
+                raise ValueError(
+                    f"Record {missing[0]} has no record_id; "
+                    "give every record one or leave it out of all."
+                )
+            duplicated = np.flatnonzero(record_ids.duplicated().to_numpy())
+            if len(duplicated):
+                raise ValueError(
+                    f"Record {duplicated[0]} repeats record_id {record_ids[duplicated[0]]!r}."
+                )
+            combined["record_id"] = record_ids
+    return _filtered_batch(combined, filters)
+
+
+def iter_ingest_batches(
+    path: str,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sheets: tuple[str, ...] = RETAIL_SHEETS,
+) -> Iterator[list[dict]]:
+    """Stream rows as fixed-size batches of dicts with bounded memory.
+
+    Headers (of every sheet, for .xlsx) are validated before any data row is
+    read, so a bad file fails on the first ``next()`` call. Non-Excel formats
+    yield one batch per ``batch_size`` chunk, projected to `RETAIL_COLUMNS`.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+    input_format = _input_format(path)
+    if input_format != ".xlsx":
+        for chunk in _iter_tabular_chunks(path, input_format, batch_size):
+            if len(chunk):
+                yield chunk.to_dict(orient="records")
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        missing_sheets = [name for name in sheets if name not in workbook.sheetnames]
+        if missing_sheets:
+            raise ValueError(f"Missing required sheets: {', '.join(missing_sheets)}")
+
+        headers: dict[str, list[str]] = {}
+        for sheet_name in sheets:
+            first_row = next(
+                workbook[sheet_name].iter_rows(max_row=1, values_only=True), ()
+            )
+            headers[sheet_name] = _header_names(first_row)
+            _validate_columns(headers[sheet_name])
+
+        batch: list[dict] = []
+        for sheet_name in sheets:
+            columns = headers[sheet_name]
+            rows = workbook[sheet_name].iter_rows(min_row=2, values_only=True)
+            for row in rows:
+                if all(cell is None for cell in row):
+                    continue
+                batch.append(dict(zip_longest(columns, row[: len(columns)])))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    finally:
+        workbook.close()
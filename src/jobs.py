@@ -0,0 +1,273 @@
+"""Bounded background job pool for long pipeline runs."""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+from typing import Any
+import uuid
+
+from src.progress import PipelineCancelled, ProgressBus, reporting_to
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(PipelineCancelled):
+    """Raised at a stage boundary or progress checkpoint of a cancelled job."""
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the pool already holds its maximum of active jobs."""
+
+
+def _default_error(exc: Exception) -> dict[str, Any]:
+    return {"detail": str(exc) or type(exc).__name__}
+
+
+class _Job:
+    def __init__(
+        self,
+        job_id: str,
+        stages: tuple[str, ...],
+        cleanup: Callable[[], None] | None,
+        on_cancel: Callable[[], None] | None = None,
+    ) -> None:
+        self.job_id = job_id
+        self.status = "queued"
+        self.stages = {name: {"status": "pending", "seconds": None} for name in stages}
+        self.current_stage: str | None = None
+        self.stage_started_at = 0.0
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: Any = None
+        self.error: dict[str, Any] | None = None
+        self.cancel_requested = False
+        self.cleanup = cleanup
+        self.on_cancel = on_cancel
+        self.future: Future | None = None
+        self.events = ProgressBus()
+
+    def snapshot(self) -> dict[str, Any]:
+        done = sum(1 for stage in self.stages.values() if stage["status"] in ("done", "skipped"))
+        payload: dict[str, Any] = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.current_stage,
+            "progress": round(done / len(self.stages), 4) if self.stages else 0.0,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "succeeded":
+            payload["result"] = self.result
+        if self.error is not None:
+            payload["error"] = self.error
+        return payload
+
+
+class JobManager:
+    """Run jobs on a fixed-size thread pool with a cap on queued work.
+
+    At most ``max_workers`` jobs run at once and at most ``max_pending``
+    more wait; further submissions raise `JobQueueFull`. Cancellation drops
+    a queued job immediately and stops a running one at its next stage
+    boundary or `src.progress.report` checkpoint (embedding batch,
+    similarity tile); work running elsewhere (e.g. in another process) can
+    pass ``on_cancel`` to be told directly. Finished jobs are kept for
+    ``retention_seconds``.
+
+    Each job has a `ProgressBus` (see `events`) carrying ``status`` and
+    ``stage`` transitions plus whatever the work reports via
+    `src.progress.report`, stamped with the seconds spent in the stage.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        max_pending: int = 8,
+        retention_seconds: float = 3600.0,
+        describe_error: Callable[[Exception], dict[str, Any]] = _default_error,
+    ) -> None:
+        if max_workers < 1 or max_pending < 0:
+            raise ValueError("max_workers must be >= 1 and max_pending >= 0.")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._describe_error = describe_error
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="spg-job")
+        self._jobs: dict[str, _Job] = {}
+        self._finished: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+
+    def has_capacity(self) -> bool:
+        """Whether a submission right now would be accepted."""
+        with self._lock:
+            return self._active_count() < self.max_workers + self.max_pending
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def submit(
+        self,
+        work: Callable[[Callable[[str], None]], Any],
+        *,
+        stages: tuple[str, ...],
+        cleanup: Callable[[], None] | None = None,
+        on_cancel: Callable[[], None] | None = None,
+    ) -> str:
+        """Queue ``work(on_stage)`` and return its job ID.
+
+        ``on_cancel`` is called, from the cancelling thread and under the
+        manager's lock, when a running job is asked to stop; keep it quick.
+        """
+        self._prune()
+        with self._lock:
+            if self._active_count() >= self.max_workers + self.max_pending:
+                raise JobQueueFull("Job queue is full.")
+            job = _Job(uuid.uuid4().hex, stages, cleanup, on_cancel)
+            self._jobs[job.job_id] = job
+        job.events.publish("status", {"status": "queued"})
+        job.future = self._executor.submit(self._execute, job, work)
+        return job.job_id
+
+    def _finish(
+        self,
+        job: _Job,
+        status: str,
+        *,
+        result: Any = None,
+        error: dict[str, Any] | None = None,
+    ) -> None:
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            self._finished[status] += 1
+            if job.current_stage is not None and status == "succeeded":
+                self._close_stage(job)
+            for stage in job.stages.values():
+                if stage["status"] == "pending" and status == "succeeded":
+                    stage["status"] = "skipped"
+            cleanup, job.cleanup = job.cleanup, None
+        if cleanup is not None:
+            cleanup()
+        final: dict[str, Any] = {"status": status}
+        if error is not None:
+            final["error"] = error
+        job.events.publish("status", final)
+        job.events.close()
+
+    @staticmethod
+    def _close_stage(job: _Job) -> None:
+        stage = job.stages.get(job.current_stage or "")
+        if stage is not None and stage["status"] == "running":
+            stage["status"] = "done"
+            stage["seconds"] = round(time.time() - job.stage_started_at, 3)
+
+    def _execute(self, job: _Job, work: Callable[[Callable[[str], None]], Any]) -> None:
+        with self._lock:
+            if job.cancel_requested:
+                cancelled = True
+            else:
+                cancelled = False
+                job.status = "running"
+                job.started_at = time.time()
+        if cancelled:
+            self._finish(job, "cancelled")
+            return
+        job.events.publish("status", {"status": "running"})
+
+        def on_stage(name: str) -> None:
+            if job.cancel_requested:
+                raise JobCancelled(job.job_id)
+            with self._lock:
+                self._close_stage(job)
+                job.current_stage = name
+                job.stage_started_at = time.time()
+                if name in job.stages:
+                    job.stages[name]["status"] = "running"
+            job.events.publish("stage", {"stage": name})
+
+        def on_progress(kind: str, data: dict[str, Any]) -> None:
+            if job.cancel_requested:
+                raise JobCancelled(job.job_id)
+            elapsed = max(time.time() - job.stage_started_at, 1e-9)
+            payload = {"stage": job.current_stage, **data, "seconds": round(elapsed, 3)}
+            if "done" in data:
+                payload["per_second"] = round(data["done"] / elapsed, 1)
+            job.events.publish(kind, payload)
+
+        try:
+            with reporting_to(on_progress):
+                result = work(on_stage)
+        except PipelineCancelled:
+            self._finish(job, "cancelled")
+        # Any error raised by the caller's work is the job's outcome; letting it
+        # escape would only park it on a future nobody reads.
+        except Exception as exc:  # noqa: BLE001
+            self._finish(job, "failed", error=self._describe_error(exc))
+        else:
+            self._finish(job, "succeeded", result=result)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Status, per-stage progress and (when done) result of a job."""
+        self._prune()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def stats(self) -> dict[str, int]:
+        """Active job count plus finished jobs by final status since startup."""
+        with self._lock:
+            return {
+                "active": self._active_count(),
+                **{
+                    status: self._finished[status]
+                    for status in ("succeeded", "failed", "cancelled")
+                },
+            }
+
+    def events(self, job_id: str) -> ProgressBus | None:
+        """Progress event log of a job, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.events if job is not None else None
+
+    def cancel(self, job_id: str) -> dict[str, Any] | None:
+        """Request cancellation; returns the job snapshot or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status not in ACTIVE_STATUSES:
+                return job.snapshot()
+            job.cancel_requested = True
+            dropped = job.status == "queued" and job.future is not None and job.future.cancel()
+            if job.status == "running" and job.on_cancel is not None:
+                # Under the lock, so it cannot race the job's cleanup.
+                job.on_cancel()
+        if dropped:
+            self._finish(job, "cancelled")
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running jobs."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,217 @@
+"""Single-linkage merge tree: compute similarities once, cut at any threshold."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.cluster import SIMILARITY_TILE_ROWS, _attributes_match
+from src.progress import report
+
+_TREE_VERSION = 2
+_ATTRIBUTE_FIELDS = ("unit_value", "unit_name", "unit_system")
+
+
+def _tree_record(index: int, record: dict) -> dict:
+    """Same fields `cluster()` emits, minus the cluster ID and feature vector."""
+    tree_record: dict[str, object] = {
+        "record_id": str(record.get("record_id", f"record-{index}")),
+        "description_norm": str(record.get("description_norm", "")),
+    }
+    stock_code = str(record.get("stock_code", "")).strip()
+    if stock_code:
+        tree_record["stock_code"] = stock_code
+    for field in _ATTRIBUTE_FIELDS:
+        if record.get(field) is not None:
+            tree_record[field] = record[field]
+    return tree_record
+
+
+def _find(parent: list[int], node: int) -> int:
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+class MergeTree:
+    """Sorted union sequence of a gated single-linkage clustering.
+
+    ``left[k]``/``right[k]`` is the k-th edge that joined two components and
+    ``similarity[k]`` its cosine similarity, in decreasing order. Only edges
+    that pass `_attributes_match` are considered, so replaying the prefix of
+    merges at or above a threshold gives exactly the partition `cluster()`
+    returns for that threshold.
+
+    ``records`` holds each record's small metadata; the feature vectors live
+    in the float32 ``vectors`` matrix (one row per record) and are added back
+    when the tree is cut.
+    """
+
+    def __init__(
+        self,
+        records: list[dict],
+        vectors: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        similarity: np.ndarray,
+        *,
+        min_similarity: float,
+        source_key: str = "",
+    ) -> None:
+        self.records = records
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int64)
+        self.right = np.asarray(right, dtype=np.int64)
+        self.similarity = np.asarray(similarity, dtype=np.float64)
+        self.min_similarity = float(min_similarity)
+        self.source_key = source_key
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate in-memory size: the arrays plus the records' JSON size."""
+        arrays = self.vectors.nbytes + self.left.nbytes + self.right.nbytes
+        return arrays + self.similarity.nbytes + len(json.dumps(self.records))
+
+    def cut(self, similarity_threshold: float) -> list[dict]:
+        """Return `cluster()`-shaped records for ``similarity_threshold`` in O(n)."""
+        if similarity_threshold < self.min_similarity:
+            raise ValueError(
+                f"Merge tree only holds edges with similarity >= {self.min_similarity}; "
+                f"cannot cut at {similarity_threshold}."
+            )
+        parent = list(range(len(self.records)))
+        stop = int(np.searchsorted(-self.similarity, -similarity_threshold, side="right"))
+        for source, target in zip(self.left[:stop].tolist(), self.right[:stop].tolist()):
+            root_source = _find(parent, source)
+            root_target = _find(parent, target)
+            if root_source != root_target:
+                parent[max(root_source, root_target)] = min(root_source, root_target)
+
+        root_cluster: dict[int, int] = {}
+        clustered_records: list[dict] = []
+        for index, (record, vector) in enumerate(zip(self.records, self.vectors.tolist())):
+            root = _find(parent, index)
+            if root not in root_cluster:
+                root_cluster[root] = len(root_cluster)
+            clustered_records.append(
+                {
+                    "record_id": record["record_id"],
+                    "cluster_id": root_cluster[root],
+                    **{key: value for key, value in record.items() if key != "record_id"},
+                    "feature_vector": vector,
+                }
+            )
+        return clustered_records
+
+    def save(self, path: str | Path) -> None:
+        """Write the merge sequence, vectors and record metadata to one .npz file."""
+        meta = {
+            "version": _TREE_VERSION,
+            "min_similarity": self.min_similarity,
+            "source_key": self.source_key,
+            "records": self.records,
+        }
+        with open(path, "wb") as handle:
+            np.savez(
+                handle,
+                vectors=self.vectors,
+                left=self.left,
+                right=self.right,
+                similarity=self.similarity,
+                meta=np.asarray(json.dumps(meta)),
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> MergeTree:
+        """Load a tree written by `save`."""
+        with np.load(path) as payload:
+            meta = json.loads(str(payload["meta"]))
+            if meta.get("version") != _TREE_VERSION:
+                raise ValueError(f"Unsupported merge tree version in {path}.")
+            return cls(
+                meta["records"],
+                payload["vectors"],
+                payload["left"],
+                payload["right"],
+                payload["similarity"],
+                min_similarity=meta["min_similarity"],
+                source_key=meta.get("source_key", ""),
+            )
+
+
+def build_merge_tree(
+    records_or_features: list[dict],
+    *,
+    min_similarity: float = 0.0,
+    source_key: str = "",
+) -> MergeTree:
+    """Build the single-linkage merge tree over all gated pairs.
+
+    Pairs below ``min_similarity`` are never stored, so the tree can only be
+    cut at or above it.
+    """
+    vectors = [
+        [float(value) for value in record.get("feature_vector", [])]
+        for record in records_or_features
+    ]
+    if len({len(vector) for vector in vectors}) > 1:
+        raise ValueError("All feature vectors must have the same dimension.")
+    records = [_tree_record(index, record) for index, record in enumerate(records_or_features)]
+    count = len(records)
+    matrix = np.asarray(vectors, dtype=np.float64).reshape(count, len(vectors[0]) if vectors else 0)
+    if count < 2:
+        empty = np.empty(0)
+        return MergeTree(
+            records,
+            matrix,
+            empty,
+            empty,
+            empty,
+            min_similarity=min_similarity,
+            source_key=source_key,
+        )
+
+    norms = np.linalg.norm(matrix, axis=1)
+    unit = np.divide(matrix, norms[:, None], out=np.zeros_like(matrix), where=norms[:, None] > 0)
+
+    sources: list[int] = []
+    targets: list[int] = []
+    similarities: list[float] = []
+    for source in range(count - 1):
+        if source % SIMILARITY_TILE_ROWS == 0:
+            report("similarity_tile", done=source, total=count)
+        row = unit[source + 1 :] @ unit[source]
+        for offset in np.flatnonzero(row >= min_similarity).tolist():
+            target = source + 1 + offset
+            if _attributes_match(records_or_features[source], records_or_features[target]):
+                sources.append(source)
+                targets.append(target)
+                similarities.append(float(row[offset]))
+
+    report("similarity_tile", done=count, total=count)
+    edge_similarity = np.asarray(similarities, dtype=np.float64)
+    order = np.lexsort((targets, sources, -edge_similarity))
+    parent = list(range(count))
+    left: list[int] = []
+    right: list[int] = []
+    kept: list[float] = []
+    for edge in order.tolist():
+        root_source = _find(parent, sources[edge])
+        root_target = _find(parent, targets[edge])
+        if root_source == root_target:
+            continue
+        parent[max(root_source, root_target)] = min(root_source, root_target)
+        left.append(sources[edge])
+        right.append(targets[edge])
+        kept.append(similarities[edge])
+        if len(kept) == count - 1:
+            break
+    return MergeTree(
+        records, matrix, left, right, kept, min_similarity=min_similarity, source_key=source_key
+    )
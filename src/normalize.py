@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import re
 from functools import lru_cache
 from pathlib import Path
-from typing import TypedDict
+from typing import NamedTuple, TypedDict
 
 _NON_ALNUM_RUNS = re.compile(r"[^0-9a-zA-Z.]+")
 _WHITESPACE_RUNS = re.compile(r"\s+")
@@ -34,12 +35,37 @@ class UnitInfo(TypedDict):
     unit_system: str
 
 
+SynonymPatterns = tuple[tuple[re.Pattern[str], str], ...]
+
+
+class Synonyms(NamedTuple):
+    """One version of synonyms.yml: its SHA-256, variant map and compiled patterns."""
+
+    digest: str
+    mapping: dict[str, str]
+    patterns: SynonymPatterns
+
+
+def _synonym_file_stamp() -> tuple[int, int] | None:
+    """Modification time and size of synonyms.yml; None when it is missing."""
+    try:
+        stat = _SYNONYM_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 @lru_cache(maxsize=1)
-def _load_synonym_map() -> dict[str, str]:
-    """Load explicit synonym mappings from synonyms.yml."""
-    if not _SYNONYM_PATH.exists():
-        return {}
-    loaded = json.loads(_SYNONYM_PATH.read_text(encoding="utf-8"))
+def _read_synonyms(stamp: tuple[int, int] | None) -> tuple[str, dict[str, str]]:
+    """Digest and variant -> canonical map of the synonyms.yml version at ``stamp``.
+
+    The digest is taken from the same bytes that are parsed, so it always
+    names the map that is returned.
+    """
+    if stamp is None:
+        return "missing", {}
+    raw = _SYNONYM_PATH.read_bytes()
+    loaded = json.loads(raw.decode("utf-8"))
     canonical_to_variants = loaded.get("canonical_to_variants", {})
     variant_to_canonical = {
         str(k).lower().strip(): str(v).lower().strip()
@@ -50,20 +76,50 @@ def _load_synonym_map() -> dict[str, str]:
         for variant in variants:
             variant_text = str(variant).lower().strip()
             variant_to_canonical.setdefault(variant_text, canonical_text)
-    return {k: v for k, v in variant_to_canonical.items() if k and v}
+    synonym_map = {k: v for k, v in variant_to_canonical.items() if k and v}
+    return hashlib.sha256(raw).hexdigest(), synonym_map
+
+
+@lru_cache(maxsize=1)
+def _compile_synonyms(stamp: tuple[int, int] | None) -> SynonymPatterns:
+    """Word-boundary patterns for each variant, longest first."""
+    _, synonym_map = _read_synonyms(stamp)
+    return tuple(
+        (
+            re.compile(_WORD_BOUNDARY.format(term=re.escape(variant)), flags=re.IGNORECASE),
+            synonym_map[variant],
+        )
+        for variant in sorted(synonym_map, key=len, reverse=True)
+    )
+
+
+def current_synonyms() -> Synonyms:
+    """The current synonyms.yml, re-read and recompiled only when the file changes."""
+    stamp = _synonym_file_stamp()
+    digest, synonym_map = _read_synonyms(stamp)
+    return Synonyms(digest, synonym_map, _compile_synonyms(stamp))
+
 
+def synonyms_digest() -> str:
+    """SHA-256 of the current synonyms.yml ("missing" if absent), without compiling it."""
+    return _read_synonyms(_synonym_file_stamp())[0]
 
-def _apply_synonyms(text: str) -> str:
+
+def _load_synonym_map() -> dict[str, str]:
+    """Load explicit synonym mappings from synonyms.yml."""
+    return _read_synonyms(_synonym_file_stamp())[1]
+
+
+def _compiled_synonyms() -> SynonymPatterns:
+    """Word-boundary patterns for each variant, longest first, compiled once per file version."""
+    return _compile_synonyms(_synonym_file_stamp())
+
+
+def _apply_synonyms(text: str, patterns: SynonymPatterns | None = None) -> str:
     """Replace phrase and word variants with canonical terms."""
     normalized_text = text
-    synonym_map = _load_synonym_map()
-    ordered_variants = sorted(synonym_map, key=len, reverse=True)
-    for variant in ordered_variants:
-        pattern = re.compile(
-            _WORD_BOUNDARY.format(term=re.escape(variant)),
-            flags=re.IGNORECASE,
-        )
-        normalized_text = pattern.sub(synonym_map[variant], normalized_text)
+    for pattern, canonical in patterns if patterns is not None else _compiled_synonyms():
+        normalized_text = pattern.sub(canonical, normalized_text)
     normalized_text = _WHITESPACE_RUNS.sub(" ", normalized_text)
     return normalized_text.strip()
 
@@ -101,11 +157,15 @@ def _extract_unit_info(description: str) -> UnitInfo | None:
     }
 
 
-def normalize(records: list[dict]) -> list[dict]:
-    """Normalize a list of raw records."""
+def normalize(records: list[dict], synonyms: Synonyms | None = None) -> list[dict]:
+    """Normalize a list of raw records (carrying ``record_id`` when present).
+
+    ``synonyms`` defaults to `current_synonyms`, looked up once per call.
+    """
+    patterns = (synonyms or current_synonyms()).patterns
     normalized: list[dict] = []
     for record in records:
-        description = _apply_synonyms(_clean_text(record.get("Description", "")))
+        description = _apply_synonyms(_clean_text(record.get("Description", "")), patterns)
         unit_info = _extract_unit_info(description)
         normalized_record = {
             "description": description,
@@ -115,5 +175,7 @@ def normalize(records: list[dict]) -> list[dict]:
         }
         if unit_info:
             normalized_record.update(unit_info)
+        if record.get("record_id") is not None:
+            normalized_record["record_id"] = str(record["record_id"])
         normalized.append(normalized_record)
     return normalized
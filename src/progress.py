@@ -0,0 +1,125 @@
+"""Progress events and cooperative cancellation for pipeline runs."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+ProgressCallback = Callable[[str, dict[str, Any]], None]
+
+_reporter: ContextVar[ProgressCallback | None] = ContextVar("progress_reporter", default=None)
+
+
+class PipelineCancelled(Exception):
+    """Raised at a progress checkpoint once the run has been cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag that also reaches pool worker processes.
+
+    Cancelling creates ``marker_path``; `cancelled` checks for it. A token
+    pickled into another process therefore sees a cancel made by the parent,
+    at the cost of one ``stat`` per check.
+    """
+
+    def __init__(self, marker_path: str | Path) -> None:
+        self.marker_path = str(marker_path)
+
+    @property
+    def cancelled(self) -> bool:
+        return os.path.exists(self.marker_path)
+
+    def cancel(self) -> None:
+        Path(self.marker_path).touch()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise PipelineCancelled(self.marker_path)
+
+    def discard(self) -> None:
+        """Remove the marker once the run is over."""
+        if os.path.exists(self.marker_path):
+            os.remove(self.marker_path)
+
+
+def report(kind: str, **data: Any) -> None:
+    """Send a progress event to the current run's listener, if any.
+
+    Stages call this between batches and tiles; outside `reporting_to` it is
+    a no-op, so the CLI and tests pay nothing for it. It doubles as the
+    cancellation checkpoint: a listener may raise `PipelineCancelled`.
+    """
+    callback = _reporter.get()
+    if callback is not None:
+        callback(kind, data)
+
+
+@contextmanager
+def reporting_to(callback: ProgressCallback) -> Iterator[None]:
+    """Route `report` calls made in this context (thread) to ``callback``."""
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+
+class ProgressBus:
+    """Ordered event log of one run that any number of readers can follow.
+
+    Every event gets a sequence number; readers poll `since` with the last
+    number they saw, so late subscribers and reconnecting clients replay
+    what they missed. Only the newest ``max_events`` are kept; a reader that
+    falls further behind gets a ``gap`` event saying how many it lost.
+    """
+
+    def __init__(self, *, max_events: int = 2000) -> None:
+        self._events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self._next_seq = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def publish(self, kind: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._events.append(
+                {"seq": self._next_seq, "event": kind, "time": time.time(), "data": data}
+            )
+            self._next_seq += 1
+
+    def close(self) -> None:
+        """Mark the run finished; later `publish` calls are dropped."""
+        with self._lock:
+            self._closed = True
+
+    def since(self, seq: int) -> tuple[list[dict[str, Any]], bool]:
+        """Events numbered above ``seq`` and whether the run is finished.
+
+        When some of those events were already evicted, the list starts with
+        a ``gap`` event whose data is ``{"missed": n}`` and whose sequence
+        number is the last one missed, so resuming after it loses nothing more.
+        """
+        with self._lock:
+            events = [event for event in self._events if event["seq"] > seq]
+            if events and events[0]["seq"] > seq + 1:
+                first = events[0]["seq"]
+                gap = {
+                    "seq": first - 1,
+                    "event": "gap",
+                    "time": events[0]["time"],
+                    "data": {"missed": first - seq - 1},
+                }
+                events.insert(0, gap)
+            return events, self._closed
@@ -0,0 +1,102 @@
+"""In-memory LRU + TTL cache of pipeline results keyed by upload content."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import json
+import threading
+import time
+from typing import Any
+
+
+def payload_size(payload: Any) -> int:
+    """Size of ``payload`` as encoded JSON, the measure `ResultCache` bounds."""
+    return len(json.dumps(payload, default=str).encode("utf-8"))
+
+
+class ResultCache:
+    """Keep recent evaluation payloads, bounded by count, age and size.
+
+    Entries expire ``ttl_seconds`` after they were stored. When adding an
+    entry would exceed ``max_entries`` or ``max_bytes`` (JSON-encoded size),
+    the least recently used entries are evicted first; a payload larger than
+    ``max_bytes`` on its own is not cached.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 32,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        if max_entries < 0 or max_bytes < 0 or ttl_seconds < 0:
+            raise ValueError("max_entries, max_bytes and ttl_seconds must be >= 0.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (stored_at, size in bytes, payload), most recently used last.
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        """Return ``(payload, age_seconds)`` for a live entry, else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, _, payload = entry
+            if now - stored_at > self.ttl_seconds:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload, now - stored_at
+
+    def put(self, key: str, payload: Any, size: int | None = None) -> bool:
+        """Store ``payload``; returns False when it is too large to keep.
+
+        ``size`` is the payload's `payload_size`, for callers that already
+        measured it off the event loop; otherwise it is computed here.
+        """
+        if size is None:
+            size = payload_size(payload)
+        if self.max_entries == 0 or size > self.max_bytes:
+            return False
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            expired = [
+                cached_key
+                for cached_key, (stored_at, _, _) in self._entries.items()
+                if now - stored_at > self.ttl_seconds
+            ]
+            for cached_key in expired:
+                self._drop(cached_key)
+            while self._entries and (
+                len(self._entries) >= self.max_entries
+                or self._total_bytes + size > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+            self._entries[key] = (now, size, payload)
+            self._total_bytes += size
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
@@ -0,0 +1,123 @@
+"""Carry cluster IDs over from a previous run by member overlap."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import TypedDict
+
+_ASSIGNMENTS_VERSION = 1
+
+
+class StoredAssignments(TypedDict):
+    next_cluster_id: int
+    assignments: dict[str, int]
+
+
+def load_assignments(path: str | Path) -> StoredAssignments:
+    """Load the previous run's record -> cluster ID map (empty when absent)."""
+    assignments_path = Path(path)
+    if not assignments_path.exists():
+        return {"next_cluster_id": 0, "assignments": {}}
+    payload = json.loads(assignments_path.read_text(encoding="utf-8"))
+    if payload.get("version") != _ASSIGNMENTS_VERSION:
+        raise ValueError(f"Unsupported assignments version in {assignments_path}.")
+    return {
+        "next_cluster_id": int(payload["next_cluster_id"]),
+        "assignments": {str(key): int(value) for key, value in payload["assignments"].items()},
+    }
+
+
+def save_assignments(path: str | Path, stored: StoredAssignments) -> None:
+    """Write assignments atomically so an interrupted run keeps the old file."""
+    assignments_path = Path(path)
+    assignments_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=assignments_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"version": _ASSIGNMENTS_VERSION, **stored}, handle)
+        os.replace(temp_path, assignments_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def match_cluster_ids(
+    clusters: list[dict],
+    previous: StoredAssignments,
+) -> tuple[list[dict], StoredAssignments, dict[str, int]]:
+    """Relabel ``clusters`` onto previous IDs by maximum member overlap.
+
+    Overlaps come from one hash join on ``record_id``. Pairs are matched
+    greedily from the largest overlap down (ties in input order), each side
+    at most once. Overlap values sum to at most n, so there are O(sqrt(n))
+    distinct values to order and the whole pass is linear. Unmatched new
+    clusters get fresh IDs that were never used before.
+
+    Returns the relabelled records, the assignments to store for the next
+    run, and merge/split/churn counts.
+    """
+    previous_ids = previous["assignments"]
+    overlap: dict[tuple[int, int], int] = defaultdict(int)
+    new_sizes: dict[int, int] = defaultdict(int)
+    for record in clusters:
+        new_id = int(record["cluster_id"])
+        new_sizes[new_id] += 1
+        old_id = previous_ids.get(str(record["record_id"]))
+        if old_id is not None:
+            overlap[(new_id, old_id)] += 1
+
+    by_overlap: dict[int, list[tuple[int, int]]] = defaultdict(list)
+    sources_per_new: dict[int, int] = defaultdict(int)
+    targets_per_old: dict[int, int] = defaultdict(int)
+    for (new_id, old_id), count in overlap.items():
+        by_overlap[count].append((old_id, new_id))
+        sources_per_new[new_id] += 1
+        targets_per_old[old_id] += 1
+
+    mapping: dict[int, int] = {}
+    used_old: set[int] = set()
+    for count in sorted(by_overlap, reverse=True):
+        for old_id, new_id in by_overlap[count]:
+            if new_id in mapping or old_id in used_old:
+                continue
+            mapping[new_id] = old_id
+            used_old.add(old_id)
+
+    next_cluster_id = max(
+        [previous["next_cluster_id"], *(cluster_id + 1 for cluster_id in previous_ids.values())]
+    )
+    fresh_clusters = 0
+    for new_id in sorted(new_sizes):
+        if new_id not in mapping:
+            mapping[new_id] = next_cluster_id
+            next_cluster_id += 1
+            fresh_clusters += 1
+
+    relabelled: list[dict] = []
+    assignments: dict[str, int] = {}
+    moved_records = 0
+    for record in clusters:
+        record_id = str(record["record_id"])
+        cluster_id = mapping[int(record["cluster_id"])]
+        relabelled.append({**record, "cluster_id": cluster_id})
+        assignments[record_id] = cluster_id
+        old_id = previous_ids.get(record_id)
+        if old_id is not None and old_id != cluster_id:
+            moved_records += 1
+
+    previous_clusters = set(previous_ids.values())
+    summary = {
+        "reused_clusters": len(used_old),
+        "new_clusters": fresh_clusters,
+        "retired_clusters": len(previous_clusters - used_old),
+        "merges": sum(1 for sources in sources_per_new.values() if sources > 1),
+        "splits": sum(1 for targets in targets_per_old.values() if targets > 1),
+        "moved_records": moved_records,
+        "added_records": sum(1 for record_id in assignments if record_id not in previous_ids),
+        "removed_records": sum(1 for record_id in previous_ids if record_id not in assignments),
+    }
+    return relabelled, {"next_cluster_id": next_cluster_id, "assignments": assignments}, summary
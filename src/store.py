@@ -0,0 +1,230 @@
+"""SQLite store for the latest run's assignments, labels and suspect flags."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+import json
+from pathlib import Path
+import sqlite3
+import threading
+
+DEFAULT_STORE_PATH = "data/assignments.db"
+_STORE_VERSION = 1
+# Upper bound for label prefix range scans (highest code point).
+_PREFIX_UPPER = "\U0010ffff"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    confidence REAL,
+    size INTEGER NOT NULL,
+    suspect INTEGER NOT NULL DEFAULT 0,
+    suspect_reasons TEXT,
+    risk_score REAL
+);
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    cluster_id INTEGER NOT NULL,
+    description_norm TEXT,
+    stock_code TEXT,
+    unit_value REAL,
+    unit_name TEXT,
+    unit_system TEXT
+);
+CREATE INDEX IF NOT EXISTS records_cluster_id ON records (cluster_id);
+CREATE INDEX IF NOT EXISTS records_stock_code ON records (stock_code);
+CREATE INDEX IF NOT EXISTS clusters_label ON clusters (label);
+"""
+
+_RECORD_COLUMNS = (
+    "record_id",
+    "cluster_id",
+    "description_norm",
+    "stock_code",
+    "unit_value",
+    "unit_name",
+    "unit_system",
+)
+_CLUSTER_COLUMNS = (
+    "cluster_id",
+    "label",
+    "confidence",
+    "size",
+    "suspect",
+    "suspect_reasons",
+    "risk_score",
+)
+
+
+def match_index_path(store_path: str | Path) -> Path:
+    """Vector index saved next to the store for `POST /match`."""
+    return Path(store_path).with_suffix(".index.npz")
+
+
+def _optional_float(value: object) -> float | None:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cluster_row(row: sqlite3.Row) -> dict:
+    cluster = dict(row)
+    cluster["suspect"] = bool(cluster["suspect"])
+    cluster["suspect_reasons"] = json.loads(cluster["suspect_reasons"] or "[]")
+    return cluster
+
+
+class AssignmentStore:
+    """Indexed SQLite snapshot of one pipeline run, in WAL mode.
+
+    ``write_run`` replaces the snapshot in a single transaction with bulk
+    inserts, so readers see either the previous run or the new one. Each
+    thread gets its own connection; WAL lets readers run while a write is
+    in progress.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def write_run(
+        self,
+        clusters: list[dict],
+        labels: dict[int, str],
+        confidences: dict[int, float] | None = None,
+        suspect_clusters: Iterable[dict] = (),
+    ) -> None:
+        """Replace the stored snapshot with the given run's outputs."""
+        confidences = confidences or {}
+        suspects = {int(entry["cluster_id"]): entry for entry in suspect_clusters}
+        sizes: dict[int, int] = {}
+        for record in clusters:
+            cluster_id = int(record["cluster_id"])
+            sizes[cluster_id] = sizes.get(cluster_id, 0) + 1
+
+        record_rows = (
+            (
+                str(record["record_id"]),
+                int(record["cluster_id"]),
+                record.get("description_norm"),
+                record.get("stock_code"),
+                _optional_float(record.get("unit_value")),
+                record.get("unit_name"),
+                record.get("unit_system"),
+            )
+            for record in clusters
+        )
+        cluster_rows = (
+            (
+                cluster_id,
+                str(labels.get(cluster_id, f"cluster {cluster_id}")),
+                confidences.get(cluster_id),
+                size,
+                int(cluster_id in suspects),
+                json.dumps(suspects.get(cluster_id, {}).get("reasons", [])),
+                suspects.get(cluster_id, {}).get("risk_score"),
+            )
+            for cluster_id, size in sizes.items()
+        )
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM records")
+            connection.execute("DELETE FROM clusters")
+            connection.executemany(
+                f"INSERT INTO records ({', '.join(_RECORD_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _RECORD_COLUMNS)})",
+                record_rows,
+            )
+            connection.executemany(
+                f"INSERT INTO clusters ({', '.join(_CLUSTER_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _CLUSTER_COLUMNS)})",
+                cluster_rows,
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("version", str(_STORE_VERSION)),
+                    ("num_records", str(len(clusters))),
+                    ("num_clusters", str(len(sizes))),
+                ],
+            )
+
+    def record(self, record_id: str) -> dict | None:
+        """One record with its cluster's label, confidence and suspect flag."""
+        row = self._connection().execute(
+            "SELECT r.*, c.label, c.confidence, c.suspect FROM records r "
+            "JOIN clusters c USING (cluster_id) WHERE r.record_id = ?",
+            (str(record_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["suspect"] = bool(record["suspect"])
+        return record
+
+    def records_by_stock_code(self, stock_code: str, *, limit: int = 100) -> list[dict]:
+        """Records carrying ``stock_code`` (exact match)."""
+        rows = self._connection().execute(
+            "SELECT * FROM records WHERE stock_code = ? ORDER BY record_id LIMIT ?",
+            (stock_code, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def cluster(self, cluster_id: int) -> dict | None:
+        """Cluster summary plus its member records."""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT * FROM clusters WHERE cluster_id = ?", (int(cluster_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        cluster = _cluster_row(row)
+        cluster["members"] = [
+            dict(member)
+            for member in connection.execute(
+                "SELECT * FROM records WHERE cluster_id = ? ORDER BY record_id",
+                (int(cluster_id),),
+            )
+        ]
+        return cluster
+
+    def clusters_by_label_prefix(self, prefix: str, *, limit: int = 50) -> list[dict]:
+        """Clusters whose label starts with ``prefix``, via an index range scan."""
+        rows = self._connection().execute(
+            "SELECT * FROM clusters WHERE label >= ? AND label < ? "
+            "ORDER BY label, cluster_id LIMIT ?",
+            (prefix, prefix + _PREFIX_UPPER, limit),
+        )
+        return [_cluster_row(row) for row in rows]
+
+    def summary(self) -> dict[str, int]:
+        """Record and cluster counts of the stored run."""
+        rows = self._connection().execute(
+            "SELECT key, value FROM meta WHERE key IN ('num_records', 'num_clusters')"
+        )
+        return {row["key"]: int(row["value"]) for row in rows}
@@ -0,0 +1,41 @@
+"""Find stored records affected by a change to synonyms.yml."""
+
+from __future__ import annotations
+
+import re
+
+from src.normalize import _WORD_BOUNDARY, _clean_text
+
+
+def diff_synonym_maps(old: dict[str, str], new: dict[str, str]) -> set[str]:
+    """Return variants that were added, removed or remapped to a new canonical."""
+    return {variant for variant in old.keys() | new.keys() if old.get(variant) != new.get(variant)}
+
+
+def _changed_terms_pattern(changed_variants: set[str]) -> re.Pattern[str] | None:
+    """One alternation over changed variants, longest first like `_apply_synonyms`."""
+    if not changed_variants:
+        return None
+    alternatives = "|".join(
+        re.escape(variant) for variant in sorted(changed_variants, key=len, reverse=True)
+    )
+    return re.compile(_WORD_BOUNDARY.format(term=f"(?:{alternatives})"), flags=re.IGNORECASE)
+
+
+def find_affected_records(records: list[dict], changed_variants: set[str]) -> list[dict]:
+    """Return records whose raw or normalized description contains a changed variant.
+
+    Raw text (cleaned, before synonyms) catches variants that are new or no
+    longer mapped; the stored normalized text catches variants that only
+    appear after an earlier replacement.
+    """
+    pattern = _changed_terms_pattern(changed_variants)
+    if pattern is None:
+        return []
+    affected: list[dict] = []
+    for record in records:
+        raw_text = _clean_text(record.get("description_raw", ""))
+        normalized_text = str(record.get("description_norm", ""))
+        if pattern.search(raw_text) or pattern.search(normalized_text):
+            affected.append(record)
+    return affected
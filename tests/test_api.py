@@ -2,13 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
+import functools
+import hashlib
 from io import BytesIO
+import json
+import os
+import re
+from tempfile import NamedTemporaryFile
+import threading
+import time
 
 import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException, Request
 from fastapi.testclient import TestClient
 
+import src.api
 from src.api import app
 from src.ingest import RETAIL_COLUMNS, RETAIL_SHEETS
+from src.jobs import JobCancelled
+from src.cluster_index import ClusterIndex
+from src.progress import CancelToken, report
+from src.result_cache import payload_size
+from src.store import AssignmentStore, match_index_path
 
 INVALID_XLSX_DETAIL = (
     "Invalid xlsx file upload. Please provide a valid .xlsx workbook "
@@ -16,6 +35,13 @@ INVALID_XLSX_DETAIL = (
 )
 
 
+@pytest.fixture(autouse=True)
+def _empty_result_cache():
+    src.api._results.clear()
+    yield
+    src.api._results.clear()
+
+
 def test_upload_form_route_renders_minimal_html() -> None:
     client = TestClient(app)
     response = client.get("/")
@@ -97,14 +123,72 @@ def test_cluster_endpoint_accepts_valid_xlsx(monkeypatch) -> None:
     }
 
 
+def test_cluster_endpoint_leaves_no_ingest_sidecar_cache(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    monkeypatch.setattr(
+        "src.api.extract",
+        lambda records: [
+            {"record_id": f"record-{index}", "description_norm": "", "feature_vector": [1.0, 0.0]}
+            for index, _ in enumerate(records)
+        ],
+    )
+    client = TestClient(app)
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert response.status_code == 200
+    assert list(tmp_path.iterdir()) == []
+
+
 def test_cluster_endpoint_rejects_invalid_extension() -> None:
     client = TestClient(app)
     response = client.post(
         "/cluster",
-        files={"file": ("demo.csv", b"not,xlsx", "text/csv")},
+        files={"file": ("demo.txt", b"not,xlsx", "text/plain")},
     )
     assert response.status_code == 400
-    assert response.json()["detail"] == "Expected a .xlsx file upload."
+    assert response.json()["detail"] == (
+        "Expected one of .xlsx, .csv, .tsv, .parquet, .ndjson, .jsonl file upload."
+    )
+
+
+def test_cluster_endpoint_accepts_csv_upload(monkeypatch) -> None:
+    client = TestClient(app)
+
+    def _fake_extract(records: list[dict]) -> list[dict]:
+        return [
+            {
+                "record_id": f"record-{index}",
+                "description_norm": str(record.get("description", "")),
+                "feature_vector": [1.0, 0.0],
+            }
+            for index, record in enumerate(records)
+        ]
+
+    monkeypatch.setattr("src.api.extract", _fake_extract)
+    csv_bytes = pd.DataFrame(
+        [{column: "1" for column in RETAIL_COLUMNS}], columns=RETAIL_COLUMNS
+    ).to_csv(index=False).encode()
+
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.csv", csv_bytes, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["num_records"] == 1
+
+
+def test_cluster_endpoint_rejects_csv_missing_required_columns() -> None:
+    client = TestClient(app)
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.csv", b"Invoice\n536365\n", "text/csv")},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid csv file upload.")
 
 
 def test_cluster_endpoint_requires_file() -> None:
@@ -235,7 +319,7 @@ def test_cluster_endpoint_includes_ranked_unmatched_tokens(monkeypatch) -> None:
 
     monkeypatch.setattr(
         "src.api.ingest",
-        lambda _path: [
+        lambda _path, **_kwargs: [
             {"Description": "Anchor rivet 2oz pack"},
             {"Description": "Rivet anchor pro"},
             {"Description": "Anchor and clamp"},
@@ -243,7 +327,7 @@ def test_cluster_endpoint_includes_ranked_unmatched_tokens(monkeypatch) -> None:
     )
     monkeypatch.setattr(
         "src.api.normalize",
-        lambda raw_records: [
+        lambda raw_records, _synonyms=None: [
             {
                 "description": str(row.get("Description", "")).lower(),
                 "unit_value": None,
@@ -290,3 +374,741 @@ def test_cluster_endpoint_includes_ranked_unmatched_tokens(monkeypatch) -> None:
         {"token": "clamp", "count": 1},
         {"token": "pro", "count": 1},
     ]
+
+
+def test_cluster_endpoint_threshold_cuts_cached_merge_tree(monkeypatch) -> None:
+    client = TestClient(app)
+    extract_calls: list[int] = []
+
+    def _fake_extract(records: list[dict]) -> list[dict]:
+        extract_calls.append(len(records))
+        unit = {"unit_name": "ml", "unit_system": "metric"}
+        return [
+            {"record_id": "a", "description_norm": "mug", "feature_vector": [1.0, 0.0], **unit},
+            {"record_id": "b", "description_norm": "mug", "feature_vector": [0.9, 0.3], **unit},
+        ]
+
+    monkeypatch.setattr("src.api.extract", _fake_extract)
+    monkeypatch.setattr("src.api._merge_trees", src.api.ResultCache(ttl_seconds=float("inf")))
+    workbook = _build_workbook_bytes()
+    files = {"file": ("demo.xlsx", workbook, "application/octet-stream")}
+
+    loose = client.post("/cluster", params={"threshold": 0.8}, files=files)
+    strict = client.post("/cluster", params={"threshold": 0.99}, files=files)
+    invalid = client.post("/cluster", params={"threshold": 1.5}, files=files)
+    below_floor = client.post("/cluster", params={"threshold": 0.2}, files=files)
+
+    assert loose.status_code == 200
+    assert loose.json()["num_clusters"] == 1
+    assert strict.status_code == 200
+    assert strict.json()["num_clusters"] == 2
+    assert len(extract_calls) == 1
+    assert invalid.status_code == 422
+    assert below_floor.status_code == 422
+    tree_key = src.api._merge_tree_key(
+        hashlib.sha256(workbook).hexdigest(), src.api.synonyms_digest()
+    )
+    tree, _ = src.api._cached_merge_tree(tree_key)
+    assert tree.min_similarity == src.api.MERGE_TREE_MIN_SIMILARITY
+
+
+def test_merge_tree_is_cached_in_the_server_process_and_cut_without_a_worker(
+    monkeypatch,
+) -> None:
+    def _fake_extract(records: list[dict]) -> list[dict]:
+        unit = {"unit_name": "ml", "unit_system": "metric"}
+        return [
+            {"record_id": "a", "description_norm": "mug", "feature_vector": [1.0, 0.0], **unit},
+            {"record_id": "b", "description_norm": "mug", "feature_vector": [0.9, 0.3], **unit},
+        ]
+
+    monkeypatch.setattr("src.api.extract", _fake_extract)
+    monkeypatch.setattr("src.api._merge_trees", src.api.ResultCache(ttl_seconds=float("inf")))
+    monkeypatch.setattr("src.api._metrics", Counter())
+    workbook = _build_workbook_bytes()
+    files = {"file": ("demo.xlsx", workbook, "application/octet-stream")}
+    content_hash = {"X-Content-SHA256": hashlib.sha256(workbook).hexdigest()}
+
+    with TestClient(app) as client:
+        loose = client.post("/cluster", params={"threshold": 0.8}, files=files)
+        monkeypatch.setattr("src.api.PIPELINE_WORKERS", 0)
+        strict = client.post(
+            "/cluster", params={"threshold": 0.99}, files=files, headers=content_hash
+        )
+        job_id = client.post("/jobs", params={"threshold": 0.95}, files=files).json()["job_id"]
+        job = _wait_for_job(client, job_id, ("succeeded", "failed"))
+
+    assert loose.json()["num_clusters"] == 1
+    assert strict.status_code == 200
+    assert strict.json()["num_clusters"] == 2
+    assert job["status"] == "succeeded"
+    assert job["result"]["num_clusters"] == 2
+    assert len(src.api._merge_trees) == 1
+    assert src.api._metrics["pipelines_started"] == 1
+    assert src.api._metrics["merge_tree_cuts"] == 1
+
+
+def test_merge_tree_cache_is_bounded_by_tree_size(monkeypatch) -> None:
+    features = [
+        {"record_id": str(index), "feature_vector": [float(index), 1.0]} for index in range(50)
+    ]
+    tree = src.api.build_merge_tree(features)
+    monkeypatch.setattr(
+        "src.api._merge_trees",
+        src.api.ResultCache(max_bytes=tree.nbytes + 100, ttl_seconds=float("inf")),
+    )
+
+    src.api._store_merge_tree("first", tree, [])
+    src.api._store_merge_tree("second", tree, [])
+
+    assert src.api._cached_merge_tree("first") is None
+    assert src.api._cached_merge_tree("second") == (tree, [])
+
+
+def test_synonyms_change_invalidates_merge_tree_and_result(monkeypatch, tmp_path) -> None:
+    synonyms_path = tmp_path / "synonyms.yml"
+    synonyms_path.write_text('{"variant_to_canonical": {"tlight": "t light"}}', encoding="utf-8")
+    monkeypatch.setattr("src.normalize._SYNONYM_PATH", synonyms_path)
+    monkeypatch.setattr("src.api._merge_trees", src.api.ResultCache(ttl_seconds=float("inf")))
+    extract_calls: list[int] = []
+
+    def counting_extract(records):
+        extract_calls.append(len(records))
+        return _fake_unit_extract(records)
+
+    monkeypatch.setattr("src.api.extract", counting_extract)
+    client = TestClient(app)
+    files = {"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")}
+
+    first = client.post("/cluster", params={"threshold": 0.9}, files=files)
+    synonyms_path.write_text(
+        '{"variant_to_canonical": {"tlight": "tea light", "holder": "stand"}}', encoding="utf-8"
+    )
+    second = client.post("/cluster", params={"threshold": 0.9}, files=files)
+
+    assert first.headers["X-Cache"] == second.headers["X-Cache"] == "miss"
+    assert first.headers["X-Cache-Key"] != second.headers["X-Cache-Key"]
+    assert len(extract_calls) == 2
+    assert len(src.api._merge_trees) == 2
+
+
+def test_store_endpoints_read_written_run(monkeypatch, tmp_path) -> None:
+    store_path = tmp_path / "assignments.db"
+    AssignmentStore(store_path).write_run(
+        [{"record_id": "a", "cluster_id": 3, "description_norm": "mug", "stock_code": "X1"}],
+        {3: "white mug"},
+        {3: 0.8},
+    )
+    monkeypatch.setenv("SPG_STORE_PATH", str(store_path))
+    client = TestClient(app)
+
+    assert client.get("/records/a").json()["label"] == "white mug"
+    assert client.get("/records/zzz").status_code == 404
+    assert [row["record_id"] for row in client.get("/records?stock_code=X1").json()["records"]] == [
+        "a"
+    ]
+    assert client.get("/clusters/3").json()["members"][0]["record_id"] == "a"
+    assert client.get("/clusters?label_prefix=white").json()["clusters"][0]["cluster_id"] == 3
+
+
+def test_store_endpoints_return_404_without_store(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("SPG_STORE_PATH", str(tmp_path / "missing.db"))
+    client = TestClient(app)
+
+    response = client.get("/clusters/0")
+
+    assert response.status_code == 404
+    assert "--store-path" in response.json()["detail"]
+
+
+def test_match_endpoint_returns_best_gated_cluster(monkeypatch, tmp_path) -> None:
+    store_path = tmp_path / "assignments.db"
+    unit = {"unit_name": "ml", "unit_system": "metric", "unit_value": 500.0}
+    stored = [
+        {"record_id": "a", "cluster_id": 2, "description_norm": "olive oil", **unit},
+        {"record_id": "b", "cluster_id": 5, "description_norm": "white mug", "stock_code": "X1"},
+    ]
+    stored[0]["feature_vector"] = [1.0, 0.0]
+    stored[1]["feature_vector"] = [0.0, 1.0]
+    ClusterIndex.from_clustered_records(stored).save(match_index_path(store_path))
+    embedded: list[list[str]] = []
+
+    class _FakeProvider:
+        def embed(self, texts: list[str]) -> list[list[float]]:
+            embedded.append(texts)
+            return [[0.9, 0.1] for _ in texts]
+
+    monkeypatch.setenv("SPG_STORE_PATH", str(store_path))
+    monkeypatch.setattr("src.api._embedding_provider", lambda: _FakeProvider())
+    client = TestClient(app)
+
+    matched = client.post("/match", json={"description": "Olive Oil 0.5L"})
+    gated_out = client.post("/match", json={"description": "Olive Oil 1L"})
+
+    assert matched.status_code == 200
+    assert matched.json() == {
+        "description_norm": "olive oil 0.5 l",
+        "cluster_id": 2,
+        "label": "olive oil 500 ml",
+        "similarity": 0.993884,
+        "matched_record_id": "a",
+        "accepted": True,
+    }
+    assert gated_out.json()["cluster_id"] is None
+    assert client.post("/match", json={"description": ""}).status_code == 422
+
+
+def _fake_unit_extract(records: list[dict]) -> list[dict]:
+    return [
+        {
+            "record_id": f"record-{index}",
+            "description_norm": str(record.get("description", "")),
+            "feature_vector": [1.0, 0.0],
+        }
+        for index, record in enumerate(records)
+    ]
+
+
+def test_jobs_endpoint_runs_pipeline_in_background(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+
+    submitted = client.post(
+        "/jobs",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job_id"]
+    assert submitted.json()["status_url"] == f"/jobs/{job_id}"
+    deadline = time.time() + 10
+    status = client.get(f"/jobs/{job_id}").json()
+    while status["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.02)
+        status = client.get(f"/jobs/{job_id}").json()
+    assert status["status"] == "succeeded"
+    assert status["stages"]["evaluate"]["status"] == "done"
+    assert status["result"]["num_records"] == 2
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+
+def _reporting_extract(records: list[dict]) -> list[dict]:
+    report("embedding_batch", done=1, total=1, pid=os.getpid())
+    return _fake_unit_extract(records)
+
+
+def _slow_extract(records: list[dict]) -> list[dict]:
+    for batch in range(500):
+        report("embedding_batch", done=batch, total=500)
+        time.sleep(0.01)
+    return _fake_unit_extract(records)
+
+
+def _wait_for_job(client: TestClient, job_id: str, statuses: tuple[str, ...]) -> dict:
+    deadline = time.time() + 20
+    status = client.get(f"/jobs/{job_id}").json()
+    while status["status"] not in statuses and time.time() < deadline:
+        time.sleep(0.02)
+        status = client.get(f"/jobs/{job_id}").json()
+    return status
+
+
+def test_jobs_run_in_process_pool_and_relay_progress(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _reporting_extract)
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/jobs",
+            files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+        ).json()["job_id"]
+        status = _wait_for_job(client, job_id, ("succeeded", "failed"))
+        events, closed = src.api.jobs.events(job_id).since(-1)
+
+    assert status["status"] == "succeeded"
+    assert status["stages"]["evaluate"]["status"] == "done"
+    assert status["result"]["num_records"] == 2
+    assert closed
+    batches = [event["data"] for event in events if event["event"] == "embedding_batch"]
+    assert batches and batches[0]["stage"] == "extract"
+    assert batches[0]["pid"] != os.getpid()
+
+
+def test_cancelling_a_job_stops_its_pool_worker(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _slow_extract)
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/jobs",
+            files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+        ).json()["job_id"]
+        deadline = time.time() + 20
+        while (
+            client.get(f"/jobs/{job_id}").json()["stage"] != "extract"
+            and time.time() < deadline
+        ):
+            time.sleep(0.02)
+        started = time.time()
+        client.delete(f"/jobs/{job_id}")
+        status = _wait_for_job(client, job_id, ("cancelled", "failed", "succeeded"))
+
+    assert status["status"] == "cancelled"
+    assert time.time() - started < 4
+
+
+def test_jobs_endpoint_rejects_when_queue_is_full(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.jobs.has_capacity", lambda: False)
+    client = TestClient(app)
+
+    response = client.post(
+        "/jobs",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_pipeline_cancelled_at_ingest_is_not_reported_as_bad_upload(tmp_path) -> None:
+    upload = tmp_path / "demo.xlsx"
+    upload.write_bytes(_build_workbook_bytes())
+
+    def on_stage(name: str) -> None:
+        raise JobCancelled("job")
+
+    with pytest.raises(JobCancelled):
+        src.api._run_pipeline_stages(str(upload), ".xlsx", "cancel-at-ingest", on_stage=on_stage)
+
+
+def test_cluster_endpoint_rejects_when_pipelines_are_saturated(monkeypatch) -> None:
+    monkeypatch.setattr("src.api._active_pipelines", 2)
+    monkeypatch.setattr("src.api.PIPELINE_WORKERS", 2)
+    client = TestClient(app)
+
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_saturated_server_rejects_upload_before_reading_its_body(monkeypatch) -> None:
+    monkeypatch.setattr("src.api._active_pipelines", 2)
+    monkeypatch.setattr("src.api.PIPELINE_WORKERS", 2)
+    received: list[int] = []
+    request = _streamed_request([_multipart_body("demo.xlsx", b"x" * 5000)], received)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(src.api._run_pipeline_from_upload(request))
+
+    assert raised.value.status_code == 503
+    assert received == []
+
+
+def test_saturated_server_serves_cached_upload_named_by_content_hash(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    monkeypatch.setattr("src.api._results", src.api.ResultCache())
+    client = TestClient(app)
+    workbook = _build_workbook_bytes()
+    files = {"file": ("demo.xlsx", workbook, "application/octet-stream")}
+    assert client.post("/cluster", files=files).status_code == 200
+    monkeypatch.setattr("src.api._active_pipelines", 2)
+    monkeypatch.setattr("src.api.PIPELINE_WORKERS", 2)
+
+    named = client.post(
+        "/cluster",
+        files=files,
+        headers={"X-Content-SHA256": hashlib.sha256(workbook).hexdigest()},
+    )
+    unnamed = client.post("/cluster", files=files)
+    misnamed = client.post("/cluster", files=files, headers={"X-Content-SHA256": "0" * 64})
+
+    assert named.status_code == 200
+    assert named.headers["X-Cache"] == "hit"
+    assert unnamed.status_code == 503
+    assert misnamed.status_code == 503
+
+
+def test_cluster_endpoint_runs_pipeline_off_the_event_loop(monkeypatch) -> None:
+    threads: list[str] = []
+
+    def fake_extract(records):
+        threads.append(threading.current_thread().name)
+        return _fake_unit_extract(records)
+
+    def recording_payload_size(payload):
+        threads.append(threading.current_thread().name)
+        return payload_size(payload)
+
+    monkeypatch.setattr("src.api.extract", fake_extract)
+    monkeypatch.setattr("src.api.payload_size", recording_payload_size)
+    monkeypatch.setattr("src.result_cache.payload_size", recording_payload_size)
+    client = TestClient(app)
+
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert response.status_code == 200
+    assert len(threads) == 2
+    assert all(name.startswith("spg-pipeline") for name in threads)
+    assert src.api._active_pipelines == 0
+    assert len(src.api._results) == 1
+
+
+def test_lifespan_starts_and_stops_process_pool() -> None:
+    with TestClient(app) as client:
+        assert src.api._process_pool is not None
+        assert client.get("/").status_code == 200
+    assert src.api._process_pool is None
+
+
+_BOUNDARY = "spg-test-boundary"
+
+
+def _multipart_body(filename: str, content: bytes) -> bytes:
+    return (
+        f"--{_BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{_BOUNDARY}--\r\n".encode()
+
+
+def _streamed_request(
+    chunks: list[bytes], received: list[int], headers: dict[str, str] | None = None
+) -> Request:
+    """A request whose body arrives in ``chunks``, counting how many were read."""
+    pending = list(chunks)
+
+    async def receive() -> dict:
+        received.append(1)
+        chunk = pending.pop(0) if pending else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    raw_headers = {"content-type": f"multipart/form-data; boundary={_BOUNDARY}", **(headers or {})}
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/cluster",
+        "headers": [(key.encode(), value.encode()) for key, value in raw_headers.items()],
+    }
+    return Request(scope, receive)
+
+
+def test_cluster_endpoint_rejects_oversized_upload(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("src.api.MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(
+        "src.api.NamedTemporaryFile", functools.partial(NamedTemporaryFile, dir=tmp_path)
+    )
+    client = TestClient(app)
+
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.csv", b"x" * 5000, "text/csv")},
+    )
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_form_upload_over_declared_length_is_rejected_before_reading(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.MAX_UPLOAD_BYTES", 1000)
+    received: list[int] = []
+    request = _streamed_request(
+        [_multipart_body("demo.csv", b"x" * 5000)], received, {"content-length": "5100"}
+    )
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(src.api._spool_form_upload(request))
+
+    assert raised.value.status_code == 413
+    assert received == []
+
+
+def test_form_upload_stops_reading_once_over_limit(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("src.api.MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(
+        "src.api.NamedTemporaryFile", functools.partial(NamedTemporaryFile, dir=tmp_path)
+    )
+    body = _multipart_body("demo.csv", b"x" * 5000)
+    chunks = [body[offset : offset + 256] for offset in range(0, len(body), 256)]
+    received: list[int] = []
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(src.api._spool_form_upload(_streamed_request(chunks, received)))
+
+    assert raised.value.status_code == 413
+    assert len(received) == 4
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_form_upload_rejects_unsupported_extension_before_spooling(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(
+        "src.api.NamedTemporaryFile", functools.partial(NamedTemporaryFile, dir=tmp_path)
+    )
+    request = _streamed_request([_multipart_body("demo.txt", b"x")], [])
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(src.api._spool_form_upload(request))
+
+    assert raised.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_form_upload_writes_file_part_once_and_hashes_it() -> None:
+    content = bytes(range(256)) * 3
+    body = _multipart_body("Demo.CSV", content)
+    chunks = [body[offset : offset + 7] for offset in range(0, len(body), 7)]
+
+    temp_path, suffix, content_key = asyncio.run(
+        src.api._spool_form_upload(_streamed_request(chunks, []))
+    )
+    try:
+        with open(temp_path, "rb") as handle:
+            assert handle.read() == content
+        assert suffix == ".csv"
+        assert content_key == hashlib.sha256(content).hexdigest()
+    finally:
+        os.remove(temp_path)
+
+
+def test_cluster_endpoint_serves_repeated_upload_from_result_cache(monkeypatch) -> None:
+    extract_calls: list[int] = []
+
+    def counting_extract(records):
+        extract_calls.append(len(records))
+        return _fake_unit_extract(records)
+
+    monkeypatch.setattr("src.api.extract", counting_extract)
+    client = TestClient(app)
+    files = {"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")}
+
+    first = client.post("/cluster", files=files)
+    second = client.post("/cluster", files=files)
+    view = client.post("/cluster/view", files=files)
+    other_threshold = client.post("/cluster?threshold=0.5", files=files)
+
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert second.headers["X-Cache-Key"] == first.headers["X-Cache-Key"]
+    assert second.json() == first.json()
+    assert view.headers["X-Cache"] == "hit"
+    assert other_threshold.headers["X-Cache"] == "miss"
+    assert len(extract_calls) == 2
+
+
+def test_cluster_endpoint_streams_ndjson_clusters(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+
+    response = client.post(
+        "/cluster",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["X-Num-Clusters"] == "2"
+    assert response.headers["X-Cache"] == "miss"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["cluster_id"] for line in lines] == [0, 1]
+    assert set(lines[0]) == {"cluster_id", "label", "size", "suspect", "reasons", "risk_score"}
+
+
+def test_cluster_endpoint_paginates_with_cursor(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+
+    first = client.post(
+        "/cluster?limit=1",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    ).json()
+    second = client.get(
+        "/cluster/pages", params={"cursor": first["next_cursor"], "limit": 1}
+    ).json()
+
+    assert first["num_clusters"] == 2
+    assert [row["cluster_id"] for row in first["clusters"]] == [0]
+    assert [row["cluster_id"] for row in second["clusters"]] == [1]
+    assert second["next_cursor"] is None
+
+    src.api._results.clear()
+    expired = client.get("/cluster/pages", params={"cursor": first["next_cursor"]})
+    assert expired.status_code == 410
+    assert client.get("/cluster/pages", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_cluster_view_endpoint_pages_large_tables(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+
+    response = client.post(
+        "/cluster/view?page_size=1",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    )
+
+    assert response.status_code == 200
+    assert "Clusters 1-1 of 2" in response.text
+    assert response.text.count("<tr>") == 2
+    next_link = re.search(r'href="(/cluster/view/pages\?[^"]+)">Next', response.text).group(1)
+    page = client.get(next_link.replace("&amp;", "&"))
+    assert page.status_code == 200
+    assert "Clusters 2-2 of 2" in page.text
+    assert ">Previous<" in page.text
+    assert ">Next<" not in page.text
+
+
+def test_uncached_result_is_returned_whole_without_cursor(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    monkeypatch.setattr("src.api._results", src.api.ResultCache(max_bytes=10))
+    client = TestClient(app)
+    files = {"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")}
+
+    page = client.post("/cluster?limit=1", files=files).json()
+    view = client.post("/cluster/view?page_size=1", files=files)
+
+    assert len(src.api._results) == 0
+    assert [row["cluster_id"] for row in page["clusters"]] == [0, 1]
+    assert page["next_cursor"] is None
+    assert "Clusters 1-2 of 2" in view.text
+    assert "/cluster/view/pages" not in view.text
+
+
+def test_cluster_endpoint_negotiates_arrow_stream(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+    files = {"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")}
+
+    response = client.post(
+        "/cluster", files=files, headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    default = client.post("/cluster", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("cluster_id").to_pylist() == [0, 1]
+    assert table.column("record_ids").to_pylist() == [["record-0"], ["record-1"]]
+    assert default.headers["content-type"] == "application/json"
+    assert default.headers["X-Cache"] == "hit"
+
+
+def test_cluster_records_endpoint_accepts_json_and_ndjson(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+    records = [
+        {"StockCode": "85123A", "Description": "WHITE HANGING HEART T-LIGHT HOLDER", "record_id": "a"},
+        {"StockCode": "71053", "Description": "WHITE METAL LANTERN", "record_id": "b"},
+    ]
+
+    as_array = client.post("/cluster/records", json=records)
+    as_lines = client.post(
+        "/cluster/records",
+        content="\n".join(json.dumps(record) for record in records),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert as_array.status_code == 200
+    assert as_array.json()["num_records"] == 2
+    assert as_lines.status_code == 200
+    assert as_lines.json()["cluster_sizes"] == as_array.json()["cluster_sizes"]
+
+
+def test_cluster_records_endpoint_rejects_bad_bodies() -> None:
+    client = TestClient(app)
+
+    missing = client.post("/cluster/records", json=[{"StockCode": "1"}])
+    malformed = client.post(
+        "/cluster/records", content=b"[{", headers={"Content-Type": "application/json"}
+    )
+    unsupported = client.post(
+        "/cluster/records", content=b"a,b", headers={"Content-Type": "text/csv"}
+    )
+    not_objects = client.post("/cluster/records", json=[["StockCode", "1"]])
+    partial_ids = client.post(
+        "/cluster/records",
+        json=[
+            {"StockCode": "1", "Description": "a", "record_id": "record-1"},
+            {"StockCode": "2", "Description": "b"},
+        ],
+    )
+
+    assert missing.status_code == 400
+    assert "Description" in missing.json()["detail"]
+    assert malformed.status_code == 400
+    assert unsupported.status_code == 415
+    assert not_objects.status_code == 400
+    assert partial_ids.status_code == 400
+    assert "record_id" in partial_ids.json()["detail"]
+
+
+def test_job_events_endpoint_streams_progress_as_sse(monkeypatch) -> None:
+    monkeypatch.setattr("src.api.extract", _fake_unit_extract)
+    client = TestClient(app)
+
+    job_id = client.post(
+        "/jobs",
+        files={"file": ("demo.xlsx", _build_workbook_bytes(), "application/octet-stream")},
+    ).json()["job_id"]
+    response = client.get(f"/jobs/{job_id}/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [block for block in response.text.split("\n\n") if block.startswith("id:")]
+    kinds = [block.split("\n")[1].removeprefix("event: ") for block in messages]
+    assert kinds[0] == "status"
+    assert "stage" in kinds and "records" in kinds and "similarity_tile" in kinds
+    assert messages[-1].endswith('data: {"status": "succeeded"}')
+
+    last_id = messages[-2].split("\n")[0].removeprefix("id: ")
+    resumed = client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": last_id})
+    assert resumed.text.count("id:") == 1
+    assert client.get("/jobs/unknown/events").status_code == 404
+
+
+class _DisconnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def test_pipeline_stops_and_cleans_up_when_client_disconnects(monkeypatch, tmp_path) -> None:
+    batches: list[int] = []
+
+    def slow_extract(records):
+        for batch in range(200):
+            report("embedding_batch", done=batch, total=200)
+            batches.append(batch)
+            time.sleep(0.01)
+        return _fake_unit_extract(records)
+
+    monkeypatch.setattr("src.api.extract", slow_extract)
+    monkeypatch.setattr("src.api.DISCONNECT_POLL_SECONDS", 0.01)
+    upload = tmp_path / "demo.xlsx"
+    upload.write_bytes(_build_workbook_bytes())
+    before = TestClient(app).get("/metrics").json()["pipelines"]["cancelled"]
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(
+            src.api._run_spooled(
+                str(upload), ".xlsx", "disconnect-test", None, None, request=_DisconnectedRequest()
+            )
+        )
+
+    assert raised.value.status_code == 499
+    assert len(batches) < 200
+    assert not upload.exists()
+    assert not (tmp_path / "demo.xlsx.cancel").exists()
+    metrics = TestClient(app).get("/metrics").json()
+    assert metrics["pipelines"]["cancelled"] == before + 1
+    assert metrics["pipelines"]["active"] == 0
+
+
+def test_pipeline_worker_returns_cancelled_outcome(tmp_path) -> None:
+    token = CancelToken(tmp_path / "run.cancel")
+    token.cancel()
+
+    assert src.api._pipeline_worker("missing.xlsx", ".xlsx", "key", None, None, token) == (
+        "cancelled",
+    )
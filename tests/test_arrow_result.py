@@ -0,0 +1,41 @@
+"""Tests for the Arrow IPC evaluation encoding."""
+
+from __future__ import annotations
+
+import pyarrow as pa
+
+from src.arrow_result import cluster_members, encode_evaluation
+
+
+def _evaluation() -> dict:
+    return {
+        "num_records": 3,
+        "num_clusters": 2,
+        "cluster_sizes": {"10": 1, "2": 2},
+        "labels": {"2": "white mug", "10": "red candle"},
+        "cluster_stats": {},
+        "suspect_clusters": [{"cluster_id": "10", "reasons": ["x"], "risk_score": 0.4}],
+    }
+
+
+def test_cluster_members_groups_record_ids_in_order() -> None:
+    clusters = [
+        {"record_id": "a", "cluster_id": 2},
+        {"record_id": "b", "cluster_id": 10},
+        {"record_id": "c", "cluster_id": 2},
+    ]
+
+    assert cluster_members(clusters) == {2: ["a", "c"], 10: ["b"]}
+
+
+def test_encode_evaluation_writes_parallel_columns() -> None:
+    payload = encode_evaluation(_evaluation(), {2: ["a", "c"], 10: ["b"]})
+
+    table = pa.ipc.open_stream(payload).read_all()
+    assert table.column("cluster_id").to_pylist() == [2, 10]
+    assert table.column("size").to_pylist() == [2, 1]
+    assert table.column("label").to_pylist() == ["white mug", "red candle"]
+    assert table.column("suspect").to_pylist() == [False, True]
+    assert table.column("risk_score").to_pylist() == [None, 0.4]
+    assert table.column("record_ids").to_pylist() == [["a", "c"], ["b"]]
+    assert table.schema.metadata[b"num_records"] == b"3"
@@ -0,0 +1,74 @@
+"""Tests for content-addressed stage checkpoints."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.checkpoint import CheckpointStore, StageRunner, file_digest
+
+
+def _run_pipeline(runner: StageRunner, calls: list[str], source: str) -> object:
+    def _stage(name: str, value: object):
+        def _compute() -> object:
+            calls.append(name)
+            return value
+
+        return _compute
+
+    raw = runner.run("ingest", (source,), _stage("ingest", [source]))
+    normalized = runner.run("normalize", ("synonyms-v1",), _stage("normalize", raw + ["n"]))
+    return runner.run("extract", ("model",), _stage("extract", normalized + ["e"]))
+
+
+def test_stage_runner_reuses_unchanged_stages(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path)
+    first_calls: list[str] = []
+    second_calls: list[str] = []
+
+    first = _run_pipeline(StageRunner(store), first_calls, "file-a")
+    runner = StageRunner(store)
+    second = _run_pipeline(runner, second_calls, "file-a")
+
+    assert first == second == ["file-a", "n", "e"]
+    assert first_calls == ["ingest", "normalize", "extract"]
+    assert second_calls == []
+    assert runner.reused == ["ingest", "normalize", "extract"]
+
+
+def test_stage_runner_invalidates_downstream_when_input_changes(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path)
+    _run_pipeline(StageRunner(store), [], "file-a")
+    calls: list[str] = []
+
+    result = _run_pipeline(StageRunner(store), calls, "file-b")
+
+    assert result == ["file-b", "n", "e"]
+    assert calls == ["ingest", "normalize", "extract"]
+
+
+def test_stage_runner_force_stage_recomputes_from_that_stage(tmp_path: Path) -> None:
+    store = CheckpointStore(tmp_path)
+    _run_pipeline(StageRunner(store), [], "file-a")
+    calls: list[str] = []
+
+    runner = StageRunner(store, force_stage="normalize")
+    _run_pipeline(runner, calls, "file-a")
+
+    assert calls == ["normalize", "extract"]
+    assert runner.reused == ["ingest"]
+
+
+def test_stage_runner_rejects_unknown_force_stage() -> None:
+    with pytest.raises(ValueError, match="Unknown stage 'report'"):
+        StageRunner(None, force_stage="report")
+
+
+def test_file_digest_tracks_content(tmp_path: Path) -> None:
+    path = tmp_path / "synonyms.yml"
+    assert file_digest(path) == "missing"
+    path.write_text("{}", encoding="utf-8")
+    before = file_digest(path)
+    path.write_text('{"a": "b"}', encoding="utf-8")
+    assert file_digest(path) != before
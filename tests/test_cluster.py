@@ -4,7 +4,9 @@ from __future__ import annotations
 
 import pytest
 
+import src.cluster
 from src.cluster import cluster
+from src.progress import CancelToken, PipelineCancelled, reporting_to
 
 
 def test_cluster_empty_input_returns_empty_list() -> None:
@@ -286,3 +288,51 @@ def test_cluster_preserves_optional_attributes_for_downstream_labeling() -> None
     assert result[0]["unit_value"] == 500.0
     assert result[0]["unit_name"] == "ml"
     assert result[0]["unit_system"] == "metric"
+
+
+def _axis_features(count: int) -> list[dict]:
+    return [
+        {"record_id": f"r{index}", "feature_vector": [float(index), 1.0]} for index in range(count)
+    ]
+
+
+def test_cluster_reports_similarity_tiles_while_computing_them(monkeypatch) -> None:
+    computed: list[int] = []
+    cosine = src.cluster._cosine_similarity
+
+    def counting_cosine(vector_a: list[float], vector_b: list[float]) -> float:
+        computed.append(1)
+        return cosine(vector_a, vector_b)
+
+    monkeypatch.setattr("src.cluster._cosine_similarity", counting_cosine)
+    monkeypatch.setattr("src.cluster.SIMILARITY_TILE_ROWS", 2)
+    tiles: list[tuple[int, int]] = []
+
+    with reporting_to(lambda _kind, data: tiles.append((data["done"], len(computed)))):
+        cluster(_axis_features(6))
+
+    # Pairs computed before each report: rows 0-1 hold 5 + 4, rows 2-3 hold 3 + 2.
+    assert tiles == [(0, 0), (2, 9), (4, 14), (6, 15)]
+
+
+def test_cluster_cancellation_stops_the_similarity_scan_at_the_next_tile(
+    monkeypatch, tmp_path
+) -> None:
+    token = CancelToken(tmp_path / "run.cancel")
+    computed: list[int] = []
+    cosine = src.cluster._cosine_similarity
+
+    def cancelling_cosine(vector_a: list[float], vector_b: list[float]) -> float:
+        computed.append(1)
+        if len(computed) == 3:
+            token.cancel()
+        return cosine(vector_a, vector_b)
+
+    monkeypatch.setattr("src.cluster._cosine_similarity", cancelling_cosine)
+    monkeypatch.setattr("src.cluster.SIMILARITY_TILE_ROWS", 2)
+
+    with reporting_to(lambda _kind, _data: token.raise_if_cancelled()):
+        with pytest.raises(PipelineCancelled):
+            cluster(_axis_features(6))
+
+    assert len(computed) == 9
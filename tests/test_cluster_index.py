@@ -0,0 +1,161 @@
+"""Tests for the persistent incremental cluster index."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from src.canonicalize import canonicalize_with_confidence
+from src.cluster import cluster
+from src.cluster_index import ClusterIndex
+
+
+def _feature(record_id: str, vector: list[float], **attributes: object) -> dict:
+    return {
+        "record_id": record_id,
+        "description_norm": record_id,
+        "feature_vector": vector,
+        **attributes,
+    }
+
+
+def _partition(records: list[dict]) -> set[frozenset[str]]:
+    groups: dict[int, set[str]] = {}
+    for record in records:
+        groups.setdefault(int(record["cluster_id"]), set()).add(str(record["record_id"]))
+    return {frozenset(group) for group in groups.values()}
+
+
+def test_cluster_index_matches_full_cluster_partition() -> None:
+    rng = random.Random(7)
+    features = []
+    for index in range(60):
+        attributes: dict[str, object] = {}
+        if index % 3 == 0:
+            attributes["stock_code"] = f"S{index % 4}"
+        if index % 2 == 0:
+            attributes.update(unit_name="ml", unit_system="metric", unit_value=float(index % 3))
+        base = [1.0, 0.0, 0.0] if index % 5 else [0.0, 1.0, 0.0]
+        vector = [value + rng.uniform(-0.3, 0.3) for value in base]
+        features.append(_feature(f"r{index}", vector, **attributes))
+
+    index = ClusterIndex(similarity_threshold=0.85)
+    index.add(features[:40])
+    index.add(features[40:])
+
+    assert _partition(index.clustered_records()) == _partition(cluster(features))
+
+
+def test_cluster_index_keeps_existing_ids_and_allocates_new_ones() -> None:
+    index = ClusterIndex()
+    unit = {"unit_name": "ml", "unit_system": "metric", "unit_value": 500.0}
+    assert index.add(
+        [
+            _feature("a", [1.0, 0.0], **unit),
+            _feature("b", [0.0, 1.0], **unit),
+            _feature("c", [1.0, 0.0]),
+        ]
+    ) == [0, 1, 2]
+
+    new_ids = index.add(
+        [
+            _feature("d", [0.99, 0.01], **unit),
+            _feature("e", [-1.0, 0.0], **unit),
+        ]
+    )
+
+    assert new_ids == [0, 3]
+    assert index.cluster_id("a") == 0
+    assert index.cluster_id("b") == 1
+
+
+def test_cluster_index_merge_keeps_lowest_cluster_id() -> None:
+    index = ClusterIndex(similarity_threshold=0.7)
+    unit = {"unit_name": "g", "unit_system": "metric"}
+    index.add([_feature("a", [1.0, 0.0], **unit), _feature("b", [0.0, 1.0], **unit)])
+
+    assert index.add([_feature("bridge", [0.7071, 0.7071], **unit)]) == [0]
+    assert {index.cluster_id(record_id) for record_id in ("a", "b", "bridge")} == {0}
+    assert index.add([_feature("other", [-1.0, 0.0], **unit)]) == [2]
+
+
+def test_cluster_index_replace_splits_touched_cluster_and_keeps_majority_id() -> None:
+    index = ClusterIndex(similarity_threshold=0.9)
+    unit = {"unit_name": "ml", "unit_system": "metric"}
+    index.add(
+        [
+            _feature("a", [1.0, 0.0], **unit),
+            _feature("b", [0.99, 0.05], **unit),
+            _feature("c", [0.98, 0.1], **unit),
+            _feature("z", [0.0, 1.0], **unit),
+        ]
+    )
+    assert index.cluster_id("c") == 0
+
+    dirty = index.replace([_feature("c", [-1.0, 0.0])])
+
+    assert index.cluster_id("a") == index.cluster_id("b") == 0
+    assert index.cluster_id("c") == 2
+    assert index.cluster_id("z") == 1
+    assert dirty == [0, 2]
+    assert next(r for r in index.stored_records() if r["record_id"] == "c").get("unit_name") is None
+
+
+def test_cluster_index_save_and_load_round_trip(tmp_path: Path) -> None:
+    index = ClusterIndex(similarity_threshold=0.8)
+    index.add([_feature("a", [1.0, 0.0], stock_code="X1"), _feature("b", [0.9, 0.1], stock_code="X1")])
+    path = tmp_path / "index.npz"
+
+    index.save(path)
+    loaded = ClusterIndex.load(path)
+
+    assert loaded.similarity_threshold == 0.8
+    assert loaded.clustered_records() == index.clustered_records()
+    assert loaded.add([_feature("c", [1.0, 0.05], stock_code="x1")]) == [0]
+    assert "c" in loaded
+
+
+def test_cluster_index_stats_track_adds_merges_and_replacements(tmp_path: Path) -> None:
+    rng = random.Random(5)
+    unit = {"unit_name": "g", "unit_system": "metric"}
+    features = [
+        _feature(f"r{index}", [rng.uniform(0.0, 1.0), rng.uniform(0.0, 1.0)], **unit)
+        for index in range(30)
+    ]
+    index = ClusterIndex(similarity_threshold=0.97)
+    for start in range(0, 30, 7):
+        index.add(features[start : start + 7])
+    index.replace([_feature("r3", [-1.0, 0.2], **unit)])
+
+    clustered = index.clustered_records()
+    expected_labels, expected_confidences = canonicalize_with_confidence(clustered)
+    labels, confidences = index.canonical_labels(index.cluster_ids())
+
+    assert index.cluster_ids() == set(expected_labels)
+    assert labels == expected_labels
+    assert confidences == pytest.approx(expected_confidences, abs=1e-4)
+    path = tmp_path / "index.npz"
+    index.save(path)
+    reloaded = ClusterIndex.load(path)
+    assert reloaded.canonical_labels(reloaded.cluster_ids())[0] == expected_labels
+
+
+def test_cluster_index_best_match_respects_attribute_gate() -> None:
+    index = ClusterIndex.from_clustered_records(
+        [
+            {**_feature("a", [1.0, 0.0], stock_code="X1"), "cluster_id": 4},
+            {**_feature("b", [0.9, 0.1], stock_code="X1"), "cluster_id": 4},
+            {**_feature("c", [0.0, 1.0], stock_code="Y2"), "cluster_id": 9},
+        ]
+    )
+
+    assert index.cluster_id("b") == 4
+    assert index.best_match(_feature("q", [0.1, 1.0], stock_code="x1")) == {
+        "record_id": "b",
+        "cluster_id": 4,
+        "similarity": pytest.approx(0.2088, abs=1e-4),
+    }
+    assert index.best_match(_feature("q", [1.0, 0.0], stock_code="Z9")) is None
+    assert index.add([_feature("d", [0.0, 1.0], stock_code="Z9")]) == [10]
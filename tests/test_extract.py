@@ -6,8 +6,9 @@ from types import SimpleNamespace
 
 import pytest
 
-from src.embedding import OpenAIEmbeddingProvider
+from src.embedding import CachedEmbeddingProvider, OpenAIEmbeddingProvider
 from src.extract import extract
+from src.progress import reporting_to
 
 
 class _FakeProvider:
@@ -77,18 +78,70 @@ def test_openai_provider_calls_api_and_returns_float_vectors(monkeypatch) -> Non
             )
 
     class FakeOpenAI:
-        def __init__(self, *, api_key: str) -> None:
+        def __init__(self, *, api_key: str, timeout: float | None) -> None:
             observed["api_key"] = api_key
+            observed["timeout"] = timeout
             self.embeddings = FakeEmbeddings()
 
     monkeypatch.setattr("src.embedding.OpenAI", FakeOpenAI)
-    provider = OpenAIEmbeddingProvider(api_key="test-key")
+    provider = OpenAIEmbeddingProvider(api_key="test-key", timeout=12.5)
 
     vectors = provider.embed(["first", "second"])
 
     assert observed == {
         "api_key": "test-key",
+        "timeout": 12.5,
         "model": "text-embedding-3-small",
         "input": ["first", "second"],
     }
     assert vectors == [[1.0, 2.5, -3.0], [0.0, 4.0, 5.75]]
+
+
+def test_openai_provider_applies_timeout_to_injected_client() -> None:
+    options: list[dict] = []
+
+    class FakeClient:
+        def with_options(self, **kwargs):
+            options.append(kwargs)
+            return self
+
+    OpenAIEmbeddingProvider(client=FakeClient(), timeout=5.0)
+
+    assert options == [{"timeout": 5.0}]
+
+
+def test_cached_provider_embeds_only_misses_in_one_call_and_evicts_lru() -> None:
+    calls: list[list[str]] = []
+
+    class _CountingProvider:
+        def embed(self, texts: list[str]) -> list[list[float]]:
+            calls.append(list(texts))
+            return [[float(len(text))] for text in texts]
+
+    provider = CachedEmbeddingProvider(_CountingProvider(), max_entries=2)
+
+    assert provider.embed(["mug", "jar", "mug"]) == [[3.0], [3.0], [3.0]]
+    assert provider.embed(["jar", "teapot"]) == [[3.0], [6.0]]
+    assert provider.embed(["mug"]) == [[3.0]]
+    assert calls == [["mug", "jar"], ["teapot"], ["mug"]]
+
+
+def test_extract_embeds_in_batches_and_reports_progress() -> None:
+    calls: list[list[str]] = []
+    events: list[dict] = []
+
+    class CountingProvider:
+        def embed(self, texts: list[str]) -> list[list[float]]:
+            calls.append(list(texts))
+            return [[1.0, 0.0] for _ in texts]
+
+    records = [{"description": f"item {index}"} for index in range(5)]
+    with reporting_to(lambda kind, data: events.append({"event": kind, **data})):
+        features = extract(records, provider=CountingProvider(), batch_size=2)
+
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    assert [feature["description_norm"] for feature in features] == [
+        f"item {index}" for index in range(5)
+    ]
+    assert [event["done"] for event in events] == [2, 4, 5]
+    assert all(event["event"] == "embedding_batch" and event["total"] == 5 for event in events)
@@ -0,0 +1,141 @@
+"""Tests for incremental watermark and state persistence."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from src.cluster_index import ClusterIndex
+from src.incremental import (
+    advance_watermark,
+    load_state,
+    refresh_labels,
+    rows_after_watermark,
+    save_state,
+)
+from src.ingest import RecordBatch, _to_compact_frame
+
+
+def _batch(rows: list[tuple[str, str]]) -> RecordBatch:
+    frame = pd.DataFrame(
+        [
+            {
+                "Invoice": invoice,
+                "StockCode": "85123A",
+                "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+                "Quantity": 6,
+                "InvoiceDate": invoice_date,
+                "Price": 2.55,
+                "Customer ID": "17850",
+                "Country": "United Kingdom",
+            }
+            for invoice, invoice_date in rows
+        ]
+    )
+    return RecordBatch(_to_compact_frame(frame))
+
+
+def test_advance_watermark_tracks_max_date_and_invoices_seen_there() -> None:
+    batch = _batch(
+        [
+            ("536365", "2010-12-01 08:26:00"),
+            ("536367", "2010-12-01 09:00:00"),
+            ("536366", "2010-12-01 09:00:00"),
+        ]
+    )
+
+    assert advance_watermark(batch, None) == {
+        "max_invoice_date": "2010-12-01T09:00:00",
+        "invoices_at_max": ["536366", "536367"],
+    }
+    empty = RecordBatch(batch.frame.iloc[0:0])
+    previous = {"max_invoice_date": "2010-12-01T09:00:00", "invoices_at_max": ["536367"]}
+    assert advance_watermark(empty, previous) == previous
+
+    same_second = _batch([("C536368", "2010-12-01 09:00:00")])
+    assert advance_watermark(same_second, previous)["invoices_at_max"] == [
+        "536367",
+        "C536368",
+    ]
+
+
+def test_rows_after_watermark_keeps_later_dates_and_unseen_invoices_on_ties() -> None:
+    batch = _batch(
+        [
+            ("536365", "2010-12-01 08:26:00"),
+            ("536367", "2010-12-01 09:00:00"),
+            ("536368", "2010-12-01 09:00:00"),
+            ("536369", "2010-12-02 10:00:00"),
+        ]
+    )
+    watermark = {"max_invoice_date": "2010-12-01T09:00:00", "invoices_at_max": ["536367"]}
+
+    delta = rows_after_watermark(batch, watermark)
+
+    assert [record["Invoice"] for record in delta] == ["536368", "536369"]
+    assert rows_after_watermark(batch, None) is batch
+
+
+def test_rows_after_watermark_does_not_skip_numeric_invoices_after_a_cancellation() -> None:
+    first = _batch([("C536379", "2010-12-01 09:41:00")])
+    watermark = advance_watermark(first, None)
+    later_file = _batch(
+        [
+            ("C536379", "2010-12-01 09:41:00"),
+            ("536380", "2010-12-01 09:41:00"),
+        ]
+    )
+
+    delta = rows_after_watermark(later_file, watermark)
+
+    assert [record["Invoice"] for record in delta] == ["536380"]
+
+
+def test_state_round_trip(tmp_path: Path) -> None:
+    assert load_state(tmp_path / "missing") == {
+        "watermark": None,
+        "index": None,
+        "synonym_map": None,
+        "labels": {},
+        "confidences": {},
+    }
+    watermark = {"max_invoice_date": "2010-12-01T09:00:00", "invoices_at_max": ["536367"]}
+    index = ClusterIndex()
+    index.add([{"record_id": "a", "description_norm": "mug", "feature_vector": [0.25, 0.5]}])
+
+    save_state(
+        tmp_path / "state",
+        watermark,
+        index,
+        synonym_map={"ltr": "litre"},
+        labels={0: "mug"},
+        confidences={0: 0.9},
+    )
+    state = load_state(tmp_path / "state")
+
+    assert state["watermark"] == watermark
+    assert state["synonym_map"] == {"ltr": "litre"}
+    assert state["labels"] == {0: "mug"}
+    assert state["confidences"] == {0: 0.9}
+    assert state["index"].clustered_records() == index.clustered_records()
+
+
+def test_refresh_labels_only_reemits_dirty_and_new_clusters() -> None:
+    index = ClusterIndex()
+    unit = {"unit_name": "ml", "unit_system": "metric", "unit_value": 350.0}
+    index.add(
+        [
+            {"record_id": "a", "description_norm": "mug", "feature_vector": [1.0, 0.0], **unit},
+            {"record_id": "b", "description_norm": "jar", "feature_vector": [0.0, 1.0]},
+            {"record_id": "c", "description_norm": "cup", "feature_vector": [0.0, 1.0]},
+        ]
+    )
+
+    labels, confidences, stale = refresh_labels(
+        {0: "kept", 1: "old", 7: "gone"}, {0: 0.5, 1: 0.1, 7: 0.9}, index, {1}
+    )
+
+    assert stale == {1, 2}
+    assert labels == {0: "kept", 1: "jar", 2: "cup"}
+    assert confidences == {0: 0.5, 1: 0.4, 2: 0.4}
@@ -2,11 +2,27 @@
 
 from __future__ import annotations
 
+import io
+import json
+import os
+
 import pandas as pd
 import pytest
 from pathlib import Path
 
-from src.ingest import RETAIL_COLUMNS, RETAIL_SHEETS, ingest
+from src.ingest import (
+    RETAIL_COLUMNS,
+    RETAIL_SHEETS,
+    RecordBatch,
+    apply_row_filters,
+    collapse_catalog,
+    expand_to_rows,
+    ingest,
+    ingest_records,
+    iter_ingest_batches,
+    iter_json_array,
+    iter_ndjson,
+)
 
 
 def _write_two_sheet_workbook(path: str, df_1: pd.DataFrame, df_2: pd.DataFrame) -> None:
@@ -22,7 +38,7 @@ def test_ingest_raises_for_missing_required_column(tmp_path: Path) -> None:
     _write_two_sheet_workbook(str(file_path), df, df)
 
     with pytest.raises(ValueError, match="Missing required columns: Country"):
-        ingest(str(file_path))
+        ingest(str(file_path), cache_dir=tmp_path / "cache")
 
 
 def test_ingest_drops_fully_empty_rows(tmp_path: Path) -> None:
@@ -41,15 +57,15 @@ def test_ingest_drops_fully_empty_rows(tmp_path: Path) -> None:
     df = pd.DataFrame([valid_row, empty_row])
     _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
 
-    records = ingest(str(file_path))
+    records = ingest(str(file_path), cache_dir=tmp_path / "cache")
 
     assert len(records) == 1
     assert str(records[0]["Invoice"]) == "536365"
 
 
-def test_ingest_rejects_non_xlsx_input() -> None:
-    with pytest.raises(ValueError, match=r"Supported extension is \.xlsx"):
-        ingest("data/demo.csv")
+def test_ingest_rejects_unsupported_input() -> None:
+    with pytest.raises(ValueError, match=r"Supported extensions are \.xlsx, \.csv"):
+        ingest("data/demo.txt")
 
 
 def test_ingest_trims_column_name_whitespace(tmp_path: Path) -> None:
@@ -67,8 +83,350 @@ def test_ingest_trims_column_name_whitespace(tmp_path: Path) -> None:
     df = pd.DataFrame([row])
     _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
 
-    records = ingest(str(file_path))
+    records = ingest(str(file_path), cache_dir=tmp_path / "cache")
 
     assert len(records) == 1
     assert "Invoice" in records[0]
     assert " Invoice " not in records[0]
+
+
+def _retail_row(invoice: str) -> dict:
+    return {
+        "Invoice": invoice,
+        "StockCode": "85123A",
+        "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+        "Quantity": 6,
+        "InvoiceDate": "2010-12-01 08:26:00",
+        "Price": 2.55,
+        "Customer ID": "17850",
+        "Country": "United Kingdom",
+    }
+
+
+def test_iter_ingest_batches_yields_fixed_size_batches_across_sheets(tmp_path: Path) -> None:
+    file_path = tmp_path / "batches.xlsx"
+    df_1 = pd.DataFrame([_retail_row(str(536365 + index)) for index in range(3)])
+    df_2 = pd.DataFrame(
+        [_retail_row("536400"), {col: None for col in RETAIL_COLUMNS}, _retail_row("536401")]
+    )
+    _write_two_sheet_workbook(str(file_path), df_1, df_2)
+
+    batches = list(iter_ingest_batches(str(file_path), batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    invoices = [str(record["Invoice"]) for batch in batches for record in batch]
+    assert invoices == ["536365", "536366", "536367", "536400", "536401"]
+    assert set(batches[0][0]) == set(RETAIL_COLUMNS)
+
+
+def test_iter_ingest_batches_validates_headers_before_reading_rows(tmp_path: Path) -> None:
+    file_path = tmp_path / "bad_second_sheet.xlsx"
+    good = pd.DataFrame([_retail_row("536365")])
+    bad = pd.DataFrame([{col: "x" for col in RETAIL_COLUMNS if col != "Price"}])
+    _write_two_sheet_workbook(str(file_path), good, bad)
+
+    batches = iter_ingest_batches(str(file_path), batch_size=1)
+
+    with pytest.raises(ValueError, match="Missing required columns: Price"):
+        next(batches)
+
+
+def test_ingest_writes_sidecar_cache_and_reuses_it(tmp_path: Path, monkeypatch) -> None:
+    file_path = tmp_path / "cached.xlsx"
+    df = pd.DataFrame([_retail_row("536365"), _retail_row("536366")])
+    _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
+    cache_dir = tmp_path / "cache"
+
+    first = ingest(str(file_path), cache_dir=cache_dir)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def _fail_read_excel(*_args, **_kwargs):
+        raise AssertionError("cached workbook must not be re-parsed")
+
+    monkeypatch.setattr("src.ingest.pd.read_excel", _fail_read_excel)
+    second = ingest(str(file_path), cache_dir=cache_dir)
+
+    assert second.to_records() == first.to_records()
+    assert [record["Invoice"] for record in second] == ["536365", "536366"]
+    assert second[0]["Customer ID"] == "17850"
+    assert second[0]["Quantity"] == 6
+
+
+def test_ingest_cache_key_changes_with_workbook_content(tmp_path: Path) -> None:
+    file_path = tmp_path / "changing.xlsx"
+    cache_dir = tmp_path / "cache"
+    df = pd.DataFrame([_retail_row("536365")])
+    _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
+    ingest(str(file_path), cache_dir=cache_dir)
+
+    df_changed = pd.DataFrame([_retail_row("536365"), _retail_row("536999")])
+    _write_two_sheet_workbook(str(file_path), df_changed, df_changed.iloc[0:0])
+    records = ingest(str(file_path), cache_dir=cache_dir)
+
+    assert len(records) == 2
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_ingest_keeps_only_most_recently_used_sidecars(tmp_path: Path) -> None:
+    cache_dir = tmp_path / "cache"
+    paths = []
+    for day, invoice in enumerate(["536365", "536366", "536367"]):
+        file_path = tmp_path / f"day{day}.xlsx"
+        df = pd.DataFrame([_retail_row(invoice)])
+        _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
+        paths.append(file_path)
+
+    ingest(str(paths[0]), cache_dir=cache_dir, cache_entries=2)
+    first_sidecar = next(cache_dir.iterdir())
+    os.utime(first_sidecar, ns=(1, 1))
+    ingest(str(paths[1]), cache_dir=cache_dir, cache_entries=2)
+    second_sidecar = next(entry for entry in cache_dir.iterdir() if entry != first_sidecar)
+    os.utime(second_sidecar, ns=(2, 2))
+
+    # A cache hit counts as a use, so day 0 outlives day 1.
+    ingest(str(paths[0]), cache_dir=cache_dir, cache_entries=2)
+    ingest(str(paths[2]), cache_dir=cache_dir, cache_entries=2)
+
+    remaining = set(cache_dir.iterdir())
+    assert len(remaining) == 2
+    assert first_sidecar in remaining
+    assert second_sidecar not in remaining
+
+
+def test_ingest_parses_sheets_in_parallel_and_keeps_sheet_order(tmp_path: Path) -> None:
+    file_path = tmp_path / "three_years.xlsx"
+    sheets = ("Year 2009-2010", "Year 2010-2011", "Year 2011-2012")
+    with pd.ExcelWriter(str(file_path), engine="openpyxl") as writer:
+        for offset, sheet_name in enumerate(sheets):
+            rows = [_retail_row(f"5{offset}0000"), _retail_row(f"5{offset}0001")]
+            pd.DataFrame(rows).to_excel(writer, sheet_name=sheet_name, index=False)
+
+    parallel = ingest(str(file_path), sheets=sheets, max_workers=3, use_cache=False)
+    sequential = ingest(str(file_path), sheets=sheets, max_workers=1, use_cache=False)
+
+    assert [record["Invoice"] for record in parallel] == [
+        "500000",
+        "500001",
+        "510000",
+        "510001",
+        "520000",
+        "520001",
+    ]
+    assert parallel.to_records() == sequential.to_records()
+
+
+def _write_retail_file(path: Path, rows: list[dict]) -> None:
+    df = pd.DataFrame(rows)
+    df["Extra"] = "ignored"
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    elif path.suffix == ".tsv":
+        df.to_csv(path, sep="\t", index=False)
+    elif path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_json(path, orient="records", lines=True)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".tsv", ".parquet", ".ndjson", ".jsonl"])
+def test_ingest_reads_tabular_formats_in_chunks(tmp_path: Path, suffix: str) -> None:
+    file_path = tmp_path / f"retail{suffix}"
+    rows = [_retail_row(str(536365 + index)) for index in range(5)]
+    rows.insert(2, {col: None for col in RETAIL_COLUMNS})
+    _write_retail_file(file_path, rows)
+
+    records = ingest(str(file_path), chunksize=2)
+
+    assert [record["Invoice"] for record in records] == [
+        "536365",
+        "536366",
+        "536367",
+        "536368",
+        "536369",
+    ]
+    assert set(records[0]) == set(RETAIL_COLUMNS)
+    assert records[0]["StockCode"] == "85123A"
+    assert records[0]["Customer ID"] == "17850"
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet", ".ndjson"])
+def test_ingest_validates_tabular_headers(tmp_path: Path, suffix: str) -> None:
+    file_path = tmp_path / f"missing{suffix}"
+    df = pd.DataFrame([{col: "x" for col in RETAIL_COLUMNS if col != "Country"}])
+    if suffix == ".csv":
+        df.to_csv(file_path, index=False)
+    elif suffix == ".parquet":
+        df.to_parquet(file_path, index=False)
+    else:
+        df.to_json(file_path, orient="records", lines=True)
+
+    with pytest.raises(ValueError, match="Missing required columns: Country"):
+        ingest(str(file_path))
+
+
+def test_iter_ingest_batches_streams_csv_chunks(tmp_path: Path) -> None:
+    file_path = tmp_path / "stream.csv"
+    _write_retail_file(file_path, [_retail_row(str(536365 + index)) for index in range(5)])
+
+    batches = list(iter_ingest_batches(str(file_path), batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert set(batches[0][0]) == set(RETAIL_COLUMNS)
+
+
+def test_ingest_returns_compact_columnar_batch(tmp_path: Path) -> None:
+    file_path = tmp_path / "compact.xlsx"
+    row = _retail_row("536365")
+    row["Unused"] = "dropped at read time"
+    df = pd.DataFrame([row, _retail_row("C536366")])
+    _write_two_sheet_workbook(str(file_path), df, df.iloc[0:0])
+
+    batch = ingest(str(file_path), filters={}, use_cache=False)
+
+    assert isinstance(batch, RecordBatch)
+    assert list(batch.frame.columns) == list(RETAIL_COLUMNS)
+    assert {column: str(dtype) for column, dtype in batch.frame.dtypes.items()} == {
+        "Invoice": "category",
+        "StockCode": "category",
+        "Description": "category",
+        "Quantity": "Int32",
+        "InvoiceDate": str(batch.frame["InvoiceDate"].dtype),
+        "Price": "float32",
+        "Customer ID": "category",
+        "Country": "category",
+    }
+    assert batch.column("Invoice").cat.codes.tolist() == [0, 1]
+    assert batch[1]["Invoice"] == "C536366"
+    assert [record["Invoice"] for record in batch] == ["536365", "C536366"]
+    assert len(batch[:1]) == 1
+
+
+def test_ingest_applies_default_row_filters_and_reports_counts(tmp_path: Path) -> None:
+    file_path = tmp_path / "filters.csv"
+    cancelled = _retail_row("C536379")
+    cancelled["Quantity"] = -1
+    returned = _retail_row("536380")
+    returned["Quantity"] = 0
+    postage = _retail_row("536381")
+    postage["StockCode"] = "POST"
+    gift = _retail_row("536382")
+    gift["StockCode"] = "gift_0001_10"
+    rows = [_retail_row("536365"), cancelled, returned, postage, gift]
+    _write_retail_file(file_path, rows)
+
+    batch = ingest(str(file_path))
+
+    assert [record["Invoice"] for record in batch] == ["536365"]
+    assert batch.filter_counts == {
+        "cancelled_invoice": 1,
+        "non_positive_quantity": 1,
+        "non_product_stock_code": 2,
+    }
+
+
+def test_apply_row_filters_accepts_custom_rules(tmp_path: Path) -> None:
+    file_path = tmp_path / "custom.csv"
+    rows = [_retail_row("536365"), _retail_row("C536366")]
+    rows[1]["Country"] = "France"
+    _write_retail_file(file_path, rows)
+    frame = ingest(str(file_path), filters={}).frame
+
+    kept, counts = apply_row_filters(
+        frame, {"non_uk": lambda df: (df["Country"] != "United Kingdom").to_numpy()}
+    )
+
+    assert kept["Invoice"].tolist() == ["536365"]
+    assert counts == {"non_uk": 1}
+
+
+def test_collapse_catalog_groups_rows_into_product_entities(tmp_path: Path) -> None:
+    file_path = tmp_path / "catalog.csv"
+    first = _retail_row("536365")
+    first["InvoiceDate"] = "2010-12-01 08:26:00"
+    repeat = _retail_row("536400")
+    repeat["Quantity"] = 4
+    repeat["InvoiceDate"] = "2011-01-05 10:00:00"
+    other = _retail_row("536401")
+    other["StockCode"] = "22423"
+    other["Description"] = "REGENCY CAKESTAND 3 TIER"
+    _write_retail_file(file_path, [first, other, repeat])
+    batch = ingest(str(file_path))
+
+    entities, row_entity = collapse_catalog(batch)
+
+    assert row_entity.tolist() == [0, 1, 0]
+    assert len(entities) == 2
+    heart = entities[0]
+    assert heart["record_id"] == "85123A|WHITE HANGING HEART T-LIGHT HOLDER"
+    assert heart["Description"] == "WHITE HANGING HEART T-LIGHT HOLDER"
+    assert heart["row_count"] == 2
+    assert heart["total_quantity"] == 10
+    assert heart["first_seen"] == pd.Timestamp("2010-12-01 08:26:00")
+    assert heart["last_seen"] == pd.Timestamp("2011-01-05 10:00:00")
+    assert entities[1]["StockCode"] == "22423"
+    assert expand_to_rows([7, 9], row_entity).tolist() == [7, 9, 7]
+
+
+def test_iter_json_array_parses_across_read_boundaries(monkeypatch) -> None:
+    monkeypatch.setattr("src.ingest._TEXT_CHUNK_SIZE", 3)
+    records = [{"StockCode": "1", "Description": "mug, [red]"}, {"StockCode": "2", "Description": "cup"}]
+
+    assert list(iter_json_array(io.StringIO(json.dumps(records, indent=2)))) == records
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+    with pytest.raises(ValueError, match="JSON array"):
+        list(iter_json_array(io.StringIO('{"StockCode": "1"}')))
+    with pytest.raises(ValueError, match="Malformed"):
+        list(iter_json_array(io.StringIO('[{"StockCode": "1"} {"StockCode": "2"}]')))
+
+
+def test_iter_ndjson_skips_blank_lines_and_reports_bad_line() -> None:
+    assert list(iter_ndjson(io.StringIO('{"a": 1}\n\n{"a": 2}\n'))) == [{"a": 1}, {"a": 2}]
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_ndjson(io.StringIO('{"a": 1}\n{oops\n')))
+
+
+def test_ingest_records_builds_compact_batch_with_optional_columns() -> None:
+    records = [
+        {"StockCode": "85123A", "Description": "WHITE MUG", "record_id": "sku-1"},
+        {"StockCode": "POST", "Description": "POSTAGE", "record_id": "sku-2"},
+        {"StockCode": 22423, "Description": "REGENCY CAKESTAND", "Quantity": 2, "record_id": 3},
+    ]
+
+    batch = ingest_records(iter(records), chunksize=2)
+
+    assert isinstance(batch, RecordBatch)
+    assert batch.column("StockCode").tolist() == ["85123A", "22423"]
+    assert batch.column("record_id").tolist() == ["sku-1", "3"]
+    assert str(batch.frame["Quantity"].dtype) == "Int32"
+    assert batch.filter_counts["non_product_stock_code"] == 1
+
+
+def test_ingest_records_rejects_records_missing_required_fields() -> None:
+    with pytest.raises(ValueError, match="Record 1 is missing required field Description"):
+        ingest_records([{"StockCode": "1", "Description": "a"}, {"StockCode": "2"}])
+    with pytest.raises(TypeError, match="not a JSON object"):
+        ingest_records([["StockCode", "1"]])
+
+
+def test_ingest_records_requires_record_id_on_all_or_none() -> None:
+    without_ids = ingest_records(
+        [{"StockCode": "1", "Description": "a"}, {"StockCode": "2", "Description": "b"}]
+    )
+    assert "record_id" not in without_ids.frame.columns
+
+    with pytest.raises(ValueError, match="Record 2 has no record_id"):
+        ingest_records(
+            [
+                {"StockCode": "1", "Description": "a", "record_id": "x"},
+                {"StockCode": "2", "Description": "b", "record_id": "y"},
+                {"StockCode": "3", "Description": "c"},
+            ],
+            chunksize=1,
+        )
+    with pytest.raises(ValueError, match="Record 1 repeats record_id 'x'"):
+        ingest_records(
+            [
+                {"StockCode": "1", "Description": "a", "record_id": "x"},
+                {"StockCode": "2", "Description": "b", "record_id": "x"},
+            ]
+        )
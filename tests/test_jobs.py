@@ -0,0 +1,150 @@
+"""Tests for the background job pool."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from src.jobs import JobManager, JobQueueFull
+from src.progress import report
+
+STAGES = ("ingest", "cluster")
+
+
+def _wait_for(manager: JobManager, job_id: str, statuses: tuple[str, ...]) -> dict:
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        snapshot = manager.get(job_id)
+        if snapshot["status"] in statuses:
+            return snapshot
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {statuses}")
+
+
+def test_job_reports_stage_progress_and_result() -> None:
+    manager = JobManager(max_workers=1, max_pending=0)
+    cleaned: list[bool] = []
+
+    def work(on_stage) -> dict:
+        on_stage("ingest")
+        on_stage("cluster")
+        return {"num_clusters": 2}
+
+    job_id = manager.submit(work, stages=STAGES, cleanup=lambda: cleaned.append(True))
+    snapshot = _wait_for(manager, job_id, ("succeeded",))
+
+    assert snapshot["result"] == {"num_clusters": 2}
+    assert snapshot["progress"] == 1.0
+    assert {name: stage["status"] for name, stage in snapshot["stages"].items()} == {
+        "ingest": "done",
+        "cluster": "done",
+    }
+    assert cleaned == [True]
+    manager.shutdown()
+
+
+def test_queue_limit_and_cancellation() -> None:
+    manager = JobManager(max_workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking(on_stage) -> None:
+        on_stage("ingest")
+        started.set()
+        release.wait(5)
+        on_stage("cluster")
+
+    running = manager.submit(blocking, stages=STAGES)
+    started.wait(5)
+    queued = manager.submit(lambda on_stage: None, stages=STAGES)
+    with pytest.raises(JobQueueFull):
+        manager.submit(lambda on_stage: None, stages=STAGES)
+    assert not manager.has_capacity()
+
+    assert manager.cancel(queued)["status"] == "cancelled"
+    assert manager.cancel(running)["status"] == "running"
+    release.set()
+
+    snapshot = _wait_for(manager, running, ("cancelled",))
+    assert snapshot["stages"]["cluster"]["status"] == "pending"
+    assert manager.cancel("missing") is None
+    manager.shutdown()
+
+
+def test_failed_jobs_are_described_and_expire_after_retention() -> None:
+    manager = JobManager(
+        max_workers=1,
+        retention_seconds=0.0,
+        describe_error=lambda exc: {"detail": f"boom: {exc}"},
+    )
+
+    def failing(on_stage) -> None:
+        raise RuntimeError("bad input")
+
+    job_id = manager.submit(failing, stages=STAGES)
+    manager._executor.submit(lambda: None).result(5)
+    with manager._lock:
+        snapshot = manager._jobs[job_id].snapshot()
+
+    assert snapshot["status"] == "failed"
+    assert snapshot["error"] == {"detail": "boom: bad input"}
+    time.sleep(0.01)
+    assert manager.get(job_id) is None
+    manager.shutdown()
+
+
+def test_job_events_carry_stage_and_reported_progress() -> None:
+    manager = JobManager(max_workers=1, max_pending=0)
+
+    def work(on_stage) -> dict:
+        on_stage("ingest")
+        report("embedding_batch", done=5, total=10)
+        on_stage("cluster")
+        return {}
+
+    job_id = manager.submit(work, stages=STAGES)
+    _wait_for(manager, job_id, ("succeeded",))
+    events, closed = manager.events(job_id).since(-1)
+
+    assert closed
+    assert [event["event"] for event in events] == [
+        "status",
+        "status",
+        "stage",
+        "embedding_batch",
+        "stage",
+        "status",
+    ]
+    progress = events[3]["data"]
+    assert progress["stage"] == "ingest"
+    assert progress["done"] == 5 and progress["total"] == 10
+    assert progress["per_second"] > 0
+    assert events[-1]["data"] == {"status": "succeeded"}
+    assert manager.events("unknown") is None
+
+
+def test_running_job_stops_at_next_progress_checkpoint() -> None:
+    manager = JobManager(max_workers=1, max_pending=0)
+    started = threading.Event()
+    batches: list[int] = []
+
+    def work(on_stage) -> dict:
+        on_stage("ingest")
+        started.set()
+        for batch in range(500):
+            report("embedding_batch", done=batch, total=500)
+            batches.append(batch)
+            time.sleep(0.005)
+        return {}
+
+    job_id = manager.submit(work, stages=STAGES)
+    started.wait(5)
+    manager.cancel(job_id)
+    snapshot = _wait_for(manager, job_id, ("cancelled",))
+
+    assert snapshot["status"] == "cancelled"
+    assert len(batches) < 500
+    assert manager.stats()["cancelled"] == 1
+    assert manager.stats()["active"] == 0
@@ -0,0 +1,93 @@
+"""Tests for the stored single-linkage merge tree."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.cluster import cluster
+from src.merge_tree import MergeTree, build_merge_tree
+from src.progress import CancelToken, PipelineCancelled, reporting_to
+
+
+def _features(count: int) -> list[dict]:
+    rng = random.Random(11)
+    features = []
+    for index in range(count):
+        record: dict[str, object] = {
+            "record_id": f"r{index}",
+            "description_norm": f"item {index}",
+            # float32-exact, since the tree stores vectors as float32.
+            "feature_vector": [float(np.float32(rng.uniform(0.0, 1.0))) for _ in range(3)],
+        }
+        if index % 4 == 0:
+            record["stock_code"] = f"S{index % 3}"
+        if index % 2 == 0:
+            record.update(unit_name="ml", unit_system="metric", unit_value=float(index % 2))
+        features.append(record)
+    return features
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.8, 0.9, 0.95, 0.99, 1.0])
+def test_merge_tree_cut_matches_cluster(threshold: float) -> None:
+    features = _features(40)
+    tree = build_merge_tree(features)
+
+    assert tree.cut(threshold) == cluster(features, similarity_threshold=threshold)
+
+
+def test_merge_tree_keeps_at_most_n_minus_one_merges_in_descending_order() -> None:
+    tree = build_merge_tree(_features(30))
+
+    assert len(tree.similarity) <= 29
+    assert list(tree.similarity) == sorted(tree.similarity, reverse=True)
+
+
+def test_merge_tree_save_load_round_trip(tmp_path: Path) -> None:
+    tree = build_merge_tree(_features(12), min_similarity=0.5, source_key="abc")
+    path = tmp_path / "tree.npz"
+
+    tree.save(path)
+    loaded = MergeTree.load(path)
+
+    assert loaded.source_key == "abc"
+    assert loaded.cut(0.9) == tree.cut(0.9)
+    with pytest.raises(ValueError, match="cannot cut"):
+        loaded.cut(0.4)
+
+
+def test_merge_tree_saves_vectors_as_a_float32_array(tmp_path: Path) -> None:
+    tree = build_merge_tree(_features(12))
+    path = tmp_path / "tree.npz"
+
+    tree.save(path)
+
+    with np.load(path) as payload:
+        assert payload["vectors"].dtype == np.float32
+        assert payload["vectors"].shape == (12, 3)
+        assert "feature_vector" not in str(payload["meta"])
+
+
+def test_build_merge_tree_stops_at_the_next_tile_once_cancelled(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr("src.merge_tree.SIMILARITY_TILE_ROWS", 4)
+    token = CancelToken(tmp_path / "run.cancel")
+    tiles: list[int] = []
+
+    def checkpoint(_kind: str, data: dict) -> None:
+        tiles.append(data["done"])
+        token.raise_if_cancelled()
+        token.cancel()
+
+    with reporting_to(checkpoint), pytest.raises(PipelineCancelled):
+        build_merge_tree(_features(12))
+
+    assert tiles == [0, 4]
+
+
+def test_merge_tree_handles_empty_and_single_record() -> None:
+    assert build_merge_tree([]).cut(0.85) == []
+    single = build_merge_tree([{"record_id": "a", "feature_vector": [1.0]}])
+    assert [record["cluster_id"] for record in single.cut(0.85)] == [0]
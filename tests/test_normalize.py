@@ -4,7 +4,14 @@ from __future__ import annotations
 
 import pytest
 
-from src.normalize import _apply_synonyms, _clean_text, _extract_unit_info, normalize
+from src.normalize import (
+    _apply_synonyms,
+    _clean_text,
+    _extract_unit_info,
+    current_synonyms,
+    normalize,
+    synonyms_digest,
+)
 
 
 @pytest.mark.parametrize(
@@ -209,3 +216,21 @@ def test_normalize_handles_weird_formatting_and_stays_deterministic() -> None:
             "unit_system": "metric",
         }
     ]
+
+
+def test_current_synonyms_reload_when_file_changes(monkeypatch, tmp_path) -> None:
+    synonyms_path = tmp_path / "synonyms.yml"
+    monkeypatch.setattr("src.normalize._SYNONYM_PATH", synonyms_path)
+    assert current_synonyms().digest == "missing"
+
+    synonyms_path.write_text('{"variant_to_canonical": {"ltr": "litre"}}', encoding="utf-8")
+    first = current_synonyms()
+    assert current_synonyms().patterns is first.patterns
+    assert synonyms_digest() == first.digest
+    assert normalize([{"Description": "1 ltr jug"}])[0]["description"] == "1 litre jug"
+
+    synonyms_path.write_text('{"variant_to_canonical": {"jug": "pitcher"}}', encoding="utf-8")
+    second = current_synonyms()
+    assert second.digest != first.digest
+    assert normalize([{"Description": "1 ltr jug"}])[0]["description"] == "1 ltr pitcher"
+    assert normalize([{"Description": "1 ltr jug"}], first)[0]["description"] == "1 litre jug"
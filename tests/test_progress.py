@@ -0,0 +1,64 @@
+"""Tests for progress reporting and the per-run event bus."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.progress import CancelToken, PipelineCancelled, ProgressBus, report, reporting_to
+
+
+def test_report_reaches_only_the_active_listener() -> None:
+    received: list[tuple[str, dict]] = []
+
+    report("ignored", done=1)
+    with reporting_to(lambda kind, data: received.append((kind, data))):
+        report("similarity_tile", done=256, total=1000)
+    report("ignored", done=2)
+
+    assert received == [("similarity_tile", {"done": 256, "total": 1000})]
+
+
+def test_progress_bus_replays_events_after_sequence_and_closes() -> None:
+    bus = ProgressBus(max_events=3)
+    for index in range(4):
+        bus.publish("tick", {"index": index})
+
+    events, closed = bus.since(1)
+    assert [event["data"]["index"] for event in events] == [2, 3]
+    assert not closed
+    assert [event["seq"] for event in bus.since(0)[0]] == [1, 2, 3]
+
+    bus.close()
+    bus.publish("tick", {"index": 4})
+    events, closed = bus.since(3)
+    assert events == [] and closed
+
+
+def test_progress_bus_reports_gap_when_requested_events_were_evicted() -> None:
+    bus = ProgressBus(max_events=3)
+    for index in range(7):
+        bus.publish("tick", {"index": index})
+
+    events, _ = bus.since(-1)
+
+    assert [(event["seq"], event["event"]) for event in events] == [
+        (3, "gap"),
+        (4, "tick"),
+        (5, "tick"),
+        (6, "tick"),
+    ]
+    assert events[0]["data"] == {"missed": 4}
+    assert bus.since(1)[0][0]["data"] == {"missed": 2}
+    assert bus.since(3)[0][0]["event"] == "tick"
+
+
+def test_cancel_token_uses_marker_file(tmp_path) -> None:
+    token = CancelToken(tmp_path / "run.cancel")
+    token.raise_if_cancelled()
+
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(PipelineCancelled):
+        token.raise_if_cancelled()
+    token.discard()
+    assert not token.cancelled
@@ -0,0 +1,60 @@
+"""Tests for the upload result cache."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.result_cache import ResultCache, payload_size
+
+
+def test_result_cache_evicts_least_recently_used_entry() -> None:
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"value": 1})
+    cache.put("b", {"value": 2})
+    assert cache.get("a") is not None
+    cache.put("c", {"value": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == {"value": 1}
+    assert cache.get("c")[0] == {"value": 3}
+
+
+def test_result_cache_expires_entries_after_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("src.result_cache.time.time", lambda: now[0])
+    cache = ResultCache(ttl_seconds=10)
+    cache.put("a", {"value": 1})
+
+    now[0] += 5
+    payload, age = cache.get("a")
+    assert payload == {"value": 1}
+    assert age == pytest.approx(5)
+    now[0] += 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_respects_byte_limit() -> None:
+    cache = ResultCache(max_bytes=40)
+    assert cache.put("a", {"text": "x" * 10})
+    assert cache.put("b", {"text": "y" * 10})
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert not cache.put("big", {"text": "z" * 100})
+    assert cache.total_bytes <= 40
+
+
+def test_result_cache_uses_size_measured_by_caller() -> None:
+    cache = ResultCache(max_bytes=100)
+    payload = {"text": "x" * 500}
+
+    assert cache.put("a", payload, size=60)
+    assert cache.total_bytes == 60
+    assert not cache.put("b", payload, size=101)
+    assert payload_size(payload) > 500
+
+
+def test_result_cache_rejects_negative_limits() -> None:
+    with pytest.raises(ValueError):
+        ResultCache(max_entries=-1)
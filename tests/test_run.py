@@ -2,6 +2,11 @@
 
 from __future__ import annotations
 
+import json
+
+import pandas as pd
+import pytest
+
 import run
 
 
@@ -65,3 +70,261 @@ def test_run_main_auto_tuning_uses_best_threshold(
     output = capsys.readouterr().out
     assert "'similarity_threshold': 0.9" in output
     assert "'tuning': {'best_threshold': 0.9" in output
+
+
+def test_run_main_collapse_catalog_clusters_entities(monkeypatch, capsys, tmp_path) -> None:
+    input_path = tmp_path / "rows.csv"
+    row = {
+        "Invoice": "536365",
+        "StockCode": "85123A",
+        "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+        "Quantity": 6,
+        "InvoiceDate": "2010-12-01 08:26:00",
+        "Price": 2.55,
+        "Customer ID": "17850",
+        "Country": "United Kingdom",
+    }
+    pd.DataFrame([row, {**row, "Invoice": "536366"}]).to_csv(input_path, index=False)
+
+    seen_counts: list[int] = []
+
+    def fake_extract(records: list[dict]) -> list[dict]:
+        seen_counts.append(len(records))
+        return [
+            {"record_id": f"r{index}", "description_norm": "item", "feature_vector": [1.0]}
+            for index, _ in enumerate(records)
+        ]
+
+    monkeypatch.setattr(run, "extract", fake_extract)
+
+    run.main([str(input_path), "--collapse-catalog"])
+
+    assert seen_counts == [1]
+    output = capsys.readouterr().out
+    assert "'catalog': {'num_rows': 2, 'num_entities': 1}" in output
+
+
+def test_run_main_incremental_only_embeds_rows_past_watermark(
+    monkeypatch, capsys, tmp_path
+) -> None:
+    input_path = tmp_path / "daily.csv"
+    state_dir = tmp_path / "state"
+    row = {
+        "Invoice": "536365",
+        "StockCode": "85123A",
+        "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+        "Quantity": 6,
+        "InvoiceDate": "2010-12-01 08:26:00",
+        "Price": 2.55,
+        "Customer ID": "17850",
+        "Country": "United Kingdom",
+    }
+    embedded: list[list[str]] = []
+
+    def fake_extract(records: list[dict]) -> list[dict]:
+        embedded.append([record["record_id"] for record in records])
+        return [
+            {
+                "record_id": record["record_id"],
+                "description_norm": record["description"],
+                "feature_vector": [1.0, 0.0],
+            }
+            for record in records
+        ]
+
+    monkeypatch.setattr(run, "extract", fake_extract)
+    pd.DataFrame([row]).to_csv(input_path, index=False)
+    run.main([str(input_path), "--incremental-state", str(state_dir)])
+
+    refreshed = [
+        row,
+        {**row, "Invoice": "536370", "InvoiceDate": "2010-12-02 09:00:00"},
+        {
+            **row,
+            "Invoice": "536371",
+            "StockCode": "22423",
+            "Description": "REGENCY CAKESTAND 3 TIER",
+            "InvoiceDate": "2010-12-02 09:30:00",
+        },
+    ]
+    pd.DataFrame(refreshed).to_csv(input_path, index=False)
+    run.main([str(input_path), "--incremental-state", str(state_dir)])
+
+    assert embedded == [
+        ["85123A|WHITE HANGING HEART T-LIGHT HOLDER"],
+        ["22423|REGENCY CAKESTAND 3 TIER"],
+    ]
+    output = capsys.readouterr().out
+    assert (
+        "'incremental': {'delta_rows': 2, 'new_entities': 1, 'total_entities': 2, "
+        "'resynced_records': 0, 'relabelled_clusters': 1}"
+    ) in output
+
+
+def test_run_main_resume_skips_stages_completed_before_a_failure(
+    monkeypatch, capsys, tmp_path
+) -> None:
+    input_path = tmp_path / "rows.csv"
+    row = {
+        "Invoice": "536365",
+        "StockCode": "85123A",
+        "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+        "Quantity": 6,
+        "InvoiceDate": "2010-12-01 08:26:00",
+        "Price": 2.55,
+        "Customer ID": "17850",
+        "Country": "United Kingdom",
+    }
+    pd.DataFrame([row]).to_csv(input_path, index=False)
+    checkpoint_dir = tmp_path / "checkpoints"
+    normalize_calls: list[int] = []
+
+    def counting_normalize(records):
+        normalize_calls.append(len(records))
+        return [{"description": "item", "unit_value": None, "unit_name": None, "unit_system": None}]
+
+    def quota_error(_records: list[dict]) -> list[dict]:
+        raise RuntimeError("insufficient_quota")
+
+    monkeypatch.setattr(run, "normalize", counting_normalize)
+    monkeypatch.setattr(run, "extract", quota_error)
+    with pytest.raises(RuntimeError, match="insufficient_quota"):
+        run.main([str(input_path), "--checkpoint-dir", str(checkpoint_dir)])
+
+    monkeypatch.setattr(
+        run,
+        "extract",
+        lambda records: [
+            {"record_id": "r0", "description_norm": "item", "feature_vector": [1.0]}
+        ],
+    )
+    run.main([str(input_path), "--checkpoint-dir", str(checkpoint_dir), "--resume"])
+
+    assert normalize_calls == [1]
+    output = capsys.readouterr().out
+    assert "'checkpoints': {'reused': ['ingest', 'normalize']}" in output
+
+
+def test_run_main_force_stage_implies_default_checkpoint_dir(
+    monkeypatch, capsys, tmp_path
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run, "ingest", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(run, "normalize", lambda raw: raw)
+    monkeypatch.setattr(
+        run,
+        "extract",
+        lambda _: [{"record_id": "r0", "description_norm": "item", "feature_vector": [1.0]}],
+    )
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("placeholder", encoding="utf-8")
+
+    run.main([str(input_path), "--force-stage", "cluster"])
+    run.main([str(input_path), "--force-stage", "cluster"])
+
+    assert (tmp_path / run.DEFAULT_CHECKPOINT_DIR).is_dir()
+    second = capsys.readouterr().out.strip().splitlines()[-1]
+    assert "'checkpoints': {'reused': ['ingest', 'normalize', 'extract']}" in second
+
+
+def test_run_main_threshold_from_tree_reuses_stored_tree(monkeypatch, capsys, tmp_path) -> None:
+    input_path = tmp_path / "input.csv"
+    input_path.write_text("placeholder", encoding="utf-8")
+    tree_path = tmp_path / "tree.npz"
+    extract_calls: list[int] = []
+
+    def fake_extract(records: list[dict]) -> list[dict]:
+        extract_calls.append(len(records))
+        unit = {"unit_name": "ml", "unit_system": "metric"}
+        return [
+            {"record_id": "a", "description_norm": "mug", "feature_vector": [1.0, 0.0], **unit},
+            {"record_id": "b", "description_norm": "mug", "feature_vector": [0.9, 0.3], **unit},
+        ]
+
+    monkeypatch.setattr(run, "ingest", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(run, "normalize", lambda raw: raw)
+    monkeypatch.setattr(run, "extract", fake_extract)
+    monkeypatch.setattr(run, "cluster", pytest.fail)
+
+    run.main([str(input_path), "--threshold-from-tree", str(tree_path)])
+    first = capsys.readouterr().out
+    run.main(
+        [str(input_path), "--threshold-from-tree", str(tree_path), "--similarity-threshold", "0.99"]
+    )
+    second = capsys.readouterr().out
+
+    assert extract_calls == [0]
+    assert "'num_clusters': 1" in first
+    assert "'reused': False" in first
+    assert "'num_clusters': 2" in second
+    assert "'merge_tree': {'path': '" in second and "'reused': True" in second
+
+
+def test_run_main_assignments_path_keeps_cluster_ids_when_rows_shift(
+    monkeypatch, capsys, tmp_path
+) -> None:
+    input_path = tmp_path / "rows.csv"
+    assignments_path = tmp_path / "assignments.json"
+    row = {
+        "Invoice": "536365",
+        "StockCode": "85123A",
+        "Description": "WHITE HANGING HEART T-LIGHT HOLDER",
+        "Quantity": 6,
+        "InvoiceDate": "2010-12-01 08:26:00",
+        "Price": 2.55,
+        "Customer ID": "17850",
+        "Country": "United Kingdom",
+    }
+    cakestand = {**row, "StockCode": "22423", "Description": "REGENCY CAKESTAND 3 TIER"}
+    lantern = {**row, "StockCode": "71053", "Description": "WHITE METAL LANTERN"}
+    axes = {"22423": [0.0, 1.0, 0.0], "85123A": [1.0, 0.0, 0.0], "71053": [0.0, 0.0, 1.0]}
+
+    def fake_extract(records: list[dict]) -> list[dict]:
+        return [
+            {
+                "record_id": record["record_id"],
+                "description_norm": record["description"],
+                "feature_vector": axes[record["record_id"].split("|")[0]],
+            }
+            for record in records
+        ]
+
+    monkeypatch.setattr(run, "extract", fake_extract)
+    argv = [str(input_path), "--collapse-catalog", "--assignments-path", str(assignments_path)]
+    pd.DataFrame([row, cakestand]).to_csv(input_path, index=False)
+    run.main(argv)
+    first = json.loads(assignments_path.read_text(encoding="utf-8"))["assignments"]
+
+    # A new product in the first row shifts every other row down by one.
+    pd.DataFrame([lantern, row, cakestand]).to_csv(input_path, index=False)
+    run.main(argv)
+    second = json.loads(assignments_path.read_text(encoding="utf-8"))["assignments"]
+
+    assert {key: second[key] for key in first} == first
+    assert second["71053|WHITE METAL LANTERN"] not in first.values()
+    output = capsys.readouterr().out
+    assert "'cluster_ids': {'reused_clusters': 2, 'new_clusters': 1" in output
+
+
+def test_run_main_assignments_path_requires_collapse_catalog(tmp_path) -> None:
+    with pytest.raises(ValueError, match="requires --collapse-catalog"):
+        run.main(["input.xlsx", "--assignments-path", str(tmp_path / "assignments.json")])
+
+
+def test_run_main_store_path_writes_assignments(monkeypatch, tmp_path) -> None:
+    store_path = tmp_path / "assignments.db"
+    unit = {"unit_name": "ml", "unit_system": "metric", "unit_value": 350.0}
+    features = [
+        {"record_id": "a", "description_norm": "mug", "feature_vector": [1.0, 0.0], **unit},
+        {"record_id": "b", "description_norm": "mug", "feature_vector": [1.0, 0.1], **unit},
+    ]
+    monkeypatch.setattr(run, "ingest", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(run, "normalize", lambda raw: raw)
+    monkeypatch.setattr(run, "extract", lambda _: features)
+
+    run.main(["input.xlsx", "--store-path", str(store_path)])
+
+    stored = run.AssignmentStore(store_path).cluster(0)
+    assert stored["label"] == "mug 350 ml"
+    assert stored["size"] == 2
+    assert stored["confidence"] > 0.9
@@ -0,0 +1,62 @@
+"""Tests for carrying cluster IDs across runs."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.stable_ids import load_assignments, match_cluster_ids, save_assignments
+
+
+def _clusters(groups: list[list[str]]) -> list[dict]:
+    return [
+        {"record_id": record_id, "cluster_id": cluster_id}
+        for cluster_id, members in enumerate(groups)
+        for record_id in members
+    ]
+
+
+def _ids(records: list[dict]) -> dict[str, int]:
+    return {record["record_id"]: record["cluster_id"] for record in records}
+
+
+def test_match_cluster_ids_keeps_ids_when_components_are_renumbered() -> None:
+    previous = {"next_cluster_id": 2, "assignments": {"a": 0, "b": 0, "c": 1}}
+
+    relabelled, stored, summary = match_cluster_ids(_clusters([["c"], ["a", "b"]]), previous)
+
+    assert _ids(relabelled) == {"c": 1, "a": 0, "b": 0}
+    assert stored == {"next_cluster_id": 2, "assignments": {"c": 1, "a": 0, "b": 0}}
+    assert summary["moved_records"] == 0
+    assert summary["new_clusters"] == 0
+
+
+def test_match_cluster_ids_reports_merges_splits_and_fresh_ids() -> None:
+    previous = {
+        "next_cluster_id": 5,
+        "assignments": {"a": 0, "b": 0, "c": 1, "d": 2, "e": 2, "f": 2},
+    }
+    groups = [["a", "b", "c"], ["d", "e"], ["f"], ["new"]]
+
+    relabelled, stored, summary = match_cluster_ids(_clusters(groups), previous)
+
+    assert _ids(relabelled) == {"a": 0, "b": 0, "c": 0, "d": 2, "e": 2, "f": 5, "new": 6}
+    assert stored["next_cluster_id"] == 7
+    assert summary == {
+        "reused_clusters": 2,
+        "new_clusters": 2,
+        "retired_clusters": 1,
+        "merges": 1,
+        "splits": 1,
+        "moved_records": 2,
+        "added_records": 1,
+        "removed_records": 0,
+    }
+
+
+def test_assignments_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "ids" / "assignments.json"
+    assert load_assignments(path) == {"next_cluster_id": 0, "assignments": {}}
+
+    save_assignments(path, {"next_cluster_id": 3, "assignments": {"a": 2}})
+
+    assert load_assignments(path) == {"next_cluster_id": 3, "assignments": {"a": 2}}
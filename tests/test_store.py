@@ -0,0 +1,71 @@
+"""Tests for the SQLite assignment store."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.store import AssignmentStore
+
+CLUSTERS = [
+    {"record_id": "a", "cluster_id": 0, "description_norm": "white mug", "stock_code": "85123A"},
+    {"record_id": "b", "cluster_id": 0, "description_norm": "white mug", "stock_code": "85123A"},
+    {
+        "record_id": "c",
+        "cluster_id": 1,
+        "description_norm": "olive oil",
+        "unit_value": 500.0,
+        "unit_name": "ml",
+        "unit_system": "metric",
+    },
+]
+LABELS = {0: "white mug", 1: "olive oil 500 ml"}
+SUSPECTS = [{"cluster_id": "1", "reasons": ["unit_value_mixed"], "risk_score": 0.7}]
+
+
+def _store(tmp_path: Path) -> AssignmentStore:
+    store = AssignmentStore(tmp_path / "store" / "assignments.db")
+    store.write_run(CLUSTERS, LABELS, {0: 0.9, 1: 0.5}, SUSPECTS)
+    return store
+
+
+def test_store_looks_up_records_and_clusters(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+
+    record = store.record("c")
+    assert record["cluster_id"] == 1
+    assert record["label"] == "olive oil 500 ml"
+    assert record["suspect"] is True
+    assert store.record("missing") is None
+    assert [row["record_id"] for row in store.records_by_stock_code("85123A")] == ["a", "b"]
+
+    cluster = store.cluster(1)
+    assert cluster["confidence"] == 0.5
+    assert cluster["suspect_reasons"] == ["unit_value_mixed"]
+    assert [member["record_id"] for member in cluster["members"]] == ["c"]
+    assert store.summary() == {"num_records": 3, "num_clusters": 2}
+
+
+def test_store_label_prefix_uses_index_and_rewrite_replaces_snapshot(tmp_path: Path) -> None:
+    store = _store(tmp_path)
+
+    assert [cluster["cluster_id"] for cluster in store.clusters_by_label_prefix("olive")] == [1]
+    plan = store._connection().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM clusters WHERE label >= ? AND label < ?",
+        ("olive", "olive\U0010ffff"),
+    ).fetchall()
+    assert any("clusters_label" in str(tuple(row)) for row in plan)
+
+    store.write_run(CLUSTERS[:1], {0: "mug"})
+    assert store.record("c") is None
+    assert store.clusters_by_label_prefix("") == [
+        {
+            "cluster_id": 0,
+            "label": "mug",
+            "confidence": None,
+            "size": 1,
+            "suspect": False,
+            "suspect_reasons": [],
+            "risk_score": None,
+        }
+    ]
+    assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -0,0 +1,27 @@
+"""Tests for finding records affected by synonym map changes."""
+
+from __future__ import annotations
+
+from src.synonym_impact import diff_synonym_maps, find_affected_records
+
+
+def test_diff_synonym_maps_reports_added_removed_and_remapped_variants() -> None:
+    old = {"ltr": "litre", "pk": "pack", "sm": "small"}
+    new = {"ltr": "liter", "pk": "pack", "lg": "large"}
+
+    assert diff_synonym_maps(old, new) == {"ltr", "sm", "lg"}
+    assert diff_synonym_maps(new, dict(new)) == set()
+
+
+def test_find_affected_records_matches_whole_words_in_raw_or_normalized_text() -> None:
+    records = [
+        {"record_id": "1", "description_raw": "WATER 2 LTR", "description_norm": "water 2 litre"},
+        {"record_id": "2", "description_raw": "SMALL TIN", "description_norm": "small tin"},
+        {"record_id": "3", "description_raw": "FILTRATION JUG", "description_norm": "filtration jug"},
+        {"record_id": "4", "description_norm": "2 litre jug"},
+    ]
+
+    affected = find_affected_records(records, {"ltr", "litre"})
+
+    assert [record["record_id"] for record in affected] == ["1", "4"]
+    assert find_affected_records(records, set()) == []